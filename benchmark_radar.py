@@ -0,0 +1,247 @@
+"""
+Benchmarks do pipeline do radar serial (codigo_versao_final.py)
+Uso: python benchmark_radar.py [quadros]
+Mede o custo por quadro das etapas mais pesadas no Raspberry Pi
+"""
+import os
+import re
+import sys
+import threading
+import time
+import numpy as np
+
+from codigo_versao_final import (
+    VitalSignsManager, EmotionalStateAnalyzer, RingBuffer, parse_serial_data,
+    GoogleSheetsManager, SheetsBatchSink
+)
+from radar_parser import (
+    split_frames, parse_frame, encode_binary_frames, decode_binary_frames, decode_binary_frames_array
+)
+
+CAPTURE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'teste.txt')
+
+LEGACY_PATTERNS = {
+    'x_point': r'x_point\s*:\s*([-+]?\d*\.?\d+)',
+    'y_point': r'y_point\s*:\s*([-+]?\d*\.?\d+)',
+    'dop_index': r'dop_index\s*:\s*([-+]?\d+)',
+    'cluster_index': r'cluster_index\s*:\s*(\d+)',
+    'move_speed': r'move_speed\s*:\s*([-+]?\d*\.?\d+)\s*cm/s',
+    'total_phase': r'total_phase\s*:\s*([-+]?\d*\.?\d+)',
+    'breath_phase': r'breath_phase\s*:\s*([-+]?\d*\.?\d+)',
+    'heart_phase': r'heart_phase\s*:\s*([-+]?\d*\.?\d+)',
+    'breath_rate': r'breath_rate\s*:\s*([-+]?\d*\.?\d+)',
+    'heart_rate': r'heart_rate\s*:\s*([-+]?\d*\.?\d+)',
+    'distance': r'distance\s*:\s*([-+]?\d*\.?\d+)',
+}
+
+
+class FakeQuotaExceededError(Exception):
+    """Erro 429 simulado pela FakeWorksheet"""
+    def __init__(self, message):
+        super().__init__(message)
+        self.response = type('FakeResponse', (), {'status_code': 429})()
+
+
+class FakeWorksheet:
+    """
+    Worksheet local para o benchmark offline do envio ao Google Sheets
+    Simula a latência de cada requisição e a cota de requisições por minuto (erro 429)
+    """
+    def __init__(self, latency=0.2, requests_per_minute=60):
+        self.latency = latency
+        self.requests_per_minute = requests_per_minute
+        self.rows = []
+        self.request_times = []
+        self.requests = 0
+        self.rejected = 0
+        self.lock = threading.Lock()
+
+    def _request(self):
+        time.sleep(self.latency)
+        with self.lock:
+            now = time.monotonic()
+            self.request_times = [t for t in self.request_times if now - t < 60]
+            self.requests += 1
+            if self.requests_per_minute and len(self.request_times) >= self.requests_per_minute:
+                self.rejected += 1
+                raise FakeQuotaExceededError("APIError: [429]: Quota exceeded for quota metric 'Write requests'")
+            self.request_times.append(now)
+
+    def append_row(self, row, value_input_option='RAW'):
+        self._request()
+        with self.lock:
+            self.rows.append(list(row))
+
+    def append_rows(self, rows, value_input_option='RAW'):
+        self._request()
+        with self.lock:
+            self.rows.extend(list(row) for row in rows)
+
+
+def legacy_parse_serial_data(raw_data):
+    """Parser anterior: varredura dos marcadores + onze re.search independentes"""
+    if '-----Human Detected-----' not in raw_data or 'Target 1:' not in raw_data:
+        return None
+    matches = {key: re.search(pattern, raw_data, re.IGNORECASE) for key, pattern in LEGACY_PATTERNS.items()}
+    if not (matches['x_point'] and matches['y_point']):
+        return None
+    return {key: float(match.group(1)) if match else None for key, match in matches.items()}
+
+
+def legacy_rate_from_phase(phase_data, min_freq, max_freq, rate_multiplier, sample_rate=20):
+    """Implementação anterior: array novo, janela nova e FFT complexa completa a cada quadro"""
+    phase_mean = np.mean(phase_data)
+    centered_phase = np.array(phase_data) - phase_mean
+    window = np.hanning(len(centered_phase))
+    fft_result = np.fft.fft(centered_phase * window)
+    fft_freq = np.fft.fftfreq(len(centered_phase), d=1 / sample_rate)
+    valid_idx = np.where((fft_freq >= min_freq) & (fft_freq <= max_freq))[0]
+    if len(valid_idx) == 0:
+        return None
+    magnitude_spectrum = np.abs(fft_result[valid_idx])
+    peak_idx = np.argmax(magnitude_spectrum)
+    if magnitude_spectrum[peak_idx] < 1.5 * np.mean(magnitude_spectrum):
+        return None
+    return round(abs(fft_freq[valid_idx[peak_idx]] * rate_multiplier), 1)
+
+
+def report(name, elapsed, frames):
+    print(f"{name:<40} {elapsed / frames * 1e6:9.2f} µs/quadro")
+
+
+def bench_vital_signs(frames):
+    rng = np.random.default_rng(42)
+    t = np.arange(frames) / 20
+    heart = 0.2 * np.sin(2 * np.pi * 1.2 * t) + 0.05 * rng.normal(size=frames)
+    breath = 0.3 * np.sin(2 * np.pi * 0.25 * t) + 0.05 * rng.normal(size=frames)
+    manager = VitalSignsManager()
+    heart_band = (manager.VALID_RANGES['heart_rate'][0] / 60, manager.VALID_RANGES['heart_rate'][1] / 60)
+    breath_band = (manager.VALID_RANGES['breath_rate'][0] / 60, manager.VALID_RANGES['breath_rate'][1] / 60)
+
+    # Estimativa espectral isolada: implementação anterior (lista com pop(0) + FFT)
+    heart_list, breath_list = [], []
+    start = time.perf_counter()
+    for i in range(frames):
+        heart_list.append(heart[i])
+        breath_list.append(breath[i])
+        if len(heart_list) > manager.HEART_BUFFER_SIZE:
+            heart_list.pop(0)
+        if len(breath_list) > manager.BREATH_BUFFER_SIZE:
+            breath_list.pop(0)
+        legacy_rate_from_phase(heart_list, *heart_band, 60)
+        legacy_rate_from_phase(breath_list, *breath_band, 60)
+    report("fase -> taxa (FFT completa, legado)", time.perf_counter() - start, frames)
+
+    # Estimativa espectral isolada: ring buffer + base DFT da banda em cache
+    heart_ring = RingBuffer(manager.HEART_BUFFER_SIZE)
+    breath_ring = RingBuffer(manager.BREATH_BUFFER_SIZE)
+    start = time.perf_counter()
+    for i in range(frames):
+        heart_ring.append(heart[i])
+        breath_ring.append(breath[i])
+        manager._calculate_rate_from_phase(heart_ring, manager.heart_estimator)
+        manager._calculate_rate_from_phase(breath_ring, manager.breath_estimator)
+    report("fase -> taxa (banda em cache)", time.perf_counter() - start, frames)
+
+    # Quadro completo de sinais vitais (qualidade + buffers + estimativa)
+    start = time.perf_counter()
+    for i in range(frames):
+        manager.calculate_vital_signs(0.0, breath[i], heart[i], 60)
+    report("calculate_vital_signs (quadro completo)", time.perf_counter() - start, frames)
+
+
+def bench_emotional_state(frames):
+    rng = np.random.default_rng(7)
+    heart_rates = 75 + 5 * rng.normal(size=frames)
+    breath_rates = 14 + 2 * rng.normal(size=frames)
+    analyzer = EmotionalStateAnalyzer()
+    start = time.perf_counter()
+    for i in range(frames):
+        analyzer.update_emotional_state(heart_rates[i], breath_rates[i])
+    report("update_emotional_state (todo quadro)", time.perf_counter() - start, frames)
+
+
+def bench_parser(frames):
+    with open(CAPTURE_PATH, 'r', encoding='utf-8', errors='ignore') as capture:
+        captured = list(split_frames(capture))
+    messages = [captured[i % len(captured)] for i in range(frames)]
+
+    start = time.perf_counter()
+    for message in messages:
+        legacy_parse_serial_data(message)
+    report("parse_serial_data (11 regex, legado)", time.perf_counter() - start, frames)
+
+    start = time.perf_counter()
+    for message in messages:
+        parse_serial_data(message)
+    report("parse_serial_data (passada única)", time.perf_counter() - start, frames)
+
+
+def bench_binary_frames(frames):
+    """Decodificação do formato binário x texto, por frame"""
+    with open(CAPTURE_PATH, 'r', encoding='utf-8', errors='ignore') as capture:
+        parsed = [parse_frame(text).to_dict() for text in split_frames(capture)]
+    records = [record for record in parsed if record['x_point'] is not None][:255]
+    packet = encode_binary_frames('bench', 1, records)
+    single_packets = [encode_binary_frames('bench', i, [record]) for i, record in enumerate(records)]
+    repeats = max(1, frames // len(records))
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for single in single_packets:
+            decode_binary_frames(single)
+    report("binário, 1 frame por pacote", time.perf_counter() - start, repeats * len(records))
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        decode_binary_frames(packet)
+    report(f"binário, lote de {len(records)} (dicts)", time.perf_counter() - start, repeats * len(records))
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        decode_binary_frames_array(packet)
+    report(f"binário, lote de {len(records)} (array NumPy)", time.perf_counter() - start, repeats * len(records))
+
+
+def bench_sheets_sink(rows=600, latency=0.01, requests_per_minute=60):
+    """Envio para uma FakeWorksheet com a cota da API: append_row por quadro x lotes"""
+    sample = {
+        'session_id': 'bench', 'timestamp': '2025-01-01 00:00:00', 'x_point': 0.1, 'y_point': 0.5,
+        'move_speed': 0.0, 'heart_rate': 75.0, 'breath_rate': 15.0, 'distance': 0.5,
+        'satisfaction_score': 80.0, 'satisfaction_class': 'SATISFEITO', 'is_engaged': True
+    }
+
+    worksheet = FakeWorksheet(latency=latency, requests_per_minute=requests_per_minute)
+    start = time.perf_counter()
+    for _ in range(rows):
+        try:
+            worksheet.append_row(GoogleSheetsManager.build_row(sample))
+        except Exception:
+            pass
+    elapsed = time.perf_counter() - start
+    print(f"{'append_row por quadro (legado)':<40} {len(worksheet.rows):5d}/{rows} linhas, "
+          f"{worksheet.requests} requisições, {worksheet.rejected} erros 429, {elapsed:.2f}s")
+
+    worksheet = FakeWorksheet(latency=latency, requests_per_minute=requests_per_minute)
+    sink = SheetsBatchSink(worksheet, batch_size=100, requests_per_minute=requests_per_minute)
+    start = time.perf_counter()
+    for _ in range(rows):
+        sink.insert_radar_data(sample)
+    sink.flush()
+    elapsed = time.perf_counter() - start
+    print(f"{'SheetsBatchSink (append_rows em lote)':<40} {len(worksheet.rows):5d}/{rows} linhas, "
+          f"{worksheet.requests} requisições, {worksheet.rejected} erros 429, {elapsed:.2f}s")
+
+
+def main():
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    print(f"Quadros: {frames}")
+    bench_vital_signs(frames)
+    bench_emotional_state(frames)
+    bench_parser(frames)
+    bench_binary_frames(frames)
+    bench_sheets_sink()
+
+
+if __name__ == "__main__":
+    main()
@@ -4,13 +4,13 @@ import logging
 import json
 import os
 from dotenv import load_dotenv
+from radar_parser import parse_frame
 import traceback
 import time
 import numpy as np
 import uuid
 import serial
 import threading
-import re
 
 # Configuração básica de logging
 logging.basicConfig(
@@ -32,38 +32,27 @@ RANGE_STEP = 2.5  # Valor do RANGE_STEP do código ESP32/Arduino
 def parse_serial_data(raw_data):
     """Analisa os dados brutos da porta serial para extrair informações do radar mmWave"""
     try:
-        # Padrões para extrair valores do texto recebido pela porta serial
-        x_pattern = r'x_point:\s*([-]?\d+\.\d+)'
-        y_pattern = r'y_point:\s*([-]?\d+\.\d+)'
-        speed_pattern = r'move_speed:\s*([-]?\d+\.\d+)\s*cm/s'
+        # Extrair valores com o parser compartilhado (radar_parser.py)
+        frame = parse_frame(raw_data)
         
-        # Extrair valores usando expressões regulares
-        x_match = re.search(x_pattern, raw_data)
-        y_match = re.search(y_pattern, raw_data)
-        speed_match = re.search(speed_pattern, raw_data)
-        
-        if x_match and y_match:
-            # Dados obrigatórios: posição x e y
-            x_point = float(x_match.group(1))
-            y_point = float(y_match.group(1))
-            
+        if frame.has_position():
             # Velocidade de movimento
-            move_speed = float(speed_match.group(1)) if speed_match else 0.0
+            move_speed = frame.move_speed if frame.move_speed is not None else 0.0
             
             # Valores fixos para sinais vitais (conforme Arduino)
             heart_rate = 75.0
             breath_rate = 15.0
             
             return {
-                'x_point': x_point,
-                'y_point': y_point,
+                'x_point': frame.x_point,
+                'y_point': frame.y_point,
                 'move_speed': move_speed,
                 'heart_rate': heart_rate,
                 'breath_rate': breath_rate
             }
         else:
             # Se não for possível extrair todos os valores necessários
-            if '-----Human Detected-----' in raw_data:
+            if frame.human_detected:
                 logger.info("Detecção humana sem informações detalhadas")
                 return None
             elif raw_data.strip():
@@ -10,9 +10,13 @@ import numpy as np
 import uuid
 import serial
 import threading
-import re
+import queue
 import math
+import random
+import atexit
+from collections import OrderedDict
 from dotenv import load_dotenv
+from radar_parser import parse_frame, SerialFrameAssembler
 
 # Configuração básica de logging
 logging.basicConfig(
@@ -36,6 +40,7 @@ SERIAL_CONFIG = {
     'baudrate': int(os.getenv('SERIAL_BAUDRATE', 115200))
 }
 RANGE_STEP = 2.5
+SERIAL_READ_BUFFER_SIZE = int(os.getenv('SERIAL_READ_BUFFER_SIZE', 8192))
 
 class GoogleSheetsManager:
     def __init__(self, creds_path, spreadsheet_name, worksheet_name='Sheet1'):
@@ -70,30 +75,35 @@ class GoogleSheetsManager:
             logger.error(f"❌ [GSHEETS_INIT] Erro ao acessar worksheet: {str(e)}")
             raise
 
+    @staticmethod
+    def build_row(data):
+        """Monta a linha da planilha na ordem das colunas"""
+        return [
+            data.get('session_id'),
+            data.get('timestamp'),
+            data.get('x_point'),
+            data.get('y_point'),
+            data.get('move_speed'),
+            data.get('heart_rate'),
+            data.get('breath_rate'),
+            data.get('distance'),
+            data.get('section_id'),
+            data.get('product_id'),
+            data.get('satisfaction_score'),
+            data.get('satisfaction_class'),
+            data.get('is_engaged'),
+            # Novos campos emocionais
+            data.get('emotional_state'),
+            data.get('emotional_score'),
+            data.get('emotional_confidence'),
+            data.get('hrv_value'),
+            data.get('breath_regularity'),
+            data.get('heart_trend')
+        ]
+
     def insert_radar_data(self, data):
         try:
-            row = [
-                data.get('session_id'),
-                data.get('timestamp'),
-                data.get('x_point'),
-                data.get('y_point'),
-                data.get('move_speed'),
-                data.get('heart_rate'),
-                data.get('breath_rate'),
-                data.get('distance'),
-                data.get('section_id'),
-                data.get('product_id'),
-                data.get('satisfaction_score'),
-                data.get('satisfaction_class'),
-                data.get('is_engaged'),
-                # Novos campos emocionais
-                data.get('emotional_state'),
-                data.get('emotional_score'),
-                data.get('emotional_confidence'),
-                data.get('hrv_value'),
-                data.get('breath_regularity'),
-                data.get('heart_trend')
-            ]
+            row = self.build_row(data)
             
             # Verificar se há valores None ou problemáticos
             problematic_values = []
@@ -122,7 +132,7 @@ class GoogleSheetsManager:
             error_msg = str(e).lower()
             if 'quota' in error_msg or 'rate' in error_msg:
                 logger.error(f'❌ [GSHEETS] Erro de limite de taxa da API! Aguarde antes de tentar novamente.')
-                logger.error(f'❌ [GSHEETS] Considere adicionar delays entre as requisições.')
+                logger.error(f'❌ [GSHEETS] Para fluxo contínuo use o envio em lote (SheetsBatchSink).')
             elif 'permission' in error_msg or 'forbidden' in error_msg:
                 logger.error(f'❌ [GSHEETS] Erro de permissão! Verifique as credenciais e permissões da planilha.')
             elif 'not found' in error_msg:
@@ -135,56 +145,208 @@ class GoogleSheetsManager:
             logger.error(traceback.format_exc())
             return False
 
+class TokenBucket:
+    """
+    Limitador token bucket: rate tokens por segundo, acumulando no máximo capacity
+    acquire() bloqueia até haver um token disponível
+    """
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.last_refill = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+                self.last_refill = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+def is_rate_limit_error(error):
+    """Identifica erro 429 / quota excedida da API do Google Sheets"""
+    response = getattr(error, 'response', None)
+    if getattr(response, 'status_code', None) == 429:
+        return True
+    error_msg = str(error).lower()
+    return '429' in error_msg or 'quota' in error_msg or 'rate limit' in error_msg
+
+class SheetsBatchSink:
+    """
+    Sink em lote para o Google Sheets
+    insert_radar_data apenas bufferiza a linha; uma thread envia os lotes com append_rows,
+    respeitando a cota da API (token bucket) e com backoff exponencial em erros 429
+    """
+    def __init__(self, worksheet, batch_size=100, flush_interval=5.0, requests_per_minute=60, max_retries=5):
+        self.worksheet = worksheet
+        self.BATCH_SIZE = batch_size
+        self.FLUSH_INTERVAL = flush_interval
+        self.MAX_RETRIES = max_retries
+        self.BACKOFF_BASE = 1.0
+        self.BACKOFF_MAX = 64.0
+        self.MAX_PENDING = batch_size * 50
+        # Cota por minuto convertida em tokens por segundo; rajada de até 1/6 da cota
+        self.limiter = TokenBucket(requests_per_minute / 60.0, max(1, requests_per_minute // 6))
+        
+        self._buffer = []
+        self._buffer_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._flush_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.stats = {
+            'rows_buffered': 0,
+            'rows_sent': 0,
+            'rows_dropped': 0,
+            'requests': 0,
+            'rate_limited': 0,
+            'failures': 0
+        }
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._flush_loop, name="sheets-sink")
+        self._thread.daemon = True
+        self._thread.start()
+        atexit.register(self.stop)
+        logger.info(f"✅ [GSHEETS] Envio em lote ativo ({self.BATCH_SIZE} linhas ou {self.FLUSH_INTERVAL}s por lote)")
+
+    def stop(self, timeout=30):
+        """Encerra a thread e envia o que restou no buffer"""
+        if not self._thread:
+            return
+        self._stop_event.set()
+        self._flush_event.set()
+        self._thread.join(timeout=timeout)
+        alive = self._thread.is_alive()
+        self._thread = None
+        
+        # Thread ainda presa num envio: o flush final esperaria o _flush_lock e travaria o encerramento
+        if alive:
+            logger.warning(f"⚠️ [GSHEETS] Envio em andamento após {timeout}s; {len(self._buffer)} linhas pendentes não enviadas")
+            return
+        
+        if self._buffer:
+            logger.info(f"[GSHEETS] Enviando {len(self._buffer)} linhas pendentes antes de encerrar...")
+            self.flush()
+
+    def insert_radar_data(self, data):
+        """Bufferiza a linha; NaN/inf viram None para não invalidar o JSON do lote"""
+        row = [None if isinstance(value, float) and not math.isfinite(value) else value
+               for value in GoogleSheetsManager.build_row(data)]
+        with self._buffer_lock:
+            self._buffer.append(row)
+            self.stats['rows_buffered'] += 1
+            full = len(self._buffer) >= self.BATCH_SIZE
+        if full:
+            self._flush_event.set()
+        return True
+
+    def _flush_loop(self):
+        """Envia lotes quando o buffer enche ou a cada FLUSH_INTERVAL segundos"""
+        while not self._stop_event.is_set():
+            self._flush_event.wait(self.FLUSH_INTERVAL)
+            self._flush_event.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"❌ [GSHEETS] Erro no envio em lote: {str(e)}")
+                logger.error(traceback.format_exc())
+
+    def flush(self):
+        """
+        Envia o buffer em lotes de até BATCH_SIZE linhas
+        Retorna: número de linhas enviadas
+        """
+        sent = 0
+        # Um flush por vez para preservar a ordem das linhas
+        with self._flush_lock:
+            while True:
+                with self._buffer_lock:
+                    rows = self._buffer[:self.BATCH_SIZE]
+                    del self._buffer[:self.BATCH_SIZE]
+                if not rows:
+                    return sent
+                if not self._send_batch(rows):
+                    # Devolver as linhas ao início do buffer para a próxima tentativa
+                    with self._buffer_lock:
+                        self._buffer[:0] = rows
+                        overflow = len(self._buffer) - self.MAX_PENDING
+                        if overflow > 0:
+                            del self._buffer[:overflow]
+                            self.stats['rows_dropped'] += overflow
+                            logger.warning(f"⚠️ [GSHEETS] Buffer cheio, {overflow} linhas mais antigas descartadas")
+                    return sent
+                sent += len(rows)
+
+    def _send_batch(self, rows):
+        """append_rows com limitador de taxa e backoff exponencial (com jitter) em erros 429"""
+        for attempt in range(self.MAX_RETRIES + 1):
+            self.limiter.acquire()
+            try:
+                self.worksheet.append_rows(rows, value_input_option='RAW')
+                with self._buffer_lock:
+                    self.stats['requests'] += 1
+                    self.stats['rows_sent'] += len(rows)
+                logger.info(f"✅ [GSHEETS] Lote de {len(rows)} linhas enviado")
+                return True
+            except Exception as e:
+                rate_limited = is_rate_limit_error(e)
+                with self._buffer_lock:
+                    self.stats['requests'] += 1
+                    self.stats['rate_limited' if rate_limited else 'failures'] += 1
+                # Encerrando: uma única tentativa, sem backoff (as linhas ficam no buffer)
+                if attempt == self.MAX_RETRIES or self._stop_event.is_set():
+                    logger.error(f"❌ [GSHEETS] Falha ao enviar lote de {len(rows)} linhas: {str(e)}")
+                    return False
+                delay = min(self.BACKOFF_MAX, self.BACKOFF_BASE * (2 ** attempt)) * random.uniform(0.5, 1.0)
+                if rate_limited:
+                    logger.warning(f"⚠️ [GSHEETS] Limite de taxa da API (429), nova tentativa em {delay:.1f}s")
+                else:
+                    logger.warning(f"⚠️ [GSHEETS] Erro ao enviar lote ({str(e)}), nova tentativa em {delay:.1f}s")
+                # Espera interrompível: stop() não fica preso atrás de um backoff longo
+                self._stop_event.wait(delay)
+        return False
+
+    def get_stats(self):
+        with self._buffer_lock:
+            stats = dict(self.stats)
+            stats['pending'] = len(self._buffer)
+        return stats
+
 def parse_serial_data(raw_data):
     try:
-        # Verificação detalhada dos marcadores
-        has_human_detected = '-----Human Detected-----' in raw_data
-        has_target_1 = 'Target 1:' in raw_data
-        
-        # Regex ainda mais tolerante: aceita espaços extras, quebras de linha e maiúsculas/minúsculas
-        x_pattern = r'x_point\s*:\s*([-+]?\d*\.?\d+)'  # aceita inteiro ou float, sinal opcional
-        y_pattern = r'y_point\s*:\s*([-+]?\d*\.?\d+)'
-        dop_pattern = r'dop_index\s*:\s*([-+]?\d+)'  # aceita sinal opcional
-        cluster_pattern = r'cluster_index\s*:\s*(\d+)'
-        speed_pattern = r'move_speed\s*:\s*([-+]?\d*\.?\d+)\s*cm/s'
-        total_phase_pattern = r'total_phase\s*:\s*([-+]?\d*\.?\d+)'
-        breath_phase_pattern = r'breath_phase\s*:\s*([-+]?\d*\.?\d+)'
-        heart_phase_pattern = r'heart_phase\s*:\s*([-+]?\d*\.?\d+)'
-        breath_rate_pattern = r'breath_rate\s*:\s*([-+]?\d*\.?\d+)'
-        heart_rate_pattern = r'heart_rate\s*:\s*([-+]?\d*\.?\d+)'
-        distance_pattern = r'distance\s*:\s*([-+]?\d*\.?\d+)'
-        
-        # Usar flags re.IGNORECASE para aceitar maiúsculas/minúsculas
-        if '-----Human Detected-----' not in raw_data:
-            return None
-        if 'Target 1:' not in raw_data:
-            return None
+        if isinstance(raw_data, dict):
+            # Frame de um pacote binário, já decodificado pelo SerialFrameAssembler
+            fields = raw_data
+        else:
+            # Parser de passada única compartilhado (radar_parser.py); aceita maiúsculas/minúsculas
+            frame = parse_frame(raw_data)
+            if not frame.human_detected or not frame.target_found:
+                return None
+            fields = frame.to_dict()
             
-        x_match = re.search(x_pattern, raw_data, re.IGNORECASE)
-        y_match = re.search(y_pattern, raw_data, re.IGNORECASE)
-        dop_match = re.search(dop_pattern, raw_data, re.IGNORECASE)
-        cluster_match = re.search(cluster_pattern, raw_data, re.IGNORECASE)
-        speed_match = re.search(speed_pattern, raw_data, re.IGNORECASE)
-        total_phase_match = re.search(total_phase_pattern, raw_data, re.IGNORECASE)
-        breath_phase_match = re.search(breath_phase_pattern, raw_data, re.IGNORECASE)
-        heart_phase_match = re.search(heart_phase_pattern, raw_data, re.IGNORECASE)
-        breath_rate_match = re.search(breath_rate_pattern, raw_data, re.IGNORECASE)
-        heart_rate_match = re.search(heart_rate_pattern, raw_data, re.IGNORECASE)
-        distance_match = re.search(distance_pattern, raw_data, re.IGNORECASE)
-        
-        if x_match and y_match:
+        if fields.get('x_point') is not None and fields.get('y_point') is not None:
             data = {
-                'x_point': float(x_match.group(1)),
-                'y_point': float(y_match.group(1)),
-                'dop_index': int(dop_match.group(1)) if dop_match else 0,
-                'cluster_index': int(cluster_match.group(1)) if cluster_match else 0,
-                'move_speed': float(speed_match.group(1))/100 if speed_match else 0.0,
-                'total_phase': float(total_phase_match.group(1)) if total_phase_match else 0.0,
-                'breath_phase': float(breath_phase_match.group(1)) if breath_phase_match else 0.0,
-                'heart_phase': float(heart_phase_match.group(1)) if heart_phase_match else 0.0,
-                'breath_rate': float(breath_rate_match.group(1)) if breath_rate_match else None,
-                'heart_rate': float(heart_rate_match.group(1)) if heart_rate_match else None,
-                'distance': float(distance_match.group(1)) if distance_match else None
+                'x_point': fields['x_point'],
+                'y_point': fields['y_point'],
+                'dop_index': fields.get('dop_index') or 0,
+                'cluster_index': fields.get('cluster_index') or 0,
+                'move_speed': fields['move_speed']/100 if fields.get('move_speed') is not None else 0.0,
+                'total_phase': fields.get('total_phase') or 0.0,
+                'breath_phase': fields.get('breath_phase') or 0.0,
+                'heart_phase': fields.get('heart_phase') or 0.0,
+                'breath_rate': fields.get('breath_rate'),
+                'heart_rate': fields.get('heart_rate'),
+                'distance': fields.get('distance')
             }
             
             if data['distance'] is None:
@@ -335,15 +497,170 @@ class AnalyticsManager:
             logger.error(f"Erro ao calcular satisfação: {str(e)}")
             return (50.0, "NEUTRA")
 
+class RingBuffer:
+    """
+    Buffer circular de floats pré-alocado
+    Substitui listas com append/pop(0): memória fixa e inserção O(1); None vira NaN
+    """
+    def __init__(self, size):
+        self.size = size
+        self.data = np.zeros(size, dtype=np.float64)
+        self.count = 0
+        self.position = 0
+
+    def append(self, value):
+        self.data[self.position] = np.nan if value is None else value
+        self.position = (self.position + 1) % self.size
+        if self.count < self.size:
+            self.count += 1
+
+    def values(self):
+        """Valores em ordem cronológica (mais antigo primeiro)"""
+        if self.count < self.size:
+            return self.data[:self.count]
+        return np.concatenate((self.data[self.position:], self.data[:self.position]))
+
+    def __len__(self):
+        return self.count
+
+class StreamingWindowStats:
+    """
+    Estatísticas de janela deslizante (média, desvio padrão e inclinação linear) em O(1)
+    Mantém somas acumuladas de y, y², t, t² e t*y sobre um buffer circular; o tempo é
+    guardado relativo a uma origem para não perder precisão com timestamps epoch
+    """
+    def __init__(self, size):
+        self.size = size
+        self.times = np.zeros(size, dtype=np.float64)
+        self.values = np.zeros(size, dtype=np.float64)
+        self.count = 0
+        self.position = 0
+        self.origin = None
+        self.updates = 0
+        self.RESYNC_INTERVAL = 100 * size  # Recalcular somas para evitar deriva numérica
+        self._reset_sums()
+
+    def _reset_sums(self):
+        self.sum_y = 0.0
+        self.sum_y2 = 0.0
+        self.sum_t = 0.0
+        self.sum_t2 = 0.0
+        self.sum_ty = 0.0
+
+    def push(self, timestamp, value):
+        if self.origin is None:
+            self.origin = timestamp
+        t = timestamp - self.origin
+        if self.count == self.size:
+            old_t = self.times[self.position]
+            old_y = self.values[self.position]
+            self.sum_y -= old_y
+            self.sum_y2 -= old_y * old_y
+            self.sum_t -= old_t
+            self.sum_t2 -= old_t * old_t
+            self.sum_ty -= old_t * old_y
+        else:
+            self.count += 1
+        self.times[self.position] = t
+        self.values[self.position] = value
+        self.sum_y += value
+        self.sum_y2 += value * value
+        self.sum_t += t
+        self.sum_t2 += t * t
+        self.sum_ty += t * value
+        self.position = (self.position + 1) % self.size
+        self.updates += 1
+        if self.updates >= self.RESYNC_INTERVAL:
+            self._resync()
+
+    def _resync(self):
+        """Rebase da origem na amostra mais antiga e recálculo exato das somas"""
+        self.updates = 0
+        oldest = self.position if self.count == self.size else 0
+        shift = self.times[oldest]
+        self.origin += shift
+        t = self.times[:self.count] if self.count < self.size else self.times
+        y = self.values[:self.count] if self.count < self.size else self.values
+        t -= shift
+        self.sum_y = float(np.sum(y))
+        self.sum_y2 = float(np.dot(y, y))
+        self.sum_t = float(np.sum(t))
+        self.sum_t2 = float(np.dot(t, t))
+        self.sum_ty = float(np.dot(t, y))
+
+    def mean(self):
+        return self.sum_y / self.count if self.count else 0.0
+
+    def std(self):
+        """Desvio padrão populacional (mesmo que np.std)"""
+        if not self.count:
+            return 0.0
+        mean = self.sum_y / self.count
+        return math.sqrt(max(self.sum_y2 / self.count - mean * mean, 0.0))
+
+    def slope(self):
+        """Inclinação da reta de mínimos quadrados de y em função de t (mesmo que np.polyfit grau 1)"""
+        n = self.count
+        denominator = n * self.sum_t2 - self.sum_t * self.sum_t
+        if n < 2 or denominator <= 0:
+            return 0.0
+        return (n * self.sum_ty - self.sum_t * self.sum_y) / denominator
+
+    def __len__(self):
+        return self.count
+
+class SpectralRateEstimator:
+    """
+    Estimador de frequência dominante restrito a uma banda (ex.: 40-140 bpm)
+    Pré-calcula, por tamanho de janela, a base DFT já multiplicada pela janela de Hanning
+    apenas para os bins dentro da banda: cada quadro custa um produto N x K (K = bins na banda)
+    em vez de montar arrays, recalcular a janela e rodar uma FFT completa
+    """
+    def __init__(self, sample_rate, min_freq, max_freq):
+        self.sample_rate = sample_rate
+        self.min_freq = min_freq
+        self.max_freq = max_freq
+        self._bases = {}
+
+    def _basis(self, n):
+        """Base (janela * exp) e frequências dos bins da banda para n amostras, com cache"""
+        cached = self._bases.get(n)
+        if cached is None:
+            freqs = np.fft.rfftfreq(n, d=1 / self.sample_rate)
+            band = np.where((freqs >= self.min_freq) & (freqs <= self.max_freq))[0]
+            if len(band) == 0:
+                cached = (None, None, None)
+            else:
+                window = np.hanning(n)
+                basis = window * np.exp(-2j * np.pi * np.outer(band, np.arange(n)) / n)
+                cached = (basis, basis.sum(axis=1), freqs[band])
+            self._bases[n] = cached
+        return cached
+
+    def estimate(self, samples, rate_multiplier):
+        """Taxa dominante (freq * multiplicador) ou None se não houver pico claro na banda"""
+        n = len(samples)
+        if n == 0:
+            return None
+        basis, basis_sum, band_freqs = self._basis(n)
+        if basis is None:
+            return None
+        # Remover a média equivale a subtrair média * soma da base em cada bin
+        magnitude_spectrum = np.abs(basis @ samples - np.mean(samples) * basis_sum)
+        peak_idx = np.argmax(magnitude_spectrum)
+        if magnitude_spectrum[peak_idx] < 1.5 * np.mean(magnitude_spectrum):
+            return None
+        return round(abs(band_freqs[peak_idx] * rate_multiplier), 1)
+
 class VitalSignsManager:
     def __init__(self):
         self.SAMPLE_RATE = 20
-        self.heart_phase_buffer = []
-        self.breath_phase_buffer = []
-        self.quality_buffer = []
         self.HEART_BUFFER_SIZE = 20
         self.BREATH_BUFFER_SIZE = 30
+        self.heart_phase_buffer = RingBuffer(self.HEART_BUFFER_SIZE)
+        self.breath_phase_buffer = RingBuffer(self.BREATH_BUFFER_SIZE)
         self.QUALITY_BUFFER_SIZE = 10
+        self.quality_buffer = RingBuffer(self.QUALITY_BUFFER_SIZE)
         self.last_heart_rate = None
         self.last_breath_rate = None
         self.last_quality_score = 0
@@ -353,9 +670,19 @@ class VitalSignsManager:
             'heart_rate': (40, 140),
             'breath_rate': (8, 25)
         }
-        self.heart_rate_history = []
-        self.breath_rate_history = []
         self.HISTORY_SIZE = 10
+        self.heart_rate_history = RingBuffer(self.HISTORY_SIZE)
+        self.breath_rate_history = RingBuffer(self.HISTORY_SIZE)
+        self.heart_estimator = SpectralRateEstimator(
+            self.SAMPLE_RATE,
+            self.VALID_RANGES['heart_rate'][0] / 60,
+            self.VALID_RANGES['heart_rate'][1] / 60
+        )
+        self.breath_estimator = SpectralRateEstimator(
+            self.SAMPLE_RATE,
+            self.VALID_RANGES['breath_rate'][0] / 60,
+            self.VALID_RANGES['breath_rate'][1] / 60
+        )
 
     def calculate_signal_quality(self, phase_data, distance):
         try:
@@ -387,10 +714,7 @@ class VitalSignsManager:
                            amplitude_score * 0.3)
                            
             self.quality_buffer.append(quality_score)
-            if len(self.quality_buffer) > self.QUALITY_BUFFER_SIZE:
-                self.quality_buffer.pop(0)
-                
-            self.last_quality_score = np.mean(self.quality_buffer)
+            self.last_quality_score = np.mean(self.quality_buffer.values())
             return self.last_quality_score
             
         except Exception as e:
@@ -399,7 +723,7 @@ class VitalSignsManager:
 
     def calculate_vital_signs(self, total_phase, breath_phase, heart_phase, distance):
         try:
-            # Converter os valores de fase para listas se forem floats
+            # Aceitar tanto o valor escalar da serial quanto listas de fase
             if isinstance(heart_phase, (int, float)):
                 heart_phase = [heart_phase]
             if isinstance(breath_phase, (int, float)):
@@ -408,30 +732,14 @@ class VitalSignsManager:
             quality_score = self.calculate_signal_quality(heart_phase, distance)
             if quality_score < self.MIN_QUALITY_SCORE:
                 return None, None
-            self.heart_phase_buffer.append(heart_phase)
-            self.breath_phase_buffer.append(breath_phase)
-            while len(self.heart_phase_buffer) > self.HEART_BUFFER_SIZE:
-                self.heart_phase_buffer.pop(0)
-            while len(self.breath_phase_buffer) > self.BREATH_BUFFER_SIZE:
-                self.breath_phase_buffer.pop(0)
+            for value in heart_phase:
+                self.heart_phase_buffer.append(value)
+            for value in breath_phase:
+                self.breath_phase_buffer.append(value)
             if len(self.heart_phase_buffer) < self.HEART_BUFFER_SIZE * 0.7:
                 return None, None
-            heart_weights = np.hamming(len(self.heart_phase_buffer))
-            breath_weights = np.hamming(len(self.breath_phase_buffer))
-            heart_smooth = np.average(self.heart_phase_buffer, weights=heart_weights)
-            breath_smooth = np.average(self.breath_phase_buffer, weights=breath_weights)
-            heart_rate = self._calculate_rate_from_phase(
-                self.heart_phase_buffer,
-                min_freq=self.VALID_RANGES['heart_rate'][0]/60,
-                max_freq=self.VALID_RANGES['heart_rate'][1]/60,
-                rate_multiplier=60
-            )
-            breath_rate = self._calculate_rate_from_phase(
-                self.breath_phase_buffer,
-                min_freq=self.VALID_RANGES['breath_rate'][0]/60,
-                max_freq=self.VALID_RANGES['breath_rate'][1]/60,
-                rate_multiplier=60
-            )
+            heart_rate = self._calculate_rate_from_phase(self.heart_phase_buffer, self.heart_estimator)
+            breath_rate = self._calculate_rate_from_phase(self.breath_phase_buffer, self.breath_estimator)
             if heart_rate:
                 if self.last_heart_rate:
                     rate_change = abs(heart_rate - self.last_heart_rate) / self.last_heart_rate
@@ -442,8 +750,6 @@ class VitalSignsManager:
                 else:
                     self.last_heart_rate = heart_rate
                 self.heart_rate_history.append(heart_rate)
-                if len(self.heart_rate_history) > self.HISTORY_SIZE:
-                    self.heart_rate_history.pop(0)
             if breath_rate:
                 if self.last_breath_rate:
                     rate_change = abs(breath_rate - self.last_breath_rate) / self.last_breath_rate
@@ -454,36 +760,15 @@ class VitalSignsManager:
                 else:
                     self.last_breath_rate = breath_rate
                 self.breath_rate_history.append(breath_rate)
-                if len(self.breath_rate_history) > self.HISTORY_SIZE:
-                    self.breath_rate_history.pop(0)
             return heart_rate, breath_rate
         except Exception as e:
             logger.error(f"Erro ao calcular sinais vitais: {str(e)}")
             logger.error(traceback.format_exc())
             return None, None
 
-    def _calculate_rate_from_phase(self, phase_data, min_freq, max_freq, rate_multiplier):
+    def _calculate_rate_from_phase(self, phase_buffer, estimator, rate_multiplier=60):
         try:
-            if not phase_data:
-                return None
-            phase_mean = np.mean(phase_data)
-            centered_phase = np.array(phase_data) - phase_mean
-            window = np.hanning(len(centered_phase))
-            windowed_phase = centered_phase * window
-            fft_result = np.fft.fft(windowed_phase)
-            fft_freq = np.fft.fftfreq(len(windowed_phase), d=1/self.SAMPLE_RATE)
-            valid_idx = np.where((fft_freq >= min_freq) & (fft_freq <= max_freq))[0]
-            if len(valid_idx) == 0:
-                return None
-            magnitude_spectrum = np.abs(fft_result[valid_idx])
-            peak_idx = np.argmax(magnitude_spectrum)
-            dominant_freq = fft_freq[valid_idx[peak_idx]]
-            peak_magnitude = magnitude_spectrum[peak_idx]
-            avg_magnitude = np.mean(magnitude_spectrum)
-            if peak_magnitude < 1.5 * avg_magnitude:
-                return None
-            rate = abs(dominant_freq * rate_multiplier)
-            return round(rate, 1)
+            return estimator.estimate(phase_buffer.values(), rate_multiplier)
         except Exception as e:
             logger.error(f"Erro ao calcular taxa a partir da fase: {str(e)}")
             return None
@@ -497,12 +782,10 @@ class EmotionalStateAnalyzer:
         # Parâmetros baseados no estudo científico
         self.HRV_WINDOW_SIZE = 30  # 30 segundos para cálculo de HRV
         self.BREATH_WINDOW_SIZE = 20  # 20 segundos para análise respiratória
-        self.EMOTION_UPDATE_INTERVAL = 5  # Atualização a cada 5 segundos
         
-        # Buffers para armazenar histórico
-        self.heart_rate_buffer = []
-        self.breath_rate_buffer = []
-        self.timestamp_buffer = []
+        # Estatísticas de janela deslizante: métricas atualizadas a cada quadro em O(1)
+        self.heart_rate_stats = StreamingWindowStats(self.HRV_WINDOW_SIZE)
+        self.breath_rate_stats = StreamingWindowStats(self.BREATH_WINDOW_SIZE)
         
         # Limites baseados no estudo
         self.POSITIVE_HRV_THRESHOLD = 0.15  # 15% de variação = positivo
@@ -521,23 +804,22 @@ class EmotionalStateAnalyzer:
         self.breath_regularity = 0.0
         self.heart_rate_trend = 0.0
         
-    def calculate_hrv(self, heart_rates, timestamps):
+    def calculate_hrv(self):
         """
         Calcula a Heart Rate Variability (HRV) baseada na variação dos batimentos
         """
-        if len(heart_rates) < 3:
+        if len(self.heart_rate_stats) < 3:
             return 0.0
             
         try:
             # Calcula a variação percentual dos batimentos
-            heart_rate_array = np.array(heart_rates)
-            mean_hr = np.mean(heart_rate_array)
+            mean_hr = self.heart_rate_stats.mean()
             
             if mean_hr == 0:
                 return 0.0
                 
             # Calcula o coeficiente de variação (CV = std/mean)
-            hrv_cv = np.std(heart_rate_array) / mean_hr
+            hrv_cv = self.heart_rate_stats.std() / mean_hr
             
             # Normaliza para uma escala de 0-1
             hrv_normalized = min(hrv_cv, 0.3) / 0.3  # Máximo 30% de variação
@@ -548,19 +830,17 @@ class EmotionalStateAnalyzer:
             logger.error(f"Erro ao calcular HRV: {str(e)}")
             return 0.0
     
-    def calculate_breath_regularity(self, breath_rates):
+    def calculate_breath_regularity(self):
         """
         Calcula a regularidade da respiração baseada na consistência dos valores
         """
-        if len(breath_rates) < 3:
+        if len(self.breath_rate_stats) < 3:
             return 0.0
             
         try:
-            breath_array = np.array(breath_rates)
-            
             # Calcula a consistência (inverso da variância)
-            breath_std = np.std(breath_array)
-            breath_mean = np.mean(breath_array)
+            breath_std = self.breath_rate_stats.std()
+            breath_mean = self.breath_rate_stats.mean()
             
             if breath_mean == 0:
                 return 0.0
@@ -575,24 +855,16 @@ class EmotionalStateAnalyzer:
             logger.error(f"Erro ao calcular regularidade respiratória: {str(e)}")
             return 0.0
     
-    def calculate_heart_rate_trend(self, heart_rates, timestamps):
+    def calculate_heart_rate_trend(self):
         """
         Calcula a tendência dos batimentos cardíacos (aumento/diminuição)
         """
-        if len(heart_rates) < 2:
+        if len(self.heart_rate_stats) < 2:
             return 0.0
             
         try:
-            # Calcula a tendência linear
-            heart_array = np.array(heart_rates)
-            time_array = np.array(timestamps)
-            
-            # Normaliza o tempo para segundos
-            time_normalized = time_array - time_array[0]
-            
-            # Ajuste linear
-            coeffs = np.polyfit(time_normalized, heart_array, 1)
-            slope = coeffs[0]
+            # Inclinação da reta de mínimos quadrados (BPM por segundo)
+            slope = self.heart_rate_stats.slope()
             
             # Normaliza a tendência
             trend_normalized = np.tanh(slope / 10)  # Usa tanh para limitar entre -1 e 1
@@ -675,47 +947,36 @@ class EmotionalStateAnalyzer:
     
     def update_emotional_state(self, heart_rate, breath_rate):
         """
-        Atualiza o estado emocional com novos dados fisiológicos
+        Atualiza o estado emocional com novos dados fisiológicos (a cada quadro, O(1))
         """
         current_time = time.time()
         
-        # Adiciona novos dados aos buffers
-        self.heart_rate_buffer.append(heart_rate)
-        self.breath_rate_buffer.append(breath_rate)
-        self.timestamp_buffer.append(current_time)
-        
-        # Mantém apenas os dados mais recentes
-        while len(self.heart_rate_buffer) > self.HRV_WINDOW_SIZE:
-            self.heart_rate_buffer.pop(0)
-            self.timestamp_buffer.pop(0)
-        
-        while len(self.breath_rate_buffer) > self.BREATH_WINDOW_SIZE:
-            self.breath_rate_buffer.pop(0)
-        
-        # Atualiza a cada 5 segundos
-        if current_time - self.last_emotion_update >= self.EMOTION_UPDATE_INTERVAL:
-            if len(self.heart_rate_buffer) >= 3 and len(self.breath_rate_buffer) >= 3:
-                # Calcula métricas
-                self.current_hrv = self.calculate_hrv(self.heart_rate_buffer, self.timestamp_buffer)
-                self.breath_regularity = self.calculate_breath_regularity(self.breath_rate_buffer)
-                self.heart_rate_trend = self.calculate_heart_rate_trend(self.heart_rate_buffer, self.timestamp_buffer)
-                
-                # Classifica estado emocional
-                emotional_state, score, confidence = self.classify_emotional_state(
-                    self.current_hrv,
-                    self.breath_regularity,
-                    self.heart_rate_trend,
-                    heart_rate,
-                    breath_rate
-                )
-                
-                self.current_emotional_state = emotional_state
-                self.emotional_confidence = confidence
-                self.last_emotion_update = current_time
-                
-                return emotional_state, score, confidence
+        # Adiciona novos dados às janelas deslizantes
+        self.heart_rate_stats.push(current_time, heart_rate)
+        self.breath_rate_stats.push(current_time, breath_rate)
+        
+        if len(self.heart_rate_stats) < 3 or len(self.breath_rate_stats) < 3:
+            return self.current_emotional_state, 0.0, self.emotional_confidence
         
-        return self.current_emotional_state, 0.0, self.emotional_confidence
+        # Calcula métricas
+        self.current_hrv = self.calculate_hrv()
+        self.breath_regularity = self.calculate_breath_regularity()
+        self.heart_rate_trend = self.calculate_heart_rate_trend()
+        
+        # Classifica estado emocional
+        emotional_state, score, confidence = self.classify_emotional_state(
+            self.current_hrv,
+            self.breath_regularity,
+            self.heart_rate_trend,
+            heart_rate,
+            breath_rate
+        )
+        
+        self.current_emotional_state = emotional_state
+        self.emotional_confidence = confidence
+        self.last_emotion_update = current_time
+        
+        return emotional_state, score, confidence
     
     def get_emotional_insights(self):
         """
@@ -727,11 +988,170 @@ class EmotionalStateAnalyzer:
             'hrv': self.current_hrv,
             'breath_regularity': self.breath_regularity,
             'heart_trend': self.heart_rate_trend,
-            'data_points': len(self.heart_rate_buffer)
+            'data_points': len(self.heart_rate_stats)
         }
         
         return insights
 
+class TargetSignalState:
+    """Estado de sinais vitais e emocional de um único alvo (sessão/pessoa)"""
+    def __init__(self, target_id):
+        self.target_id = target_id
+        self.vital_signs = VitalSignsManager()
+        self.emotional = EmotionalStateAnalyzer()
+        self.last_seen = time.time()
+
+class SignalStateRegistry:
+    """
+    Registro de estados de sinais vitais por alvo, criados sob demanda
+    Cada pessoa tem seus próprios buffers; estados ociosos há mais de IDLE_TTL segundos
+    são descartados e, acima de MAX_TARGETS, sai o usado há mais tempo (LRU)
+    """
+    def __init__(self, max_targets=32, idle_ttl=120):
+        self.MAX_TARGETS = max_targets
+        self.IDLE_TTL = idle_ttl  # segundos
+        self.states = OrderedDict()  # {target_id: TargetSignalState}, do menos ao mais recente
+        self.lock = threading.Lock()
+        
+        # Contadores para monitoramento
+        self.created = 0
+        self.evicted_idle = 0
+        self.evicted_lru = 0
+
+    def get(self, target_id):
+        """Retorna o estado do alvo, criando-o na primeira vez que é visto"""
+        now = time.time()
+        with self.lock:
+            state = self.states.get(target_id)
+            if state is None:
+                state = TargetSignalState(target_id)
+                self.states[target_id] = state
+                self.created += 1
+                logger.debug(f"Estado de sinais vitais criado para {target_id}")
+            else:
+                self.states.move_to_end(target_id)
+            state.last_seen = now
+            self._evict(now)
+            return state
+
+    def _evict(self, now):
+        """Remove estados ociosos e aplica o limite de alvos (chamado com o lock)"""
+        # O OrderedDict está em ordem de uso: os ociosos ficam no início
+        while self.states:
+            oldest = next(iter(self.states.values()))
+            if now - oldest.last_seen <= self.IDLE_TTL:
+                break
+            self.states.popitem(last=False)
+            self.evicted_idle += 1
+            
+        while len(self.states) > self.MAX_TARGETS:
+            self.states.popitem(last=False)
+            self.evicted_lru += 1
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                'active_targets': len(self.states),
+                'max_targets': self.MAX_TARGETS,
+                'created': self.created,
+                'evicted_idle': self.evicted_idle,
+                'evicted_lru': self.evicted_lru
+            }
+
+class PipelineStage:
+    """
+    Estágio com fila limitada e uma thread consumidora
+    O produtor nunca bloqueia: com a fila cheia o item mais antigo é descartado (e contado),
+    mantendo a leitura da serial livre mesmo com o consumidor lento
+    """
+    def __init__(self, name, handler, max_size):
+        self.name = name
+        self.handler = handler
+        self.queue = queue.Queue(maxsize=max_size)
+        self.thread = None
+        self.is_running = False
+        
+        # Contadores para monitoramento
+        self.stats_lock = threading.Lock()
+        self.enqueued = 0
+        self.dropped = 0
+        self.processed = 0
+        self.failed = 0
+
+    def start(self):
+        self.is_running = True
+        self.thread = threading.Thread(target=self._worker_loop, name=f"stage-{self.name}")
+        self.thread.daemon = True
+        self.thread.start()
+        logger.info(f"✅ Estágio '{self.name}' iniciado (capacidade {self.queue.maxsize})")
+
+    def put(self, item):
+        """Enfileira sem bloquear; retorna False se precisou descartar o item mais antigo"""
+        dropped = False
+        while True:
+            try:
+                self.queue.put_nowait(item)
+                break
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                    self.queue.task_done()
+                    dropped = True
+                    with self.stats_lock:
+                        self.dropped += 1
+                except queue.Empty:
+                    pass
+        with self.stats_lock:
+            self.enqueued += 1
+            total_dropped = self.dropped
+        if dropped and total_dropped % 100 == 1:
+            # Loga o primeiro descarte e depois a cada 100 para não inundar o log
+            logger.warning(f"⚠️ Fila '{self.name}' cheia, item mais antigo descartado (total: {total_dropped})")
+        return not dropped
+
+    def _worker_loop(self):
+        while True:
+            item = self.queue.get()
+            try:
+                if item is None:
+                    return
+                self.handler(item)
+                with self.stats_lock:
+                    self.processed += 1
+            except Exception as e:
+                with self.stats_lock:
+                    self.failed += 1
+                logger.error(f"❌ Erro no estágio '{self.name}': {str(e)}")
+                logger.error(traceback.format_exc())
+            finally:
+                self.queue.task_done()
+
+    def stop(self, timeout=10):
+        """Processa o que restou na fila e encerra a thread"""
+        if not self.is_running:
+            return
+        self.is_running = False
+        deadline = time.time() + timeout
+        try:
+            self.queue.put(None, timeout=timeout)
+        except queue.Full:
+            # Consumidor preso com a fila cheia: descarta o item mais antigo para caber o sinal de parada
+            self.put(None)
+        self.thread.join(timeout=max(deadline - time.time(), 0))
+        if self.thread.is_alive():
+            logger.warning(f"⚠️ Estágio '{self.name}' não encerrou em {timeout}s; {self.queue.qsize()} itens pendentes")
+
+    def get_stats(self):
+        with self.stats_lock:
+            return {
+                'depth': self.queue.qsize(),
+                'capacity': self.queue.maxsize,
+                'enqueued': self.enqueued,
+                'dropped': self.dropped,
+                'processed': self.processed,
+                'failed': self.failed
+            }
+
 class SerialRadarManager:
     def __init__(self, port=None, baudrate=115200):
         self.port = port or SERIAL_CONFIG['port']
@@ -741,8 +1161,11 @@ class SerialRadarManager:
         self.receive_thread = None
         self.db_manager = None
         self.analytics_manager = AnalyticsManager()
-        self.vital_signs_manager = VitalSignsManager()
-        self.emotional_analyzer = EmotionalStateAnalyzer()  # Novo analisador emocional
+        # Sinais vitais e estado emocional isolados por sessão (pessoa)
+        self.signal_states = SignalStateRegistry(
+            max_targets=int(os.getenv('SIGNAL_STATE_MAX_TARGETS', 32)),
+            idle_ttl=float(os.getenv('SIGNAL_STATE_IDLE_TTL', 120))
+        )
         self.current_session_id = None
         self.last_activity_time = None
         self.SESSION_TIMEOUT = 60  # 1 minuto para identificar novas pessoas
@@ -764,6 +1187,14 @@ class SerialRadarManager:
         self.messages_received = 0
         self.messages_processed = 0
         self.messages_failed = 0
+        
+        # Pipeline: a thread da serial só monta quadros; análise e envio rodam em estágios próprios
+        self.analytics_stage = PipelineStage(
+            'analytics', self.process_radar_data, int(os.getenv('SERIAL_FRAME_QUEUE_SIZE', 256))
+        )
+        self.sink_stage = PipelineStage(
+            'sink', self._send_to_sink, int(os.getenv('SINK_QUEUE_SIZE', 1000))
+        )
 
     def _generate_session_id(self):
         """Gera um novo ID de sessão"""
@@ -871,6 +1302,9 @@ class SerialRadarManager:
             logger.error(f"🔍 [START] Falha na conexão serial")
             return False
         
+        self.sink_stage.start()
+        self.analytics_stage.start()
+        
         self.is_running = True
         self.receive_thread = threading.Thread(target=self.receive_data_loop)
         self.receive_thread.daemon = True
@@ -888,6 +1322,8 @@ class SerialRadarManager:
                 pass
         if self.receive_thread and self.receive_thread.is_alive():
             self.receive_thread.join(timeout=2)
+        self.analytics_stage.stop()
+        self.sink_stage.stop()
         logger.info("Receptor de dados seriais parado!")
 
     def hardware_reset_esp32(self):
@@ -921,10 +1357,8 @@ class SerialRadarManager:
             return False
 
     def receive_data_loop(self):
-        buffer = ""
-        message_mode = False
-        message_buffer = ""
-        target_data_complete = False
+        # Leitura bloqueante (com timeout) direto no bytearray do montador de quadros
+        assembler = SerialFrameAssembler(SERIAL_READ_BUFFER_SIZE)
         last_data_time = time.time()
         if not hasattr(self, 'last_valid_data_time'):
             self.last_valid_data_time = time.time()
@@ -933,62 +1367,29 @@ class SerialRadarManager:
         logger.info("\n🔄 Iniciando loop de recebimento de dados...")
         logger.info(f"🔍 [SERIAL] Aguardando dados da ESP32...")
         
-        # Contador para mostrar atividade
-        loop_count = 0
-        last_activity_log = time.time()
-        
         while self.is_running:
             try:
-                loop_count += 1
-                
                 if not self.serial_connection.is_open:
                     logger.warning("⚠️ Conexão serial fechada, tentando reconectar...")
                     self.connect()
                     time.sleep(1)
                     continue
                 
-                in_waiting = self.serial_connection.in_waiting
-                if in_waiting is None:
-                    in_waiting = 0
-                
-                data = self.serial_connection.read(in_waiting or 1)
-                if data:
+                # Sem bytes pendentes, bloqueia por 1 byte até o timeout da porta; senão lê tudo que chegou
+                free = assembler.writable()
+                in_waiting = self.serial_connection.in_waiting or 1
+                count = self.serial_connection.readinto(free[:min(in_waiting, len(free))])
+                if count:
                     last_data_time = time.time()
-                    text = data.decode('utf-8', errors='ignore')
-                    
-                    buffer += text
-                    
-                    if '\n' in buffer:
-                        lines = buffer.split('\n')
-                        buffer = lines[-1]
+                    for frame in assembler.commit(count):
+                        self.messages_received += 1
+                        logger.debug(f"🎯 [SERIAL] DETECÇÃO DE PESSOA - MENSAGEM COMPLETA, ENFILEIRANDO...")
+                        self.analytics_stage.put(frame)
+                        self.last_valid_data_time = time.time()  # Atualiza SOMENTE ao receber mensagem completa
                         
-                        for line in lines[:-1]:
-                            line = line.strip()
-                            
-                            if '-----Human Detected-----' in line:
-                                if not message_mode:
-                                    logger.info(f"🎯 [SERIAL] DETECÇÃO DE PESSOA ENCONTRADA!")
-                                    message_mode = True
-                                    message_buffer = line + '\n'
-                                    target_data_complete = False
-                                    self.messages_received += 1
-                            elif message_mode:
-                                message_buffer += line + '\n'
-                                
-                                if 'move_speed:' in line:
-                                    logger.info(f"✅ [SERIAL] MENSAGEM COMPLETA - PROCESSANDO...")
-                                    
-                                    target_data_complete = True
-                                    self.process_radar_data(message_buffer)
-                                    self.last_valid_data_time = time.time()  # Atualiza SOMENTE ao processar mensagem completa
-                                    
-                                    message_mode = False
-                                    message_buffer = ""
-                                    target_data_complete = False
-                                    
-                                    # Mostra resumo periódico
-                                    if self.messages_received % 5 == 0:
-                                        logger.info(f"📊 [RESUMO] Mensagens recebidas: {self.messages_received}, Processadas: {self.messages_processed}, Falharam: {self.messages_failed}")
+                        # Mostra resumo periódico
+                        if self.messages_received % 5 == 0:
+                            logger.info(f"📊 [RESUMO] Mensagens recebidas: {self.messages_received}, Processadas: {self.messages_processed}, Falharam: {self.messages_failed}")
                 
                 current_time = time.time()
                 if current_time - self.last_valid_data_time > self.RESET_TIMEOUT:
@@ -999,8 +1400,6 @@ class SerialRadarManager:
                 if time.time() - last_data_time > 5:
                     logger.warning("⚠️ Nenhum dado recebido nos últimos 5 segundos")
                     last_data_time = time.time()
-                    
-                time.sleep(0.01)
                 
             except Exception as e:
                 logger.error(f"❌ Erro no loop de recepção: {str(e)}")
@@ -1096,13 +1495,16 @@ class SerialRadarManager:
         # Atualiza a sessão
         self._update_session()
 
+        # Buffers de sinais vitais da pessoa desta sessão
+        signals = self.signal_states.get(self.current_session_id)
+
         # Usar os valores de batimentos e respiração diretamente do radar se disponíveis
         heart_rate = data.get('heart_rate')
         breath_rate = data.get('breath_rate')
         
         # Se não houver valores diretos, calcular usando as fases
         if heart_rate is None or breath_rate is None:
-            heart_rate, breath_rate = self.vital_signs_manager.calculate_vital_signs(
+            heart_rate, breath_rate = signals.vital_signs.calculate_vital_signs(
                 data.get('total_phase', 0),
                 data.get('breath_phase', 0),
                 data.get('heart_phase', 0),
@@ -1115,7 +1517,7 @@ class SerialRadarManager:
         emotional_confidence = 0.0
         
         if heart_rate is not None and breath_rate is not None:
-            emotional_state, emotional_score, emotional_confidence = self.emotional_analyzer.update_emotional_state(
+            emotional_state, emotional_score, emotional_confidence = signals.emotional.update_emotional_state(
                 heart_rate, breath_rate
             )
         
@@ -1142,9 +1544,9 @@ class SerialRadarManager:
             'emotional_state': emotional_state,
             'emotional_score': emotional_score,
             'emotional_confidence': emotional_confidence,
-            'hrv_value': self.emotional_analyzer.current_hrv,
-            'breath_regularity': self.emotional_analyzer.breath_regularity,
-            'heart_trend': self.emotional_analyzer.heart_rate_trend
+            'hrv_value': signals.emotional.current_hrv,
+            'breath_regularity': signals.emotional.breath_regularity,
+            'heart_trend': signals.emotional.heart_rate_trend
         }
         
         section = shelf_manager.get_section_at_position(
@@ -1218,9 +1620,9 @@ class SerialRadarManager:
             f"   Estado: {emotional_state}",
             f"   Score: {emotional_score:>6.3f}",
             f"   Confiança: {emotional_confidence:>6.3f}",
-            f"   HRV: {self.emotional_analyzer.current_hrv:>6.3f}",
-            f"   Regularidade Resp.: {self.emotional_analyzer.breath_regularity:>6.3f}",
-            f"   Tendência Cardíaca: {self.emotional_analyzer.heart_rate_trend:>6.3f}",
+            f"   HRV: {signals.emotional.current_hrv:>6.3f}",
+            f"   Regularidade Resp.: {signals.emotional.breath_regularity:>6.3f}",
+            f"   Tendência Cardíaca: {signals.emotional.heart_rate_trend:>6.3f}",
             "-"*50,
             "🎯 ANÁLISE:",
             f"   Engajamento: {'✅ Sim' if is_engaged else '❌ Não'}",
@@ -1232,12 +1634,19 @@ class SerialRadarManager:
         # Exibe a saída formatada
         logger.info("\n".join(output))
         
+        # Envio fora da thread de análise quando o pipeline está ativo
+        if self.sink_stage.is_running:
+            self.sink_stage.put(converted_data)
+        else:
+            self._send_to_sink(converted_data)
+
+    def _send_to_sink(self, converted_data):
         if self.db_manager:
             try:
                 success = self.db_manager.insert_radar_data(converted_data)
                 
                 if success:
-                    logger.info(f"✅ [PROCESS] Dados enviados com sucesso para o Google Sheets!")
+                    logger.info(f"✅ [PROCESS] Dados encaminhados para o Google Sheets!")
                 else:
                     logger.error("❌ Falha ao enviar dados para o Google Sheets")
                     
@@ -1341,10 +1750,19 @@ breath_rate: 15.0"""
     
     radar_manager = SerialRadarManager(port, baudrate)
     
+    # Linhas do radar vão para a planilha em lotes, respeitando a cota da API
+    sheets_sink = SheetsBatchSink(
+        gsheets_manager.worksheet,
+        batch_size=int(os.getenv('SHEETS_BATCH_SIZE', 100)),
+        flush_interval=float(os.getenv('SHEETS_FLUSH_INTERVAL', 5)),
+        requests_per_minute=int(os.getenv('SHEETS_REQUESTS_PER_MINUTE', 60))
+    )
+    sheets_sink.start()
+    
     try:
         logger.info(f"🔄 Iniciando SerialRadarManager...")
         
-        success = radar_manager.start(gsheets_manager)
+        success = radar_manager.start(sheets_sink)
         
         if not success:
             logger.error("❌ Falha ao iniciar o gerenciador de radar serial")
@@ -1370,12 +1788,15 @@ breath_rate: 15.0"""
                 logger.info(f"📊 [STATUS] Mensagens: Recebidas={radar_manager.messages_received}, Processadas={radar_manager.messages_processed}, Falharam={radar_manager.messages_failed}")
                 logger.info(f"📊 [STATUS] Conexão serial: {'✅ Ativa' if radar_manager.serial_connection and radar_manager.serial_connection.is_open else '❌ Inativa'}")
                 logger.info(f"📊 [STATUS] Thread de recepção: {'✅ Ativa' if radar_manager.receive_thread and radar_manager.receive_thread.is_alive() else '❌ Inativa'}")
+                logger.info(f"📊 [STATUS] Filas: análise={radar_manager.analytics_stage.get_stats()}, envio={radar_manager.sink_stage.get_stats()}")
+                logger.info(f"📊 [STATUS] Google Sheets: {sheets_sink.get_stats()}")
             
     except KeyboardInterrupt:
         logger.info("🔄 Encerrando por interrupção do usuário...")
         
     finally:
         radar_manager.stop()
+        sheets_sink.stop()
         logger.info("✅ Sistema encerrado!")
 
 if __name__ == "__main__":
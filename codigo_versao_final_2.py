@@ -9,6 +9,16 @@ import traceback
 import time
 import numpy as np
 import uuid
+import queue
+import threading
+import atexit
+from collections import deque
+from request_body import read_request_body, RequestBodyError
+from radar_db import ConnectionPool
+from radar_batch import DEFAULT_MAX_BATCH_FRAMES, parse_batch_body, assign_batch_frame_times
+from radar_state import (
+    EngagementTracker, AdaptiveSampler, DeviceState, DeviceStateRegistry
+)
 
 # Configuração básica de logging
 logging.basicConfig(
@@ -29,8 +39,8 @@ app = Flask(__name__)
 def convert_radar_data(raw_data):
     """Converte dados brutos do radar para o formato do banco de dados"""
     try:
-        # Extrair dados do JSON
-        data = json.loads(raw_data)
+        # Aceitar tanto o dict vindo do Flask quanto o JSON em texto
+        data = raw_data if isinstance(raw_data, dict) else json.loads(raw_data)
         
         # Converter valores para float
         x_point = float(data.get('x_point', 0))
@@ -39,29 +49,18 @@ def convert_radar_data(raw_data):
         heart_rate = float(data.get('heart_rate', 0))
         breath_rate = float(data.get('breath_rate', 0))
         
-        # Calcular satisfação
-        satisfaction_score = calculate_satisfaction(move_speed, heart_rate, breath_rate)
-        satisfaction_class = classify_satisfaction(satisfaction_score)
-        
         # Identificar se está engajado
         is_engaged = move_speed < 0.5  # Considera engajado se velocidade < 0.5 m/s
         
-        # Identificar seção e produto
-        section = shelf_manager.get_section_at_position(x_point, y_point)
-        section_id = section['id'] if section else None
-        product_id = section['product_id'] if section else None
-        
+        # Seção, produto e satisfação são calculados no pipeline (process_radar_frame)
         return {
             'x_point': x_point,
             'y_point': y_point,
             'move_speed': move_speed,
             'heart_rate': heart_rate,
             'breath_rate': breath_rate,
-            'satisfaction_score': satisfaction_score,
-            'satisfaction_class': satisfaction_class,
             'is_engaged': is_engaged,
-            'section_id': section_id,
-            'product_id': product_id
+            'serial_number': data.get('serial_number')
         }
     except Exception as e:
         logger.error(f"Erro ao converter dados do radar: {str(e)}")
@@ -75,25 +74,35 @@ class ShelfManager:
         self.MAX_SECTIONS_X = 4    # Número máximo de seções na horizontal
         self.MAX_SECTIONS_Y = 3    # Número máximo de seções na vertical
         
+        # Índice em memória das seções ativas
+        self.MARGIN = 0.05         # Margem de tolerância para detecção da seção (5cm)
+        self.INDEX_CELL_SIZE = 0.25  # Tamanho da célula da grade do índice em metros
+        self._index = None         # (seções, grade); substituído atomicamente a cada recarga
+        self._index_lock = threading.Lock()
+        self.index_version = 0     # incrementado a cada recarga (invalida o raster de classificação)
+        self.RELOAD_RETRY_SECONDS = 5.0  # intervalo mínimo entre recargas automáticas após falha
+        self._next_reload_at = 0
+        
     def initialize_database(self, db_manager):
         """Inicializa a tabela de seções da gôndola"""
         try:
-            # Criar tabela para seções da gôndola
-            db_manager.cursor.execute("""
-                CREATE TABLE IF NOT EXISTS shelf_sections (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    section_name VARCHAR(50),
-                    x_start FLOAT,
-                    y_start FLOAT,
-                    x_end FLOAT,
-                    y_end FLOAT,
-                    product_id VARCHAR(50),
-                    product_name VARCHAR(100),
-                    last_updated DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-                    is_active BOOLEAN DEFAULT TRUE
-                )
-            """)
-            db_manager.conn.commit()
+            with db_manager.connection() as (conn, cursor):
+                # Criar tabela para seções da gôndola
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS shelf_sections (
+                        id INT AUTO_INCREMENT PRIMARY KEY,
+                        section_name VARCHAR(50),
+                        x_start FLOAT,
+                        y_start FLOAT,
+                        x_end FLOAT,
+                        y_end FLOAT,
+                        product_id VARCHAR(50),
+                        product_name VARCHAR(100),
+                        last_updated DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                        is_active BOOLEAN DEFAULT TRUE
+                    )
+                """)
+                conn.commit()
             logger.info("✅ Tabela shelf_sections criada/verificada com sucesso!")
             
         except Exception as e:
@@ -101,31 +110,87 @@ class ShelfManager:
             logger.error(traceback.format_exc())
             raise
             
+    def _cell(self, x, y):
+        return (int(np.floor(x / self.INDEX_CELL_SIZE)), int(np.floor(y / self.INDEX_CELL_SIZE)))
+        
+    def reload_sections(self, db_manager):
+        """
+        Carrega as seções ativas do banco e reconstrói o índice em grade
+        O índice novo substitui o antigo de uma só vez; leitores nunca veem um índice parcial
+        """
+        query = """
+            SELECT id as section_id, section_name as name, product_id,
+                   x_start, x_end, y_start, y_end
+            FROM shelf_sections
+            WHERE is_active = TRUE
+        """
+        # Recargas serializadas: uma leitura antiga nunca sobrescreve uma mais recente
+        with self._index_lock:
+            try:
+                with db_manager.connection() as (conn, cursor):
+                    cursor.execute(query)
+                    sections = cursor.fetchall()
+            except Exception as e:
+                self._next_reload_at = time.time() + self.RELOAD_RETRY_SECONDS
+                logger.error(f"❌ Erro ao recarregar índice de seções: {str(e)}")
+                logger.error(traceback.format_exc())
+                return None
+                
+            # Cada seção (expandida pela margem) é registrada em todas as células que cobre
+            grid = {}
+            for section in sections:
+                x0, y0 = self._cell(section['x_start'] - self.MARGIN, section['y_start'] - self.MARGIN)
+                x1, y1 = self._cell(section['x_end'] + self.MARGIN, section['y_end'] + self.MARGIN)
+                for cx in range(x0, x1 + 1):
+                    for cy in range(y0, y1 + 1):
+                        grid.setdefault((cx, cy), []).append(section)
+                        
+            self._index = (sections, grid)
+            self.index_version += 1
+            
+        logger.info(f"✅ Índice de seções recarregado ({len(sections)} seções ativas)")
+        return len(sections)
+        
+    def _ensure_index(self, db_manager):
+        """
+        Carrega o índice sob demanda se ainda não existe
+        Após uma falha, espera RELOAD_RETRY_SECONDS: com o banco fora do ar,
+        os frames não disparam uma consulta cada
+        """
+        if self._index is None and time.time() >= self._next_reload_at:
+            self.reload_sections(db_manager)
+            
+    def get_active_sections(self, db_manager):
+        """Retorna (versão, lista de seções ativas) do índice em memória"""
+        self._ensure_index(db_manager)
+        if self._index is None:
+            return self.index_version, []
+        return self.index_version, self._index[0]
+        
     def get_section_at_position(self, x, y):
         """
         Identifica a seção da gôndola baseado nas coordenadas (x, y)
         Retorna: dict com informações da seção ou None se não encontrar
         """
         try:
-            # Adicionar margem de tolerância para detecção da seção
-            MARGIN = 0.05  # 5cm de margem
-            
-            # Buscar seções ativas que contenham o ponto (x, y) com margem de tolerância
-            query = """
-                SELECT id as section_id, section_name as name, product_id,
-                       x_start, x_end, y_start, y_end
-                FROM shelf_sections
-                WHERE is_active = TRUE
-                AND x_start - %s <= %s AND x_end + %s >= %s
-                AND y_start - %s <= %s AND y_end + %s >= %s
-                ORDER BY ABS(x_start - %s) + ABS(y_start - %s)
-                LIMIT 1
-            """
-            
-            params = (MARGIN, x, MARGIN, x, MARGIN, y, MARGIN, y, x, y)
-            
-            db_manager.cursor.execute(query, params)
-            section = db_manager.cursor.fetchone()
+            self._ensure_index(db_manager)
+            if self._index is None:
+                return None
+            sections, grid = self._index
+            
+            # Seções que contêm o ponto (x, y) com margem de tolerância;
+            # em caso de sobreposição vale a de início mais próximo (mesma ordem da antiga query SQL)
+            section = None
+            best_rank = None
+            for candidate in grid.get(self._cell(x, y), ()):
+                if not (candidate['x_start'] - self.MARGIN <= x <= candidate['x_end'] + self.MARGIN):
+                    continue
+                if not (candidate['y_start'] - self.MARGIN <= y <= candidate['y_end'] + self.MARGIN):
+                    continue
+                rank = abs(candidate['x_start'] - x) + abs(candidate['y_start'] - y)
+                if best_rank is None or rank < best_rank:
+                    section = candidate
+                    best_rank = rank
             
             if section:
                 # Calcular distância do ponto ao centro da seção
@@ -133,12 +198,10 @@ class ShelfManager:
                 center_y = (section['y_start'] + section['y_end']) / 2
                 distance = ((x - center_x) ** 2 + (y - center_y) ** 2) ** 0.5
                 
-                logger.info(f"✅ Seção encontrada: {section['name']} (Produto: {section['product_id']})")
-                logger.info(f"   Distância ao centro: {distance:.2f}m")
-                logger.info(f"   Coordenadas da seção: x=[{section['x_start']:.2f}, {section['x_end']:.2f}], y=[{section['y_start']:.2f}, {section['y_end']:.2f}]")
-                return section
+                logger.debug(f"Seção encontrada: {section['name']} (Produto: {section['product_id']}), distância ao centro: {distance:.2f}m")
+                return dict(section)
             else:
-                logger.info(f"❌ Nenhuma seção encontrada para as coordenadas (x={x}, y={y})")
+                logger.debug(f"Nenhuma seção encontrada para as coordenadas (x={x}, y={y})")
                 return None
                 
         except Exception as e:
@@ -168,10 +231,12 @@ class ShelfManager:
                 section_data['product_name']
             )
             
-            db_manager.cursor.execute(query, params)
-            db_manager.conn.commit()
+            with db_manager.connection() as (conn, cursor):
+                cursor.execute(query, params)
+                conn.commit()
             
             logger.info(f"✅ Seção {section_data['section_name']} adicionada com sucesso!")
+            self.reload_sections(db_manager)
             return True
             
         except Exception as e:
@@ -208,10 +273,12 @@ class ShelfManager:
                 WHERE id = %s
             """
             
-            db_manager.cursor.execute(query, params)
-            db_manager.conn.commit()
+            with db_manager.connection() as (conn, cursor):
+                cursor.execute(query, params)
+                conn.commit()
             
             logger.info(f"✅ Seção {section_id} atualizada com sucesso!")
+            self.reload_sections(db_manager)
             return True
             
         except Exception as e:
@@ -228,8 +295,9 @@ class ShelfManager:
                 ORDER BY section_name
             """
             
-            db_manager.cursor.execute(query)
-            sections = db_manager.cursor.fetchall()
+            with db_manager.connection() as (conn, cursor):
+                cursor.execute(query)
+                sections = cursor.fetchall()
             
             return sections
             
@@ -241,6 +309,103 @@ class ShelfManager:
 # Instância global do gerenciador de seções
 shelf_manager = ShelfManager()
 
+class ActiveSessionIndex:
+    """
+    Índice espacial em memória das sessões ativas (grade de células de 0,5 m)
+    Substitui a busca em radar_dados por ABS(x_point - x) < 0.5 nos últimos 5 minutos:
+    cada ponto é consultado apenas nas 3x3 células vizinhas
+    
+    Cada célula guarda os pontos recentes (não só o último de cada sessão), então a
+    busca casa com qualquer ponto dentro da janela, como a consulta SQL fazia;
+    o limite MAX_POINTS_PER_CELL só descarta os pontos mais antigos de células muito cheias
+    """
+    
+    def __init__(self, cell_size=0.5, max_distance=0.5, expiry_seconds=300, max_points_per_cell=2000):
+        self.CELL_SIZE = cell_size          # metros
+        self.MAX_DISTANCE = max_distance    # tolerância em x e em y (metros)
+        self.EXPIRY_SECONDS = expiry_seconds
+        self.MAX_POINTS_PER_CELL = max_points_per_cell
+        self.PURGE_INTERVAL = 30            # segundos entre limpezas de células expiradas
+        
+        self.cells = {}  # {(cx, cy): deque([(x, y, epoch, session_id), ...]) em ordem de chegada}
+        self.lock = threading.Lock()
+        self.last_purge = 0
+        
+    @staticmethod
+    def to_epoch(timestamp):
+        """Converte datetime ou string '%Y-%m-%d %H:%M:%S' em segundos"""
+        if isinstance(timestamp, datetime):
+            return timestamp.timestamp()
+        if isinstance(timestamp, (int, float)):
+            return float(timestamp)
+        try:
+            return datetime.strptime(str(timestamp), '%Y-%m-%d %H:%M:%S').timestamp()
+        except ValueError:
+            return datetime.fromisoformat(str(timestamp)).timestamp()
+            
+    def _cell(self, x, y):
+        return (int(np.floor(x / self.CELL_SIZE)), int(np.floor(y / self.CELL_SIZE)))
+        
+    def record(self, x, y, session_id, timestamp):
+        """Registra um ponto da sessão na célula correspondente"""
+        epoch = self.to_epoch(timestamp)
+        cell = self._cell(x, y)
+        with self.lock:
+            points = self.cells.get(cell)
+            if points is None:
+                points = self.cells[cell] = deque(maxlen=self.MAX_POINTS_PER_CELL)
+            points.append((x, y, epoch, session_id))
+            self._purge_if_due(epoch)
+            
+    def lookup(self, x, y, timestamp):
+        """
+        Busca a sessão do ponto mais recente a menos de MAX_DISTANCE em x e y
+        e não mais antigo que EXPIRY_SECONDS
+        Retorna: session_id ou None
+        """
+        epoch = self.to_epoch(timestamp)
+        min_epoch = epoch - self.EXPIRY_SECONDS
+        cx, cy = self._cell(x, y)
+        reach = int(np.ceil(self.MAX_DISTANCE / self.CELL_SIZE))
+        
+        best_session = None
+        best_epoch = None
+        with self.lock:
+            for dx in range(-reach, reach + 1):
+                for dy in range(-reach, reach + 1):
+                    points = self.cells.get((cx + dx, cy + dy))
+                    if not points:
+                        continue
+                    # Do mais novo para o mais antigo: o primeiro ponto próximo é o melhor da célula
+                    for px, py, seen, session_id in reversed(points):
+                        if seen < min_epoch:
+                            break
+                        if abs(px - x) >= self.MAX_DISTANCE or abs(py - y) >= self.MAX_DISTANCE:
+                            continue
+                        if best_epoch is None or seen > best_epoch:
+                            best_session = session_id
+                            best_epoch = seen
+                        break
+        return best_session
+        
+    def _purge_if_due(self, now_epoch):
+        """Remove pontos expirados (chamado com o lock adquirido)"""
+        if now_epoch - self.last_purge < self.PURGE_INTERVAL:
+            return
+        self.last_purge = now_epoch
+        min_epoch = now_epoch - self.EXPIRY_SECONDS
+        for cell in list(self.cells.keys()):
+            points = self.cells[cell]
+            while points and points[0][2] < min_epoch:
+                points.popleft()
+            if not points:
+                del self.cells[cell]
+                
+    def size(self):
+        """Número de pontos no índice"""
+        with self.lock:
+            return sum(len(points) for points in self.cells.values())
+
 # Configurações do MySQL
 db_config = {
     "host": os.getenv("DB_HOST", "168.75.89.11"),
@@ -254,35 +419,68 @@ db_config = {
 
 class DatabaseManager:
     def __init__(self):
-        self.conn = None
-        self.cursor = None
         self.last_sequence = 0
         self.last_move_speed = None
+        
+        # Configurações do pool de conexões (pool compartilhado em radar_db.py)
+        self.POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+        self.pool = ConnectionPool(
+            db_config,
+            pool_name="radar_pool",
+            pool_size=self.POOL_SIZE,
+            wait_timeout=float(os.getenv("DB_POOL_WAIT_TIMEOUT", 10)),  # segundos
+            ping_idle_seconds=float(os.getenv("DB_PING_IDLE_SECONDS", 30))  # ping só após esse tempo ociosa
+        )
+        
+        # Buffer write-behind: acumula linhas e grava com um INSERT multi-linha
+        self.WRITE_BEHIND = os.getenv("RADAR_WRITE_BEHIND", "0").lower() in ("1", "true", "yes")
+        self.WRITE_BUFFER_SIZE = int(os.getenv("RADAR_WRITE_BUFFER_SIZE", 200))  # linhas por flush
+        self.WRITE_BUFFER_INTERVAL = float(os.getenv("RADAR_WRITE_BUFFER_INTERVAL", 1.0))  # segundos
+        self.WRITE_BUFFER_MAX_PENDING = self.WRITE_BUFFER_SIZE * 50  # limite se o banco ficar fora do ar
+        self._write_buffer = []
+        self._write_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._flush_event = threading.Event()
+        self._flush_stop = threading.Event()
+        self._flush_thread = None
+        self.write_stats = {
+            'rows_buffered': 0,
+            'rows_flushed': 0,
+            'rows_dropped': 0,
+            'flushes': 0,
+            'flush_failures': 0
+        }
+        
+        # Índice em memória das sessões ativas (substitui a busca em radar_dados)
+        self.session_index = ActiveSessionIndex()
+        
+        # Cache dos dispositivos já cadastrados em Dispositivos
+        self._known_devices = set()
+        self._devices_lock = threading.Lock()
+        
+        # Dispositivos vistos só em linhas do buffer: cadastrados no próximo flush
+        self._pending_devices = set()
+        
         self.connect_with_retry()
         
+        if self.WRITE_BEHIND:
+            self.start_write_behind()
+        
     def connect_with_retry(self, max_attempts=5):
-        """Tenta conectar ao banco com retry"""
+        """Cria o pool de conexões com retry"""
         attempt = 0
         while attempt < max_attempts:
             try:
                 attempt += 1
-                logger.info(f"Tentativa {attempt} de {max_attempts} para conectar ao banco...")
-                
-                if self.conn:
-                    try:
-                        self.conn.close()
-                    except:
-                        pass
-                
-                self.conn = mysql.connector.connect(**db_config)
-                self.cursor = self.conn.cursor(dictionary=True, buffered=True)
+                logger.info(f"Tentativa {attempt} de {max_attempts} para criar pool de conexões ({self.POOL_SIZE} conexões)...")
                 
-                # Testar conexão
-                self.cursor.execute("SELECT 1")
-                self.cursor.fetchone()
+                # Criar o pool e testar uma conexão
+                self.pool.create()
                 
-                logger.info("✅ Conexão estabelecida com sucesso!")
+                logger.info("✅ Pool de conexões estabelecido com sucesso!")
                 self.initialize_database()
+                self.load_known_devices()
+                self.load_active_sessions()
                 return True
                 
             except Exception as e:
@@ -293,170 +491,324 @@ class DatabaseManager:
                 time.sleep(2)
         return False
 
+    def connection(self):
+        """
+        Empresta uma conexão do pool e um cursor para a thread atual
+        Uso: with db_manager.connection() as (conn, cursor)
+        """
+        return self.pool.connection()
+
+    def get_pool_stats(self):
+        """Retorna métricas do pool de conexões"""
+        return self.pool.get_stats()
+
+    def start_write_behind(self):
+        """Inicia a thread que descarrega o buffer de escrita"""
+        if self._flush_thread and self._flush_thread.is_alive():
+            return
+        self._flush_stop.clear()
+        self._flush_thread = threading.Thread(target=self._flush_loop, name="radar-write-behind")
+        self._flush_thread.daemon = True
+        self._flush_thread.start()
+        atexit.register(self.stop_write_behind)
+        logger.info(f"✅ Write-behind ativo ({self.WRITE_BUFFER_SIZE} linhas ou {self.WRITE_BUFFER_INTERVAL}s por flush)")
+
+    def stop_write_behind(self, timeout=10):
+        """Encerra a thread de flush e grava o que restou no buffer"""
+        if not self._flush_thread:
+            return
+        self._flush_stop.set()
+        self._flush_event.set()
+        self._flush_thread.join(timeout=timeout)
+        self._flush_thread = None
+        
+        pending = len(self._write_buffer)
+        if pending:
+            logger.info(f"Gravando {pending} linhas pendentes do buffer antes de encerrar...")
+            self.flush_write_buffer()
+
+    def _flush_loop(self):
+        """Descarrega o buffer quando enche ou a cada WRITE_BUFFER_INTERVAL segundos"""
+        while not self._flush_stop.is_set():
+            self._flush_event.wait(self.WRITE_BUFFER_INTERVAL)
+            self._flush_event.clear()
+            try:
+                self.flush_write_buffer()
+            except Exception as e:
+                logger.error(f"❌ Erro no flush do buffer de escrita: {str(e)}")
+                logger.error(traceback.format_exc())
+
+    def _buffer_row(self, params):
+        """
+        Adiciona uma linha (na ordem de INSERT_RADAR_QUERY) ao buffer de escrita
+        Não usa o banco: dispositivo novo (fora do cache) é cadastrado no flush
+        """
+        serial_number = params[-1]
+        new_device = not self.is_known_device(serial_number)
+        with self._write_lock:
+            if new_device:
+                self._pending_devices.add(serial_number)
+            self._write_buffer.append(params)
+            self.write_stats['rows_buffered'] += 1
+            should_flush = len(self._write_buffer) >= self.WRITE_BUFFER_SIZE
+        if should_flush:
+            self._flush_event.set()
+        return True
+
+    def flush_write_buffer(self):
+        """
+        Grava todas as linhas do buffer com executemany em uma única transação
+        Retorna: número de linhas gravadas
+        """
+        # Um flush por vez para preservar a ordem das linhas
+        with self._flush_lock:
+            with self._write_lock:
+                rows = self._write_buffer
+                self._write_buffer = []
+                devices = self._pending_devices
+                self._pending_devices = set()
+                
+            if not rows and not devices:
+                return 0
+                
+            try:
+                with self.connection() as (conn, cursor):
+                    if devices:
+                        cursor.executemany(self.INSERT_DEVICE_QUERY, [
+                            (serial_number, f"Radar {serial_number}", 'RADAR') for serial_number in devices
+                        ])
+                    if rows:
+                        cursor.executemany(self.INSERT_RADAR_QUERY, rows)
+                    conn.commit()
+                    
+                for serial_number in devices:
+                    self._remember_device(serial_number)
+                    
+                with self._write_lock:
+                    self.write_stats['rows_flushed'] += len(rows)
+                    self.write_stats['flushes'] += 1
+                logger.debug(f"✅ Flush de {len(rows)} linhas em radar_dados")
+                return len(rows)
+                
+            except Exception as e:
+                logger.error(f"❌ Erro ao gravar buffer ({len(rows)} linhas): {str(e)}")
+                logger.error(traceback.format_exc())
+                
+                # Devolver as linhas ao início do buffer para a próxima tentativa
+                with self._write_lock:
+                    self.write_stats['flush_failures'] += 1
+                    self._pending_devices |= devices
+                    self._write_buffer[:0] = rows
+                    overflow = len(self._write_buffer) - self.WRITE_BUFFER_MAX_PENDING
+                    if overflow > 0:
+                        del self._write_buffer[:overflow]
+                        self.write_stats['rows_dropped'] += overflow
+                        logger.warning(f"⚠️ Buffer de escrita cheio, {overflow} linhas mais antigas descartadas")
+                return 0
+
+    def get_write_buffer_stats(self):
+        """Retorna os contadores do buffer write-behind"""
+        with self._write_lock:
+            stats = dict(self.write_stats)
+            stats['pending'] = len(self._write_buffer)
+        stats['enabled'] = self.WRITE_BEHIND
+        stats['buffer_size'] = self.WRITE_BUFFER_SIZE
+        stats['flush_interval'] = self.WRITE_BUFFER_INTERVAL
+        return stats
+
     def initialize_database(self):
         """Inicializa o banco de dados"""
         try:
-            # Dropar tabela areas existente
-            logger.info("Removendo tabela areas antiga...")
-            self.cursor.execute("DROP TABLE IF EXISTS areas")
-            
-            # Criar nova tabela areas
-            logger.info("Criando nova tabela areas...")
-            self.cursor.execute("""
-                CREATE TABLE areas (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    area_name VARCHAR(50) NOT NULL,
-                    y_min FLOAT NOT NULL,
-                    y_max FLOAT NOT NULL,
-                    speed_threshold FLOAT NOT NULL,
-                    description TEXT,
-                    last_updated DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-                    is_active BOOLEAN DEFAULT TRUE
-                )
-            """)
-            
-            # Inserir áreas padrão
-            logger.info("Adicionando areas padrão...")
-            self.cursor.execute("""
-                INSERT INTO areas 
-                (area_name, y_min, y_max, speed_threshold, description)
-                VALUES 
-                ('PASSAGEM', 0.5, 999999.0, 0.5, 'Cliente apenas passando'),
-                ('ATENCAO', 0.3, 0.5, 0.3, 'Cliente olhando de longe'),
-                ('CONSIDERACAO', 0.15, 0.3, 0.2, 'Cliente analisando produtos'),
-                ('INTERACAO', 0.0, 0.15, 0.1, 'Cliente próximo, possivelmente pegando produto')
-            """)
-            logger.info("✅ Áreas padrão criadas com sucesso")
-            
-            # Verificar tabela de dispositivos
-            logger.info("Verificando tabela de dispositivos...")
-            self.cursor.execute("""
-                CREATE TABLE IF NOT EXISTS Dispositivos (
-                    serial_number VARCHAR(50) PRIMARY KEY,
-                    nome VARCHAR(100),
-                    tipo VARCHAR(50),
-                    status VARCHAR(20) DEFAULT 'ATIVO',
-                    data_cadastro DATETIME DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            
-            # Verificar dispositivo padrão
-            logger.info("Verificando dispositivo padrão...")
-            self.cursor.execute("""
-                INSERT IGNORE INTO Dispositivos 
-                (serial_number, nome, tipo)
-                VALUES 
-                ('RADAR_1', 'Radar Gôndola Principal', 'RADAR')
-            """)
-            
-            # Verificar tabela radar_dados
-            logger.info("Verificando tabela radar_dados...")
-            self.cursor.execute("""
-                CREATE TABLE IF NOT EXISTS radar_dados (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    x_point FLOAT,
-                    y_point FLOAT,
-                    move_speed FLOAT,
-                    heart_rate FLOAT,
-                    breath_rate FLOAT,
-                    satisfaction_score FLOAT,
-                    satisfaction_class VARCHAR(20),
-                    is_engaged BOOLEAN,
-                    engagement_duration INT,
-                    session_id VARCHAR(36),
-                    section_id INT,
-                    product_id VARCHAR(20),
-                    timestamp DATETIME,
-                    serial_number VARCHAR(20)
-                )
-            """)
-            self.conn.commit()
-            logger.info("✅ Tabela radar_dados criada/verificada com sucesso!")
-            
-            # Verificar tabela radar_sessoes
-            logger.info("Verificando tabela radar_sessoes...")
-            self.cursor.execute("""
-                CREATE TABLE IF NOT EXISTS radar_sessoes (
-                    session_id VARCHAR(50) PRIMARY KEY,
-                    start_time DATETIME,
-                    end_time DATETIME,
-                    duration INT,
-                    avg_heart_rate FLOAT,
-                    avg_breath_rate FLOAT,
-                    avg_satisfaction FLOAT,
-                    satisfaction_class VARCHAR(20),
-                    is_engaged BOOLEAN,
-                    data_points INT
-                )
-            """)
-            
-            # Verificar tabela shelf_sections
-            logger.info("Verificando tabela shelf_sections...")
-            self.cursor.execute("""
-                CREATE TABLE IF NOT EXISTS shelf_sections (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    section_name VARCHAR(50),
-                    x_start FLOAT,
-                    y_start FLOAT,
-                    x_end FLOAT,
-                    y_end FLOAT,
-                    product_id VARCHAR(50),
-                    product_name VARCHAR(100),
-                    last_updated DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-                    is_active BOOLEAN DEFAULT TRUE
-                )
-            """)
-            
-            # Verificar se já existem seções
-            self.cursor.execute("SELECT COUNT(*) as count FROM shelf_sections")
-            count = self.cursor.fetchone()['count']
-            
-            # Só adicionar seções padrão se a tabela estiver vazia
-            if count == 0:
-                logger.info("Adicionando seções padrão...")
-                self.cursor.execute("""
-                    INSERT INTO shelf_sections 
-                    (section_name, x_start, y_start, x_end, y_end, product_id, product_name)
+            with self.connection() as (conn, cursor):
+                # Dropar tabela areas existente
+                logger.info("Removendo tabela areas antiga...")
+                cursor.execute("DROP TABLE IF EXISTS areas")
+            
+                # Criar nova tabela areas
+                logger.info("Criando nova tabela areas...")
+                cursor.execute("""
+                    CREATE TABLE areas (
+                        id INT AUTO_INCREMENT PRIMARY KEY,
+                        area_name VARCHAR(50) NOT NULL,
+                        y_min FLOAT NOT NULL,
+                        y_max FLOAT NOT NULL,
+                        speed_threshold FLOAT NOT NULL,
+                        description TEXT,
+                        last_updated DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                        is_active BOOLEAN DEFAULT TRUE
+                    )
+                """)
+            
+                # Inserir áreas padrão
+                logger.info("Adicionando areas padrão...")
+                cursor.execute("""
+                    INSERT INTO areas 
+                    (area_name, y_min, y_max, speed_threshold, description)
                     VALUES 
-                    ('Granolas Premium', -0.75, 0.0, -0.25, 0.3, 'GRN001', 'Granolas Premium'),
-                    ('Mix de Frutas Secas', -0.25, 0.0, 0.25, 0.3, 'MIX001', 'Mix de Frutas Secas'),
-                    ('Barras de Cereais', 0.25, 0.0, 0.75, 0.3, 'BAR001', 'Barras de Cereais')
+                    ('PASSAGEM', 0.5, 999999.0, 0.5, 'Cliente apenas passando'),
+                    ('ATENCAO', 0.3, 0.5, 0.3, 'Cliente olhando de longe'),
+                    ('CONSIDERACAO', 0.15, 0.3, 0.2, 'Cliente analisando produtos'),
+                    ('INTERACAO', 0.0, 0.15, 0.1, 'Cliente próximo, possivelmente pegando produto')
                 """)
+                logger.info("✅ Áreas padrão criadas com sucesso")
+            
+                # Verificar tabela de dispositivos
+                logger.info("Verificando tabela de dispositivos...")
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS Dispositivos (
+                        serial_number VARCHAR(50) PRIMARY KEY,
+                        nome VARCHAR(100),
+                        tipo VARCHAR(50),
+                        status VARCHAR(20) DEFAULT 'ATIVO',
+                        data_cadastro DATETIME DEFAULT CURRENT_TIMESTAMP
+                    )
+                """)
+            
+                # Verificar dispositivo padrão
+                logger.info("Verificando dispositivo padrão...")
+                cursor.execute("""
+                    INSERT IGNORE INTO Dispositivos 
+                    (serial_number, nome, tipo)
+                    VALUES 
+                    ('RADAR_1', 'Radar Gôndola Principal', 'RADAR')
+                """)
+            
+                # Verificar tabela radar_dados
+                logger.info("Verificando tabela radar_dados...")
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS radar_dados (
+                        id INT AUTO_INCREMENT PRIMARY KEY,
+                        x_point FLOAT,
+                        y_point FLOAT,
+                        move_speed FLOAT,
+                        heart_rate FLOAT,
+                        breath_rate FLOAT,
+                        satisfaction_score FLOAT,
+                        satisfaction_class VARCHAR(20),
+                        is_engaged BOOLEAN,
+                        engagement_duration INT,
+                        session_id VARCHAR(36),
+                        section_id INT,
+                        product_id VARCHAR(20),
+                        timestamp DATETIME,
+                        serial_number VARCHAR(20)
+                    )
+                """)
+                conn.commit()
+                logger.info("✅ Tabela radar_dados criada/verificada com sucesso!")
+            
+                # Verificar tabela radar_sessoes
+                logger.info("Verificando tabela radar_sessoes...")
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS radar_sessoes (
+                        session_id VARCHAR(50) PRIMARY KEY,
+                        start_time DATETIME,
+                        end_time DATETIME,
+                        duration INT,
+                        avg_heart_rate FLOAT,
+                        avg_breath_rate FLOAT,
+                        avg_satisfaction FLOAT,
+                        satisfaction_class VARCHAR(20),
+                        is_engaged BOOLEAN,
+                        data_points INT
+                    )
+                """)
+            
+                # Verificar tabela shelf_sections
+                logger.info("Verificando tabela shelf_sections...")
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS shelf_sections (
+                        id INT AUTO_INCREMENT PRIMARY KEY,
+                        section_name VARCHAR(50),
+                        x_start FLOAT,
+                        y_start FLOAT,
+                        x_end FLOAT,
+                        y_end FLOAT,
+                        product_id VARCHAR(50),
+                        product_name VARCHAR(100),
+                        last_updated DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                        is_active BOOLEAN DEFAULT TRUE
+                    )
+                """)
+            
+                # Verificar se já existem seções
+                cursor.execute("SELECT COUNT(*) as count FROM shelf_sections")
+                count = cursor.fetchone()['count']
+            
+                # Só adicionar seções padrão se a tabela estiver vazia
+                if count == 0:
+                    logger.info("Adicionando seções padrão...")
+                    cursor.execute("""
+                        INSERT INTO shelf_sections 
+                        (section_name, x_start, y_start, x_end, y_end, product_id, product_name)
+                        VALUES 
+                        ('Granolas Premium', -0.75, 0.0, -0.25, 0.3, 'GRN001', 'Granolas Premium'),
+                        ('Mix de Frutas Secas', -0.25, 0.0, 0.25, 0.3, 'MIX001', 'Mix de Frutas Secas'),
+                        ('Barras de Cereais', 0.25, 0.0, 0.75, 0.3, 'BAR001', 'Barras de Cereais')
+                    """)
 
-            self.conn.commit()
-            logger.info("✅ Banco de dados atualizado com sucesso!")
+                conn.commit()
+                logger.info("✅ Banco de dados atualizado com sucesso!")
             
         except Exception as e:
             logger.error(f"❌ Erro ao inicializar banco: {str(e)}")
             logger.error(traceback.format_exc())
             raise
 
+    def load_known_devices(self):
+        """Carrega os serial numbers já cadastrados para evitar consultas a cada frame"""
+        try:
+            with self.connection() as (conn, cursor):
+                cursor.execute("SELECT serial_number FROM Dispositivos")
+                devices = {row['serial_number'] for row in cursor.fetchall()}
+            with self._devices_lock:
+                self._known_devices = devices
+            logger.info(f"✅ {len(devices)} dispositivos carregados no cache")
+        except Exception as e:
+            logger.error(f"❌ Erro ao carregar dispositivos: {str(e)}")
+            logger.error(traceback.format_exc())
+
+    def is_known_device(self, serial_number):
+        """Verifica no cache se o dispositivo já está cadastrado"""
+        with self._devices_lock:
+            return serial_number in self._known_devices
+
+    def _remember_device(self, serial_number):
+        """Registra no cache um dispositivo recém-cadastrado"""
+        with self._devices_lock:
+            self._known_devices.add(serial_number)
+
     def ensure_device_exists(self, serial_number, nome=None, tipo=None):
         """Garante que o dispositivo existe no banco"""
-        try:
-            # Verificar se o dispositivo já existe
-            self.cursor.execute("""
-                SELECT serial_number FROM Dispositivos
-                WHERE serial_number = %s
-            """, (serial_number,))
-            
-            device = self.cursor.fetchone()
-            
-            if not device:
-                # Inserir novo dispositivo
-                logger.info(f"Inserindo novo dispositivo: {serial_number}")
-                self.cursor.execute("""
-                    INSERT INTO Dispositivos (serial_number, nome, tipo)
-                    VALUES (%s, %s, %s)
-                """, (
-                    serial_number,
-                    nome or f"Radar {serial_number}",
-                    tipo or "RADAR"
-                ))
-                self.conn.commit()
-                logger.info(f"✅ Dispositivo {serial_number} inserido com sucesso!")
-            
+        if self.is_known_device(serial_number):
             return True
+            
+        try:
+            with self.connection() as (conn, cursor):
+                # Verificar se o dispositivo já existe
+                cursor.execute("""
+                    SELECT serial_number FROM Dispositivos
+                    WHERE serial_number = %s
+                """, (serial_number,))
+            
+                device = cursor.fetchone()
+            
+                if not device:
+                    # Inserir novo dispositivo
+                    logger.info(f"Inserindo novo dispositivo: {serial_number}")
+                    cursor.execute("""
+                        INSERT INTO Dispositivos (serial_number, nome, tipo)
+                        VALUES (%s, %s, %s)
+                    """, (
+                        serial_number,
+                        nome or f"Radar {serial_number}",
+                        tipo or "RADAR"
+                    ))
+                    conn.commit()
+                    logger.info(f"✅ Dispositivo {serial_number} inserido com sucesso!")
+            
+                self._remember_device(serial_number)
+                return True
         except Exception as e:
             logger.error(f"❌ Erro ao verificar/inserir dispositivo: {str(e)}")
             return False
@@ -466,64 +818,60 @@ class DatabaseManager:
         max_retries = 3
         retry_delay = 1  # segundos
         
+        logger.info("="*50)
+        logger.info("Iniciando inserção de dados no banco...")
+        
+        serial_number = data.get('serial_number', 'RADAR_1')
+        
+        # Valores padrão para analytics
+        satisfaction_score = None
+        satisfaction_class = None
+        is_engaged = False
+        engagement_duration = 0
+        
+        try:
+            # Extrair dados de analytics se disponíveis
+            if analytics_data:
+                if 'satisfaction' in analytics_data:
+                    satisfaction_score = analytics_data['satisfaction'].get('score')
+                    satisfaction_class = analytics_data['satisfaction'].get('classification')
+                is_engaged = bool(analytics_data.get('engaged', False))
+                engagement_duration = int(analytics_data.get('engagement_duration', 0))
+        
+            # Verificar se o dado tem o campo is_engaged (prioridade sobre analytics)
+            if 'is_engaged' in data and data['is_engaged'] is not None:
+                is_engaged = bool(data['is_engaged'])
+                logger.info(f"Campo is_engaged encontrado nos dados: {is_engaged}")
+        
+            values = (
+                data['x_point'], data['y_point'], data['move_speed'],
+                data['heart_rate'], data['breath_rate'],
+                satisfaction_score, satisfaction_class, is_engaged, engagement_duration,
+                data.get('session_id'), data.get('section_id'), data.get('product_id'),
+                datetime.now(), serial_number
+            )
+        except Exception as e:
+            logger.error(f"❌ Erro ao preparar dados: {e}")
+            return False
+        
+        # Write-behind: só o buffer em memória, sem emprestar conexão do pool
+        if self.WRITE_BEHIND:
+            return self._buffer_row(values)
+        
+        # Garantir que o dispositivo existe
+        if not self.ensure_device_exists(serial_number):
+            return False
+        
         for attempt in range(max_retries):
             try:
-                logger.info("="*50)
-                logger.info("Iniciando inserção de dados no banco...")
-                
-                # Verificar conexão antes de inserir
-                if not self.conn or not self.conn.is_connected():
-                    logger.info("Conexão não disponível, tentando reconectar...")
-                    self.connect_with_retry()
-                
-                # Garantir que o dispositivo existe
-                serial_number = data.get('serial_number', 'RADAR_1')
-                if not self.ensure_device_exists(serial_number):
-                    return False
-                
-                # Valores padrão para analytics
-                satisfaction_score = None
-                satisfaction_class = None
-                is_engaged = False
-                engagement_duration = 0
-                
-                # Extrair dados de analytics se disponíveis
-                if analytics_data:
-                    if 'satisfaction' in analytics_data:
-                        satisfaction_score = analytics_data['satisfaction'].get('score')
-                        satisfaction_class = analytics_data['satisfaction'].get('classification')
-                    is_engaged = bool(analytics_data.get('engaged', False))
-                    engagement_duration = int(analytics_data.get('engagement_duration', 0))
-                
-                # Verificar se o dado tem o campo is_engaged (prioridade sobre analytics)
-                if 'is_engaged' in data and data['is_engaged'] is not None:
-                    is_engaged = bool(data['is_engaged'])
-                    logger.info(f"Campo is_engaged encontrado nos dados: {is_engaged}")
+                with self.connection() as (conn, cursor):
+                    # Inserir dados com transaction
+                    cursor.execute("START TRANSACTION")
+                    cursor.execute(self.INSERT_RADAR_QUERY, values)
+                    conn.commit()
                 
-                # Inserir dados com transaction
-                self.cursor.execute("START TRANSACTION")
-                
-                query = """
-                    INSERT INTO radar_dados
-                    (x_point, y_point, move_speed, heart_rate, breath_rate,
-                    satisfaction_score, satisfaction_class, is_engaged, engagement_duration,
-                    session_id, section_id, product_id, serial_number, timestamp)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """
-                
-                values = (
-                    data['x_point'], data['y_point'], data['move_speed'],
-                    data['heart_rate'], data['breath_rate'],
-                    satisfaction_score, satisfaction_class, is_engaged, engagement_duration,
-                    data.get('session_id'), data.get('section_id'), data.get('product_id'),
-                    serial_number, datetime.now()
-                )
-                
-                self.cursor.execute(query, values)
-                self.conn.commit()
-                
-                logger.info("✅ Dados inseridos com sucesso!")
-                return True
+                    logger.info("✅ Dados inseridos com sucesso!")
+                    return True
                 
             except mysql.connector.Error as err:
                 if err.errno == 1205:  # Lock timeout error
@@ -532,18 +880,10 @@ class DatabaseManager:
                         time.sleep(retry_delay)
                         continue
                 logger.error(f"❌ Erro MySQL ao inserir dados: {err}")
-                try:
-                    self.conn.rollback()
-                except:
-                    pass
                 return False
                 
             except Exception as e:
                 logger.error(f"❌ Erro ao inserir dados: {e}")
-                try:
-                    self.conn.rollback()
-                except:
-                    pass
                 return False
                 
         return False
@@ -551,24 +891,22 @@ class DatabaseManager:
     def get_last_records(self, limit=5):
         """Obtém últimos registros"""
         try:
-            if not self.conn or not self.conn.is_connected():
-                self.connect_with_retry()
-                
-            query = """
-                SELECT * FROM radar_dados
-                ORDER BY timestamp DESC 
-                LIMIT %s
-            """
+            with self.connection() as (conn, cursor):
+                query = """
+                    SELECT * FROM radar_dados
+                    ORDER BY timestamp DESC 
+                    LIMIT %s
+                """
             
-            self.cursor.execute(query, (limit,))
-            records = self.cursor.fetchall()
+                cursor.execute(query, (limit,))
+                records = cursor.fetchall()
             
-            # Converter datetime para string
-            for record in records:
-                if isinstance(record['timestamp'], datetime):
-                    record['timestamp'] = record['timestamp'].strftime('%Y-%m-%d %H:%M:%S')
+                # Converter datetime para string
+                for record in records:
+                    if isinstance(record['timestamp'], datetime):
+                        record['timestamp'] = record['timestamp'].strftime('%Y-%m-%d %H:%M:%S')
             
-            return records
+                return records
         except Exception as e:
             logger.error(f"Erro ao buscar registros: {str(e)}")
             return []
@@ -576,72 +914,68 @@ class DatabaseManager:
     def save_session_summary(self, session_data):
         """Salva o resumo da sessão no banco de dados"""
         try:
-            logger.info("="*50)
-            logger.info(f"Salvando resumo da sessão {session_data['session_id']}...")
-            
-            # Verificar conexão antes de inserir
-            if not self.conn or not self.conn.is_connected():
-                logger.info("Conexão não disponível, tentando reconectar...")
-                self.connect_with_retry()
+            with self.connection() as (conn, cursor):
+                logger.info("="*50)
+                logger.info(f"Salvando resumo da sessão {session_data['session_id']}...")
             
-            # Preparar query
-            query = """
-                INSERT INTO radar_sessoes
-                (session_id, start_time, end_time, duration, avg_heart_rate, 
-                 avg_breath_rate, avg_satisfaction, satisfaction_class, is_engaged, data_points)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                ON DUPLICATE KEY UPDATE
-                end_time = VALUES(end_time),
-                duration = VALUES(duration),
-                avg_heart_rate = VALUES(avg_heart_rate),
-                avg_breath_rate = VALUES(avg_breath_rate),
-                avg_satisfaction = VALUES(avg_satisfaction),
-                satisfaction_class = VALUES(satisfaction_class),
-                is_engaged = VALUES(is_engaged),
-                data_points = VALUES(data_points)
-            """
+                # Preparar query
+                query = """
+                    INSERT INTO radar_sessoes
+                    (session_id, start_time, end_time, duration, avg_heart_rate, 
+                     avg_breath_rate, avg_satisfaction, satisfaction_class, is_engaged, data_points)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                    ON DUPLICATE KEY UPDATE
+                    end_time = VALUES(end_time),
+                    duration = VALUES(duration),
+                    avg_heart_rate = VALUES(avg_heart_rate),
+                    avg_breath_rate = VALUES(avg_breath_rate),
+                    avg_satisfaction = VALUES(avg_satisfaction),
+                    satisfaction_class = VALUES(satisfaction_class),
+                    is_engaged = VALUES(is_engaged),
+                    data_points = VALUES(data_points)
+                """
             
-            # Determinar classificação de satisfação
-            satisfaction_class = "NEUTRA"
-            if session_data.get('avg_satisfaction') is not None:
-                if session_data['avg_satisfaction'] >= 70:
-                    satisfaction_class = "POSITIVA"
-                elif session_data['avg_satisfaction'] <= 40:
-                    satisfaction_class = "NEGATIVA"
+                # Determinar classificação de satisfação
+                satisfaction_class = "NEUTRA"
+                if session_data.get('avg_satisfaction') is not None:
+                    if session_data['avg_satisfaction'] >= 70:
+                        satisfaction_class = "POSITIVA"
+                    elif session_data['avg_satisfaction'] <= 40:
+                        satisfaction_class = "NEGATIVA"
             
-            # Preparar parâmetros
-            start_time = session_data.get('start_time')
-            end_time = session_data.get('end_time')
+                # Preparar parâmetros
+                start_time = session_data.get('start_time')
+                end_time = session_data.get('end_time')
             
-            # Converter para string se for datetime
-            if isinstance(start_time, datetime):
-                start_time = start_time.strftime('%Y-%m-%d %H:%M:%S')
-            if isinstance(end_time, datetime):
-                end_time = end_time.strftime('%Y-%m-%d %H:%M:%S')
+                # Converter para string se for datetime
+                if isinstance(start_time, datetime):
+                    start_time = start_time.strftime('%Y-%m-%d %H:%M:%S')
+                if isinstance(end_time, datetime):
+                    end_time = end_time.strftime('%Y-%m-%d %H:%M:%S')
             
-            params = (
-                session_data.get('session_id'),
-                start_time,
-                end_time,
-                float(session_data.get('duration', 0)),
-                float(session_data.get('avg_heart_rate', 0)) if session_data.get('avg_heart_rate') is not None else None,
-                float(session_data.get('avg_breath_rate', 0)) if session_data.get('avg_breath_rate') is not None else None,
-                float(session_data.get('avg_satisfaction', 0)) if session_data.get('avg_satisfaction') is not None else None,
-                satisfaction_class,
-                bool(session_data.get('is_engaged', False)),
-                len(session_data.get('positions', []))
-            )
+                params = (
+                    session_data.get('session_id'),
+                    start_time,
+                    end_time,
+                    float(session_data.get('duration', 0)),
+                    float(session_data.get('avg_heart_rate', 0)) if session_data.get('avg_heart_rate') is not None else None,
+                    float(session_data.get('avg_breath_rate', 0)) if session_data.get('avg_breath_rate') is not None else None,
+                    float(session_data.get('avg_satisfaction', 0)) if session_data.get('avg_satisfaction') is not None else None,
+                    satisfaction_class,
+                    bool(session_data.get('is_engaged', False)),
+                    len(session_data.get('positions', []))
+                )
             
-            logger.info(f"Query SQL: {query}")
-            logger.info(f"Parâmetros: {params}")
+                logger.info(f"Query SQL: {query}")
+                logger.info(f"Parâmetros: {params}")
             
-            # Executar inserção
-            self.cursor.execute(query, params)
-            self.conn.commit()
+                # Executar inserção
+                cursor.execute(query, params)
+                conn.commit()
             
-            logger.info(f"✅ Resumo da sessão {session_data['session_id']} salvo com sucesso!")
-            logger.info("="*50)
-            return True
+                logger.info(f"✅ Resumo da sessão {session_data['session_id']} salvo com sucesso!")
+                logger.info("="*50)
+                return True
             
         except Exception as e:
             logger.error("="*50)
@@ -654,26 +988,24 @@ class DatabaseManager:
     def get_sessions(self, limit=10):
         """Obtém as sessões mais recentes"""
         try:
-            if not self.conn or not self.conn.is_connected():
-                self.connect_with_retry()
-                
-            query = """
-                SELECT * FROM radar_sessoes
-                ORDER BY end_time DESC 
-                LIMIT %s
-            """
+            with self.connection() as (conn, cursor):
+                query = """
+                    SELECT * FROM radar_sessoes
+                    ORDER BY end_time DESC 
+                    LIMIT %s
+                """
             
-            self.cursor.execute(query, (limit,))
-            sessions = self.cursor.fetchall()
+                cursor.execute(query, (limit,))
+                sessions = cursor.fetchall()
             
-            # Converter datetime para string
-            for session in sessions:
-                if isinstance(session['start_time'], datetime):
-                    session['start_time'] = session['start_time'].strftime('%Y-%m-%d %H:%M:%S')
-                if isinstance(session['end_time'], datetime):
-                    session['end_time'] = session['end_time'].strftime('%Y-%m-%d %H:%M:%S')
+                # Converter datetime para string
+                for session in sessions:
+                    if isinstance(session['start_time'], datetime):
+                        session['start_time'] = session['start_time'].strftime('%Y-%m-%d %H:%M:%S')
+                    if isinstance(session['end_time'], datetime):
+                        session['end_time'] = session['end_time'].strftime('%Y-%m-%d %H:%M:%S')
             
-            return sessions
+                return sessions
         except Exception as e:
             logger.error(f"Erro ao buscar sessões: {str(e)}")
             logger.error(traceback.format_exc())
@@ -682,209 +1014,325 @@ class DatabaseManager:
     def get_session_by_id(self, session_id):
         """Obtém uma sessão específica pelo ID"""
         try:
-            if not self.conn or not self.conn.is_connected():
-                self.connect_with_retry()
-                
-            # Buscar resumo da sessão
-            query_session = """
-                SELECT * FROM radar_sessoes
-                WHERE session_id = %s
-            """
+            with self.connection() as (conn, cursor):
+                # Buscar resumo da sessão
+                query_session = """
+                    SELECT * FROM radar_sessoes
+                    WHERE session_id = %s
+                """
             
-            self.cursor.execute(query_session, (session_id,))
-            session = self.cursor.fetchone()
+                cursor.execute(query_session, (session_id,))
+                session = cursor.fetchone()
             
-            if not session:
-                return None
+                if not session:
+                    return None
                 
-            # Converter datetime para string
-            if isinstance(session['start_time'], datetime):
-                session['start_time'] = session['start_time'].strftime('%Y-%m-%d %H:%M:%S')
-            if isinstance(session['end_time'], datetime):
-                session['end_time'] = session['end_time'].strftime('%Y-%m-%d %H:%M:%S')
-            
-            # Buscar pontos de dados da sessão
-            query_points = """
-                SELECT * FROM radar_dados
-                WHERE session_id = %s
-                ORDER BY timestamp ASC
-            """
+                # Converter datetime para string
+                if isinstance(session['start_time'], datetime):
+                    session['start_time'] = session['start_time'].strftime('%Y-%m-%d %H:%M:%S')
+                if isinstance(session['end_time'], datetime):
+                    session['end_time'] = session['end_time'].strftime('%Y-%m-%d %H:%M:%S')
             
-            self.cursor.execute(query_points, (session_id,))
-            points = self.cursor.fetchall()
+                # Buscar pontos de dados da sessão
+                query_points = """
+                    SELECT * FROM radar_dados
+                    WHERE session_id = %s
+                    ORDER BY timestamp ASC
+                """
             
-            # Converter datetime para string nos pontos
-            for point in points:
-                if isinstance(point['timestamp'], datetime):
-                    point['timestamp'] = point['timestamp'].strftime('%Y-%m-%d %H:%M:%S')
+                cursor.execute(query_points, (session_id,))
+                points = cursor.fetchall()
             
-            # Adicionar pontos à sessão
-            session['data_points'] = points
+                # Converter datetime para string nos pontos
+                for point in points:
+                    if isinstance(point['timestamp'], datetime):
+                        point['timestamp'] = point['timestamp'].strftime('%Y-%m-%d %H:%M:%S')
             
-            return session
+                # Adicionar pontos à sessão
+                session['data_points'] = points
+            
+                return session
         except Exception as e:
             logger.error(f"Erro ao buscar sessão {session_id}: {str(e)}")
             logger.error(traceback.format_exc())
             return None
 
+    def load_active_sessions(self):
+        """Preenche o índice de sessões com os pontos dos últimos minutos (após reinício)"""
+        try:
+            with self.connection() as (conn, cursor):
+                cursor.execute("""
+                    SELECT session_id, x_point, y_point, timestamp
+                    FROM radar_dados
+                    WHERE timestamp >= DATE_SUB(NOW(), INTERVAL %s SECOND)
+                    AND session_id IS NOT NULL
+                    ORDER BY timestamp ASC
+                """, (self.session_index.EXPIRY_SECONDS,))
+                rows = cursor.fetchall()
+            
+            for row in rows:
+                self.session_index.record(row['x_point'], row['y_point'], row['session_id'], row['timestamp'])
+            logger.info(f"✅ Índice de sessões ativas carregado ({len(rows)} pontos recentes)")
+        except Exception as e:
+            logger.error(f"❌ Erro ao carregar sessões ativas: {str(e)}")
+            logger.error(traceback.format_exc())
+
     def get_active_session(self, x_point, y_point, move_speed, timestamp):
         """Verifica se existe uma sessão ativa para as coordenadas fornecidas"""
         try:
-            # Buscar a última sessão registrada nos últimos 5 minutos
-            query = """
-                SELECT DISTINCT session_id, timestamp
-                FROM radar_dados
-                WHERE timestamp >= DATE_SUB(%s, INTERVAL 5 MINUTE)
-                AND ABS(x_point - %s) < 0.5
-                AND ABS(y_point - %s) < 0.5
-                ORDER BY timestamp DESC
-                LIMIT 1
-            """
-            
-            self.cursor.execute(query, (timestamp, x_point, y_point))
-            result = self.cursor.fetchone()
-            
-            if result:
-                logger.info(f"Sessão ativa encontrada: {result['session_id']}")
-                return result['session_id']
-            
-            return None
+            session_id = self.session_index.lookup(x_point, y_point, timestamp)
+            if session_id:
+                logger.debug(f"Sessão ativa encontrada: {session_id}")
+            return session_id
             
         except Exception as e:
             logger.error(f"Erro ao buscar sessão ativa: {str(e)}")
             logger.error(traceback.format_exc())
             return None
 
+    # Query de inserção em radar_dados (compartilhada pela inserção simples e em lote)
+    INSERT_RADAR_QUERY = """
+        INSERT INTO radar_dados
+        (x_point, y_point, move_speed, heart_rate, breath_rate, 
+        satisfaction_score, satisfaction_class, is_engaged, engagement_duration, 
+        session_id, section_id, product_id, timestamp, serial_number)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+    """
+
+    def _prepare_radar_params(self, data):
+        """
+        Aplica valores padrão, resolve a sessão ativa e monta os parâmetros do INSERT
+        Retorna: tupla de parâmetros ou None se faltar campo obrigatório
+        """
+        # Verificar campos obrigatórios
+        required_fields = ['x_point', 'y_point', 'move_speed']
+        for field in required_fields:
+            if field not in data:
+                logger.error(f"Campo obrigatório ausente: {field}")
+                return None
+        
+        # Garantir valores padrão para campos que podem estar ausentes
+        if 'satisfaction_score' not in data or data['satisfaction_score'] is None:
+            data['satisfaction_score'] = 0.0
+            
+        if 'satisfaction_class' not in data or data['satisfaction_class'] is None:
+            data['satisfaction_class'] = 'NEUTRA'
+            
+        if 'is_engaged' not in data or data['is_engaged'] is None:
+            data['is_engaged'] = False
+            
+        if 'engagement_duration' not in data or data['engagement_duration'] is None:
+            data['engagement_duration'] = 0
+            
+        if 'serial_number' not in data or data['serial_number'] is None:
+            data['serial_number'] = 'SERIAL_2'
+            
+        # Verificar se já existe uma sessão ativa
+        timestamp = data.get('timestamp', datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+        active_session = self.get_active_session(
+            float(data.get('x_point')),
+            float(data.get('y_point')),
+            float(data.get('move_speed')),
+            timestamp
+        )
+        
+        # Usar sessão existente ou criar nova
+        if active_session:
+            data['session_id'] = active_session
+            logger.info(f"Usando sessão existente: {active_session}")
+        elif 'session_id' not in data or data['session_id'] is None:
+            data['session_id'] = str(uuid.uuid4())
+            logger.info(f"Novo session_id gerado: {data['session_id']}")
+            
+        self.session_index.record(
+            float(data.get('x_point')),
+            float(data.get('y_point')),
+            data['session_id'],
+            timestamp
+        )
+            
+        if 'section_id' not in data or data['section_id'] is None:
+            data['section_id'] = 1
+            
+        if 'product_id' not in data or data['product_id'] is None:
+            data['product_id'] = 'UNKNOWN'
+        
+        return (
+            float(data.get('x_point')),
+            float(data.get('y_point')),
+            float(data.get('move_speed')),
+            float(data.get('heart_rate')) if data.get('heart_rate') is not None else None,
+            float(data.get('breath_rate')) if data.get('breath_rate') is not None else None,
+            float(data.get('satisfaction_score', 0)),
+            data.get('satisfaction_class', 'NEUTRA'),
+            bool(data.get('is_engaged', False)),
+            int(data.get('engagement_duration', 0)),
+            data['session_id'],
+            int(data.get('section_id', 1)),
+            data.get('product_id', 'UNKNOWN'),
+            timestamp,
+            data.get('serial_number', 'RADAR_1')
+        )
+
+    # Cadastro idempotente de dispositivo (frame avulso ou flush do write-behind)
+    INSERT_DEVICE_QUERY = """
+        INSERT IGNORE INTO Dispositivos 
+        (serial_number, nome, tipo)
+        VALUES 
+        (%s, %s, %s)
+    """
+
+    def _ensure_radar_device(self, serial_number):
+        """Garante que o dispositivo do frame existe (INSERT IGNORE só na primeira vez)"""
+        if self.is_known_device(serial_number):
+            return
+            
+        with self.connection() as (conn, cursor):
+            cursor.execute(self.INSERT_DEVICE_QUERY, (serial_number, f"Radar {serial_number}", 'RADAR'))
+            conn.commit()
+        logger.info(f"✅ Novo dispositivo registrado: {serial_number}")
+        self._remember_device(serial_number)
+
     def insert_radar_data(self, data):
         """Insere dados do radar no banco"""
         max_retries = 3
         retry_delay = 2  # segundos
         
+        logger.info("="*50)
+        logger.info("Iniciando inserção de dados no banco...")
+        logger.info(f"Dados recebidos: {data}")
+        
+        if 'serial_number' not in data or data['serial_number'] is None:
+            data['serial_number'] = 'SERIAL_2'
+        
+        # Parâmetros montados uma única vez: o retry não registra o ponto de novo no índice de sessões
+        try:
+            params = self._prepare_radar_params(data)
+        except Exception as e:
+            logger.error(f"❌ Erro ao preparar dados: {str(e)}")
+            logger.error(traceback.format_exc())
+            return False
+        if params is None:
+            return False
+        
+        # Write-behind: só o buffer em memória, sem emprestar conexão do pool
+        if self.WRITE_BEHIND:
+            return self._buffer_row(params)
+        
         for attempt in range(max_retries):
             try:
-                logger.info("="*50)
-                logger.info("Iniciando inserção de dados no banco...")
-                logger.info(f"Dados recebidos: {data}")
+                with self.connection() as (conn, cursor):
+                    # Garantir que o dispositivo existe
+                    self._ensure_radar_device(data['serial_number'])
                 
-                # Verificar campos obrigatórios
-                required_fields = ['x_point', 'y_point', 'move_speed']
-                for field in required_fields:
-                    if field not in data:
-                        logger.error(f"Campo obrigatório ausente: {field}")
-                        return False
+                    logger.info(f"Query: {self.INSERT_RADAR_QUERY}")
+                    logger.info(f"Parâmetros: {params}")
                 
-                # Garantir valores padrão para campos que podem estar ausentes
-                if 'satisfaction_score' not in data or data['satisfaction_score'] is None:
-                    data['satisfaction_score'] = 0.0
-                    
-                if 'satisfaction_class' not in data or data['satisfaction_class'] is None:
-                    data['satisfaction_class'] = 'NEUTRA'
-                    
-                if 'is_engaged' not in data or data['is_engaged'] is None:
-                    data['is_engaged'] = False
-                    
-                if 'engagement_duration' not in data or data['engagement_duration'] is None:
-                    data['engagement_duration'] = 0
-                    
-                if 'serial_number' not in data or data['serial_number'] is None:
-                    data['serial_number'] = 'SERIAL_2'
-
-                # Garantir que o dispositivo existe
-                self.cursor.execute("""
-                    INSERT IGNORE INTO Dispositivos 
-                    (serial_number, nome, tipo)
-                    VALUES 
-                    (%s, %s, %s)
-                """, (data['serial_number'], f"Radar {data['serial_number']}", 'RADAR'))
-                self.conn.commit()
-                    
-                # Verificar se já existe uma sessão ativa
-                timestamp = data.get('timestamp', datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
-                active_session = self.get_active_session(
-                    float(data.get('x_point')),
-                    float(data.get('y_point')),
-                    float(data.get('move_speed')),
-                    timestamp
-                )
-                
-                # Usar sessão existente ou criar nova
-                if active_session:
-                    data['session_id'] = active_session
-                    logger.info(f"Usando sessão existente: {active_session}")
-                elif 'session_id' not in data or data['session_id'] is None:
-                    data['session_id'] = str(uuid.uuid4())
-                    logger.info(f"Novo session_id gerado: {data['session_id']}")
-                    
-                if 'section_id' not in data or data['section_id'] is None:
-                    data['section_id'] = 1
+                    # Executar inserção com retry em caso de deadlock
+                    try:
+                        cursor.execute(self.INSERT_RADAR_QUERY, params)
+                        conn.commit()
+                        logger.info("✅ Dados inseridos com sucesso!")
+                        return True
+                    except mysql.connector.errors.DatabaseError as e:
+                        try:
+                            conn.rollback()
+                        except:
+                            pass
+                        if e.errno != 1205 or attempt == max_retries - 1:  # 1205 = lock timeout
+                            raise
+                        logger.warning(f"Lock timeout na tentativa {attempt + 1}, tentando novamente em {retry_delay} segundos...")
                     
-                if 'product_id' not in data or data['product_id'] is None:
-                    data['product_id'] = 'UNKNOWN'
-                
-                # Verificar conexão antes de inserir
-                if not self.conn or not self.conn.is_connected():
-                    logger.info("Reconectando ao banco de dados...")
-                    self.connect_with_retry()
-                
-                # Query de inserção
-                query = """
-                    INSERT INTO radar_dados
-                    (x_point, y_point, move_speed, heart_rate, breath_rate, 
-                    satisfaction_score, satisfaction_class, is_engaged, engagement_duration, 
-                    session_id, section_id, product_id, timestamp, serial_number)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """
-                
-                # Preparar parâmetros
-                params = (
-                    float(data.get('x_point')),
-                    float(data.get('y_point')),
-                    float(data.get('move_speed')),
-                    float(data.get('heart_rate')) if data.get('heart_rate') is not None else None,
-                    float(data.get('breath_rate')) if data.get('breath_rate') is not None else None,
-                    float(data.get('satisfaction_score', 0)),
-                    data.get('satisfaction_class', 'NEUTRA'),
-                    bool(data.get('is_engaged', False)),
-                    int(data.get('engagement_duration', 0)),
-                    data['session_id'],
-                    int(data.get('section_id', 1)),
-                    data.get('product_id', 'UNKNOWN'),
-                    data.get('timestamp', datetime.now().strftime('%Y-%m-%d %H:%M:%S')),
-                    data.get('serial_number', 'RADAR_1')
-                )
-                
-                logger.info(f"Query: {query}")
-                logger.info(f"Parâmetros: {params}")
+            except Exception as e:
+                logger.error(f"❌ Erro ao inserir dados: {str(e)}")
+                logger.error(traceback.format_exc())
+                if attempt == max_retries - 1:
+                    return False
+                logger.info(f"Tentando novamente em {retry_delay} segundos...")
+            
+            # Espera fora do bloco with: a conexão já voltou ao pool
+            time.sleep(retry_delay)
                 
-                # Executar inserção com retry em caso de deadlock
-                try:
-                    self.cursor.execute(query, params)
-                    self.conn.commit()
-                    logger.info("✅ Dados inseridos com sucesso!")
-                    return True
-                except mysql.connector.errors.DatabaseError as e:
-                    if e.errno == 1205 and attempt < max_retries - 1:  # Lock timeout error
+        return False
+
+    def insert_radar_data_batch(self, records):
+        """
+        Insere vários frames do radar com um único INSERT multi-linha e um commit
+        Retorna: lista de booleanos (um por registro) indicando se foi persistido
+        """
+        if not records:
+            return []
+            
+        max_retries = 3
+        retry_delay = 2  # segundos
+        
+        logger.info("="*50)
+        logger.info(f"Iniciando inserção em lote de {len(records)} registros...")
+        
+        # Parâmetros montados uma única vez: o retry não registra os pontos de novo no índice de sessões
+        results = []
+        rows = []
+        for data in records:
+            if 'serial_number' not in data or data['serial_number'] is None:
+                data['serial_number'] = 'SERIAL_2'
+            try:
+                params = self._prepare_radar_params(data)
+            except Exception as e:
+                logger.error(f"❌ Erro ao preparar registro do lote: {str(e)}")
+                params = None
+            results.append(params is not None)
+            if params is not None:
+                rows.append(params)
+        
+        if not rows:
+            return results
+        
+        # Write-behind: só o buffer em memória, sem emprestar conexão do pool
+        if self.WRITE_BEHIND:
+            for params in rows:
+                self._buffer_row(params)
+            return results
+        
+        for attempt in range(max_retries):
+            try:
+                with self.connection() as (conn, cursor):
+                    # Garantir cada dispositivo uma única vez por lote
+                    for serial_number in {params[-1] for params in rows}:
+                        self._ensure_radar_device(serial_number)
+                
+                    # executemany converte INSERT ... VALUES em um único INSERT multi-linha
+                    try:
+                        cursor.executemany(self.INSERT_RADAR_QUERY, rows)
+                        conn.commit()
+                        logger.info(f"✅ {len(rows)} registros inseridos em lote com sucesso!")
+                        return results
+                    except mysql.connector.errors.DatabaseError as e:
+                        try:
+                            conn.rollback()
+                        except:
+                            pass
+                        if e.errno != 1205 or attempt == max_retries - 1:  # 1205 = lock timeout
+                            raise
                         logger.warning(f"Lock timeout na tentativa {attempt + 1}, tentando novamente em {retry_delay} segundos...")
-                        time.sleep(retry_delay)
-                        continue
-                    raise
                     
             except Exception as e:
-                logger.error(f"❌ Erro ao inserir dados: {str(e)}")
+                logger.error(f"❌ Erro ao inserir lote: {str(e)}")
                 logger.error(traceback.format_exc())
-                if attempt < max_retries - 1:
-                    logger.info(f"Tentando novamente em {retry_delay} segundos...")
-                    time.sleep(retry_delay)
-                    continue
-                return False
+                if attempt == max_retries - 1:
+                    return [False] * len(records)
+                logger.info(f"Tentando novamente em {retry_delay} segundos...")
+            
+            # Espera fora do bloco with: a conexão já voltou ao pool
+            time.sleep(retry_delay)
                 
-        return False
+        return [False] * len(records)
 
 # Instância global do gerenciador de banco de dados
 try:
     logger.info("Iniciando DatabaseManager...")
     db_manager = DatabaseManager()
     logger.info("✅ DatabaseManager iniciado com sucesso!")
+    shelf_manager.reload_sections(db_manager)
 except Exception as e:
     logger.error(f"❌ Erro ao criar instância do DatabaseManager: {e}")
     logger.error(traceback.format_exc())
@@ -909,10 +1357,6 @@ class AnalyticsManager:
         # Pesos para o cálculo de satisfação
         self.WEIGHT_HEART_RATE = 0.5
         self.WEIGHT_RESP_RATE = 0.5
-        
-        # Rastreamento de engajamento
-        self.engagement_start_time = None
-        self.last_movement_time = None
 
     def calculate_satisfaction_score(self, move_speed, heart_rate, breath_rate):
         """
@@ -963,48 +1407,13 @@ class AnalyticsManager:
             logger.error(traceback.format_exc())
             return 50, 'Neutro'  # Valor padrão em caso de erro
 
-    def calculate_engagement(self, records):
-        """
-        Calcula engajamento baseado no histórico de registros
-        Retorna: 
-        - is_engaged: booleano indicando se está engajado
-        - duration: duração do engajamento em segundos
-        """
-        if not records or len(records) < 2:
-            logger.info("Não há registros suficientes para calcular engajamento")
-            return False, 0
-
-        # Ordenar registros por timestamp
-        records = sorted(records, key=lambda x: x['timestamp'])
-        
-        # Verificar se há movimento contínuo baixo
-        engagement_start = None
-        last_low_movement = None
-        
-        for record in records:
-            move_speed = float(record['move_speed'])
-            current_time = datetime.strptime(record['timestamp'], '%Y-%m-%d %H:%M:%S')
-            
-            if move_speed <= self.MOVEMENT_THRESHOLD:
-                if not engagement_start:
-                    engagement_start = current_time
-                last_low_movement = current_time
-            else:
-                # Reset se movimento for alto
-                engagement_start = None
-
-        # Calcular duração se houver engajamento
-        if engagement_start and last_low_movement:
-            duration = (last_low_movement - engagement_start).total_seconds()
-            is_engaged = duration >= self.ENGAGEMENT_MIN_DURATION
-            
-            logger.info(f"Engajamento calculado: {is_engaged} (duração: {duration:.1f}s)")
-            return is_engaged, int(duration)
-
-        return False, 0
+    def create_engagement_tracker(self):
+        """Cria um rastreador incremental com os limites deste AnalyticsManager"""
+        return EngagementTracker(
+            movement_threshold=self.MOVEMENT_THRESHOLD,
+            min_duration=self.ENGAGEMENT_MIN_DURATION
+        )
 
-# Instância global do analytics manager
-analytics_manager = AnalyticsManager()
 
 class UserSessionManager:
     def __init__(self):
@@ -1193,159 +1602,19 @@ class UserSessionManager:
                 except Exception as e:
                     logger.error(f"Erro ao salvar sessão expirada: {str(e)}")
 
-# Instância global do gerenciador de sessões
-user_session_manager = UserSessionManager()
 
-class DataSmoother:
-    def __init__(self, window_size=5):
-        """
-        Inicializa o suavizador de dados
-        window_size: tamanho da janela para média móvel
-        """
-        self.window_size = window_size
-        self.heart_rate_history = []
-        self.breath_rate_history = []
-        
-    def smooth_heart_rate(self, heart_rate):
-        """Suaviza o valor de heart_rate usando média móvel"""
-        if heart_rate is None:
-            return None
-            
-        self.heart_rate_history.append(heart_rate)
-        if len(self.heart_rate_history) > self.window_size:
-            self.heart_rate_history.pop(0)
-            
-        if len(self.heart_rate_history) < 2:
-            return heart_rate
-            
-        return sum(self.heart_rate_history) / len(self.heart_rate_history)
-        
-    def smooth_breath_rate(self, breath_rate):
-        """Suaviza o valor de breath_rate usando média móvel"""
-        if breath_rate is None:
-            return None
-            
-        self.breath_rate_history.append(breath_rate)
-        if len(self.breath_rate_history) > self.window_size:
-            self.breath_rate_history.pop(0)
-            
-        if len(self.breath_rate_history) < 2:
-            return breath_rate
-            
-        return sum(self.breath_rate_history) / len(self.breath_rate_history)
-        
-    def detect_anomalies(self, heart_rate, breath_rate):
-        """
-        Detecta anomalias nos dados vitais
-        Retorna: (is_heart_anomaly, is_breath_anomaly)
-        """
-        if not self.heart_rate_history or not self.breath_rate_history:
-            return False, False
-            
-        # Calcular médias e desvios padrão
-        heart_mean = sum(self.heart_rate_history) / len(self.heart_rate_history)
-        breath_mean = sum(self.breath_rate_history) / len(self.breath_rate_history)
-        
-        heart_std = (sum((x - heart_mean) ** 2 for x in self.heart_rate_history) / len(self.heart_rate_history)) ** 0.5
-        breath_std = (sum((x - breath_mean) ** 2 for x in self.breath_rate_history) / len(self.breath_rate_history)) ** 0.5
-        
-        # Definir limites para detecção de anomalias (2 desvios padrão)
-        heart_threshold = 2 * heart_std
-        breath_threshold = 2 * breath_std
-        
-        # Verificar se os valores atuais são anomalias
-        is_heart_anomaly = heart_rate is not None and abs(heart_rate - heart_mean) > heart_threshold
-        is_breath_anomaly = breath_rate is not None and abs(breath_rate - breath_mean) > breath_threshold
-        
-        return is_heart_anomaly, is_breath_anomaly
+# Configuração modelo do amostrador adaptativo (copiada para cada dispositivo)
+adaptive_sampler = AdaptiveSampler()
 
-# Instância global do suavizador de dados
-data_smoother = DataSmoother()
+# Tamanho da janela de suavização dos sinais vitais (amostras por dispositivo)
+SMOOTHING_WINDOW = int(os.getenv("RADAR_SMOOTHING_WINDOW", 5))
 
-class AdaptiveSampler:
-    def __init__(self):
-        # Configurações de amostragem
-        self.HIGH_ACTIVITY_THRESHOLD = 30.0  # cm/s - acima disso é considerado movimento significativo
-        self.LOW_ACTIVITY_THRESHOLD = 10.0   # cm/s - abaixo disso é considerado movimento mínimo
-        
-        # Intervalos de amostragem em milissegundos
-        self.HIGH_ACTIVITY_INTERVAL = 200    # 5 amostras por segundo para atividade alta
-        self.MEDIUM_ACTIVITY_INTERVAL = 500  # 2 amostras por segundo para atividade média
-        self.LOW_ACTIVITY_INTERVAL = 1000    # 1 amostra por segundo para atividade baixa
-        self.IDLE_INTERVAL = 2000            # 1 amostra a cada 2 segundos para inatividade
-        
-        # Estado atual
-        self.current_sampling_interval = self.MEDIUM_ACTIVITY_INTERVAL
-        self.last_sample_time = None
-        self.last_movement_speed = 0
-        self.consecutive_idle_count = 0
-        self.max_idle_count = 5  # Número máximo de amostras consecutivas em estado de inatividade
-        
-    def should_sample(self, current_time, movement_speed):
-        """
-        Determina se devemos coletar uma amostra com base na atividade atual
-        Retorna: (bool, int) - se deve amostrar e o próximo intervalo recomendado
-        """
-        # Na primeira chamada, sempre amostrar
-        if self.last_sample_time is None:
-            self.last_sample_time = current_time
-            return True, self.MEDIUM_ACTIVITY_INTERVAL
-        
-        # Calcular tempo decorrido desde a última amostra
-        elapsed_time = (current_time - self.last_sample_time).total_seconds() * 1000  # em ms
-        
-        # Determinar o intervalo de amostragem com base na velocidade de movimento
-        if movement_speed > self.HIGH_ACTIVITY_THRESHOLD:
-            # Atividade alta - amostragem frequente
-            self.current_sampling_interval = self.HIGH_ACTIVITY_INTERVAL
-            self.consecutive_idle_count = 0
-            logger.info(f"Atividade alta detectada: {movement_speed:.1f} cm/s - amostragem a cada {self.current_sampling_interval} ms")
-        elif movement_speed > self.LOW_ACTIVITY_THRESHOLD:
-            # Atividade média - amostragem normal
-            self.current_sampling_interval = self.MEDIUM_ACTIVITY_INTERVAL
-            self.consecutive_idle_count = 0
-            logger.info(f"Atividade média detectada: {movement_speed:.1f} cm/s - amostragem a cada {self.current_sampling_interval} ms")
-        else:
-            # Atividade baixa ou inatividade
-            if movement_speed <= self.LOW_ACTIVITY_THRESHOLD / 2:
-                # Incrementar contador de inatividade
-                self.consecutive_idle_count += 1
-                
-                # Após várias amostras consecutivas de inatividade, reduzir ainda mais a frequência
-                if self.consecutive_idle_count >= self.max_idle_count:
-                    self.current_sampling_interval = self.IDLE_INTERVAL
-                    logger.info(f"Inatividade prolongada: {movement_speed:.1f} cm/s - amostragem a cada {self.current_sampling_interval} ms")
-                else:
-                    self.current_sampling_interval = self.LOW_ACTIVITY_INTERVAL
-                    logger.info(f"Atividade baixa detectada: {movement_speed:.1f} cm/s - amostragem a cada {self.current_sampling_interval} ms")
-            else:
-                self.current_sampling_interval = self.LOW_ACTIVITY_INTERVAL
-                logger.info(f"Atividade baixa detectada: {movement_speed:.1f} cm/s - amostragem a cada {self.current_sampling_interval} ms")
-        
-        # Verificar se o tempo decorrido é maior que o intervalo atual
-        should_sample = elapsed_time >= self.current_sampling_interval
-        
-        # Mudanças abruptas na velocidade sempre devem ser amostradas
-        if abs(movement_speed - self.last_movement_speed) > self.HIGH_ACTIVITY_THRESHOLD:
-            logger.info(f"Mudança abrupta na velocidade detectada: {self.last_movement_speed:.1f} -> {movement_speed:.1f} cm/s")
-            should_sample = True
-        
-        # Atualizar estado se for amostrar
-        if should_sample:
-            self.last_sample_time = current_time
-            self.last_movement_speed = movement_speed
-        
-        return should_sample, self.current_sampling_interval
-        
-    def reset(self):
-        """Reinicia o estado do amostrador"""
-        self.last_sample_time = None
-        self.last_movement_speed = 0
-        self.consecutive_idle_count = 0
-        self.current_sampling_interval = self.MEDIUM_ACTIVITY_INTERVAL
+def create_device_state(serial_number, sampler_template):
+    """Estado de um dispositivo novo; as sessões vêm do índice do DatabaseManager"""
+    return DeviceState(serial_number, sampler_template, AnalyticsManager, smoothing_window=SMOOTHING_WINDOW)
 
-# Instância global do amostrador adaptativo
-adaptive_sampler = AdaptiveSampler()
+# Instância global do registro de estados por dispositivo
+device_states = DeviceStateRegistry(adaptive_sampler, create_device_state)
 
 class ZoneManager:
     def __init__(self):
@@ -1358,39 +1627,7 @@ class ZoneManager:
     def get_zone_at_position(self, x, y):
         """Identifica a zona baseado nas coordenadas (x, y)"""
         try:
-            # Buscar áreas ativas que contenham o ponto (x, y)
-            query = """
-                SELECT * FROM areas
-                WHERE is_active = TRUE
-                AND x_start <= %s AND x_end >= %s
-                AND y_start <= %s AND y_end >= %s
-                ORDER BY ABS(x_start - %s) + ABS(y_start - %s)
-                LIMIT 1
-            """
-            
-            params = (x, x, y, y, x, y)
-            
-            db_manager.cursor.execute(query, params)
-            area = db_manager.cursor.fetchone()
-            
-            if area:
-                # Calcular distância do ponto ao centro da área
-                center_x = (area['x_start'] + area['x_end']) / 2
-                center_y = (area['y_start'] + area['y_end']) / 2
-                distance = ((x - center_x) ** 2 + (y - center_y) ** 2) ** 0.5
-                
-                return {
-                    'area_id': area['id'],
-                    'area_name': area['area_name'],
-                    'description': area['description'],
-                    'distance': distance
-                }
-            
-            return {
-                'area_name': 'FORA_ALCANCE',
-                'description': 'Área fora do alcance de monitoramento',
-                'distance': abs(y)
-            }
+            return position_classifier.classify_zone(x, y)
             
         except Exception as e:
             logger.error(f"❌ Erro ao buscar área: {str(e)}")
@@ -1515,12 +1752,499 @@ class AreaManager:
 # Instância global do gerenciador de áreas
 area_manager = AreaManager()
 
+class PositionClassifier:
+    """
+    Classificador de posição por tabela raster pré-calculada
+    O plano do radar é quantizado em células de RESOLUTION metros e cada célula guarda
+    o índice da seção, da faixa de área e da zona; classificar um ponto é um acesso ao array
+    """
+    
+    def __init__(self, resolution=0.01, half_range=2.0):
+        self.RESOLUTION = resolution    # metros por célula
+        self.HALF_RANGE = half_range    # cobre [-HALF_RANGE, HALF_RANGE] em x e em y
+        self.SIZE = int(round(2 * half_range / resolution))
+        self.ORIGIN = -half_range
+        
+        # Centro de cada célula ao longo de um eixo (mesmos valores para x e y)
+        self._centers = self.ORIGIN + (np.arange(self.SIZE) + 0.5) * resolution
+        empty = np.full((self.SIZE, self.SIZE), -1, dtype=np.int16)
+        
+        # Cada camada é uma tupla substituída de uma só vez: (itens, ..., grade)
+        # O índice -1 da grade aponta para o último elemento dos arrays auxiliares, o valor "nenhum"
+        self._build_lock = threading.Lock()
+        self._sections_version = 0
+        self._section_layer = ([], np.array([-1], dtype=np.int64), empty)
+        self._area_layer = ([], np.array([np.inf]), empty)
+        self._zone_layer = ([], empty)
+        
+        # Zonas (tabela areas): recarregadas a cada ZONE_TTL_SECONDS; após falha, nova tentativa
+        # só depois de RELOAD_RETRY_SECONDS para não consultar o banco a cada frame
+        self.ZONE_TTL_SECONDS = float(os.getenv("RADAR_ZONE_TTL_SECONDS", 60))
+        self.RELOAD_RETRY_SECONDS = 5.0
+        self._zone_lock = threading.Lock()
+        self._next_zone_reload_at = 0
+        
+        self.build_area_layer(area_manager)
+        
+    def _index_range(self, low, high):
+        """Faixa de células (inclusiva) cujo centro está em [low, high]"""
+        first = max(int(np.ceil((low - self.ORIGIN) / self.RESOLUTION - 0.5)), 0)
+        last = min(int(np.floor((high - self.ORIGIN) / self.RESOLUTION - 0.5)), self.SIZE - 1)
+        return first, last
+        
+    def _y_band_column(self, bands):
+        """Índice da primeira faixa [y_min, y_max) que contém o centro de cada célula em y"""
+        column = np.full(self.SIZE, -1, dtype=np.int16)
+        # Ordem inversa: em faixas sobrepostas vale a primeira, como nas buscas originais
+        for i in reversed(range(len(bands))):
+            y_min, y_max = bands[i]
+            column[(self._centers >= y_min) & (self._centers < y_max)] = i
+        return np.broadcast_to(column[None, :], (self.SIZE, self.SIZE))
+        
+    def _cell(self, x, y):
+        """Célula (ix, iy) do ponto ou None se estiver fora do raster"""
+        ix = int((x - self.ORIGIN) // self.RESOLUTION)
+        iy = int((y - self.ORIGIN) // self.RESOLUTION)
+        if 0 <= ix < self.SIZE and 0 <= iy < self.SIZE:
+            return ix, iy
+        return None
+        
+    def build_section_layer(self, version, sections):
+        """Rasteriza as seções; em sobreposição vence a de início mais próximo da célula"""
+        grid = np.full((self.SIZE, self.SIZE), -1, dtype=np.int16)
+        best_rank = np.full((self.SIZE, self.SIZE), np.inf, dtype=np.float32)
+        margin = shelf_manager.MARGIN
+        
+        for i, section in enumerate(sections):
+            ix0, ix1 = self._index_range(section['x_start'] - margin, section['x_end'] + margin)
+            iy0, iy1 = self._index_range(section['y_start'] - margin, section['y_end'] + margin)
+            if ix0 > ix1 or iy0 > iy1:
+                continue
+            xs = self._centers[ix0:ix1 + 1, None]
+            ys = self._centers[None, iy0:iy1 + 1]
+            rank = np.abs(section['x_start'] - xs) + np.abs(section['y_start'] - ys)
+            
+            block_rank = best_rank[ix0:ix1 + 1, iy0:iy1 + 1]
+            block_grid = grid[ix0:ix1 + 1, iy0:iy1 + 1]
+            closer = rank < block_rank
+            block_rank[closer] = rank[closer]
+            block_grid[closer] = i
+            
+        section_ids = np.array([section['section_id'] for section in sections] + [-1], dtype=np.int64)
+        self._section_layer = (list(sections), section_ids, grid)
+        self._sections_version = version
+        logger.info(f"✅ Raster de seções construído ({len(sections)} seções, {self.SIZE}x{self.SIZE} células)")
+        
+    def build_area_layer(self, area_manager):
+        """Rasteriza as faixas de área do AreaManager (dependem apenas de y)"""
+        names = list(area_manager.areas.keys())
+        bands = [(area_manager.areas[name]['y_min'], area_manager.areas[name]['y_max']) for name in names]
+        thresholds = np.array([area_manager.areas[name]['speed_threshold'] for name in names] + [np.inf])
+        self._area_layer = (names, thresholds, self._y_band_column(bands))
+            
+    def load_zones(self, db_manager):
+        """
+        Carrega as zonas ativas da tabela areas e rasteriza suas faixas de y
+        Em caso de falha mantém as zonas anteriores e agenda nova tentativa
+        """
+        try:
+            with db_manager.connection() as (conn, cursor):
+                cursor.execute("""
+                    SELECT id, area_name, description, y_min, y_max
+                    FROM areas
+                    WHERE is_active = TRUE
+                    ORDER BY id
+                """)
+                zones = cursor.fetchall()
+        except Exception as e:
+            logger.error(f"❌ Erro ao carregar zonas: {str(e)}")
+            logger.error(traceback.format_exc())
+            self._next_zone_reload_at = time.time() + self.RELOAD_RETRY_SECONDS
+            return None
+            
+        bands = [(zone['y_min'], zone['y_max']) for zone in zones]
+        self._zone_layer = (zones, self._y_band_column(bands))
+        self._next_zone_reload_at = time.time() + self.ZONE_TTL_SECONDS
+        logger.info(f"✅ Raster de zonas construído ({len(zones)} zonas)")
+        return len(zones)
+        
+    def _refresh_zones(self):
+        """Recarrega as zonas quando o TTL expira ou a carga anterior falhou"""
+        if not db_manager or time.time() < self._next_zone_reload_at:
+            return
+        # Uma thread recarrega; as demais seguem com o raster atual
+        if not self._zone_lock.acquire(blocking=False):
+            return
+        try:
+            if time.time() >= self._next_zone_reload_at:
+                self.load_zones(db_manager)
+        finally:
+            self._zone_lock.release()
+        
+    def _refresh_sections(self):
+        """Reconstrói o raster de seções se o índice do ShelfManager mudou"""
+        if shelf_manager.index_version and self._sections_version == shelf_manager.index_version:
+            return
+        with self._build_lock:
+            version, sections = shelf_manager.get_active_sections(db_manager)
+            if version and version != self._sections_version:
+                self.build_section_layer(version, sections)
+                
+    @staticmethod
+    def _zone_result(zones, zone_index, y):
+        if zone_index < 0:
+            return {
+                'area_name': 'FORA_ALCANCE',
+                'description': 'Área fora do alcance de monitoramento',
+                'distance': abs(y)
+            }
+        zone = zones[zone_index]
+        return {
+            'area_id': zone['id'],
+            'area_name': zone['area_name'],
+            'description': zone['description'],
+            'distance': abs(y)
+        }
+        
+    @staticmethod
+    def _zone_index_exact(zones, y):
+        """Busca da zona fora do raster (varre a lista de zonas)"""
+        for i, zone in enumerate(zones):
+            if zone['y_min'] <= y < zone['y_max']:
+                return i
+        return -1
+        
+    def classify(self, x, y, speed):
+        """
+        Classifica um ponto
+        Retorna: (seção ou None, área ou None, zona) nos mesmos formatos de
+        ShelfManager.get_section_at_position, AreaManager.get_area_at_position e ZoneManager.get_zone_at_position
+        """
+        self._refresh_sections()
+        self._refresh_zones()
+        sections, _, section_grid = self._section_layer
+        area_names, thresholds, area_grid = self._area_layer
+        zones, zone_grid = self._zone_layer
+        
+        cell = self._cell(x, y)
+        if cell is None:
+            # Fora do raster: usar as buscas exatas
+            section = shelf_manager.get_section_at_position(x, y)
+            area = area_manager.get_area_at_position(x, y, speed)
+            return section, area, self._zone_result(zones, self._zone_index_exact(zones, y), y)
+            
+        section_index = section_grid[cell]
+        area_index = area_grid[cell]
+        
+        section = dict(sections[section_index]) if section_index >= 0 else None
+        
+        area = None
+        if area_index >= 0 and speed >= thresholds[area_index]:
+            name = area_names[area_index]
+            area = {
+                'area_name': name,
+                'description': area_manager.areas[name]['description'],
+                'y_distance': y,
+                'speed': speed
+            }
+            
+        return section, area, self._zone_result(zones, zone_grid[cell], y)
+        
+    def classify_zone(self, x, y):
+        """Classifica apenas a zona de um ponto"""
+        self._refresh_zones()
+        zones, zone_grid = self._zone_layer
+        cell = self._cell(x, y)
+        zone_index = zone_grid[cell] if cell is not None else self._zone_index_exact(zones, y)
+        return self._zone_result(zones, zone_index, y)
+        
+    def classify_points(self, xs, ys, speeds=None):
+        """
+        Classifica um array de pontos de uma vez (para reprocessamento de históricos)
+        Sem speeds, a área é a faixa de y ignorando o limite de velocidade
+        Retorna: dict com arrays 'section_id' (-1 = nenhuma), 'product_id', 'area_name' e 'zone_name'
+        """
+        self._refresh_sections()
+        self._refresh_zones()
+        sections, section_ids, section_grid = self._section_layer
+        area_names, thresholds, area_grid = self._area_layer
+        zones, zone_grid = self._zone_layer
+        
+        xs = np.asarray(xs, dtype=float)
+        ys = np.asarray(ys, dtype=float)
+        speeds = np.full(xs.shape, np.inf) if speeds is None else np.asarray(speeds, dtype=float)
+        
+        ix = np.floor((xs - self.ORIGIN) / self.RESOLUTION).astype(np.int64)
+        iy = np.floor((ys - self.ORIGIN) / self.RESOLUTION).astype(np.int64)
+        inside = (ix >= 0) & (ix < self.SIZE) & (iy >= 0) & (iy < self.SIZE)
+        ix = np.clip(ix, 0, self.SIZE - 1)
+        iy = np.clip(iy, 0, self.SIZE - 1)
+        
+        section_index = np.where(inside, section_grid[ix, iy], -1)
+        area_index = np.where(inside, area_grid[ix, iy], -1)
+        area_index = np.where(speeds >= thresholds[area_index], area_index, -1)
+        zone_index = np.where(inside, zone_grid[ix, iy], -1)
+        
+        # Pontos fora do raster: busca exata um a um (raros)
+        outside = np.flatnonzero(~inside)
+        if outside.size:
+            position = {section['section_id']: i for i, section in enumerate(sections)}
+            for i in outside:
+                section = shelf_manager.get_section_at_position(xs[i], ys[i])
+                area = area_manager.get_area_at_position(xs[i], ys[i], speeds[i])
+                section_index[i] = position.get(section['section_id'], -1) if section else -1
+                area_index[i] = area_names.index(area['area_name']) if area else -1
+                zone_index[i] = self._zone_index_exact(zones, ys[i])
+                
+        product_ids = np.array([section['product_id'] for section in sections] + [None], dtype=object)
+        area_labels = np.array(area_names + [None], dtype=object)
+        zone_labels = np.array([zone['area_name'] for zone in zones] + ['FORA_ALCANCE'], dtype=object)
+        return {
+            'section_id': section_ids[section_index],
+            'product_id': product_ids[section_index],
+            'area_name': area_labels[area_index],
+            'zone_name': zone_labels[zone_index]
+        }
+
+# Instância global do classificador de posição
+position_classifier = PositionClassifier(
+    resolution=float(os.getenv("RADAR_GRID_RESOLUTION", 0.01)),
+    half_range=float(os.getenv("RADAR_GRID_RANGE", 2.0))
+)
+# Carga inicial das zonas; se falhar, classify tenta de novo (RELOAD_RETRY_SECONDS)
+if db_manager:
+    position_classifier.load_zones(db_manager)
+
+class IngestQueue:
+    """
+    Fila limitada em memória para o modo de ingestão assíncrono
+    Os endpoints apenas validam e enfileiram; threads de escrita drenam a fila para o MySQL
+    """
+    
+    def __init__(self, db_manager, max_size=1000, num_workers=1):
+        self.db_manager = db_manager
+        self.queue = queue.Queue(maxsize=max_size)
+        self.num_workers = num_workers
+        self.workers = []
+        self.is_running = False
+        
+        # Contadores para monitoramento
+        self.stats_lock = threading.Lock()
+        self.frames_enqueued = 0
+        self.frames_persisted = 0
+        self.frames_failed = 0
+        self.frames_rejected = 0
+        
+    def start(self):
+        """Inicia as threads de escrita"""
+        self.is_running = True
+        for i in range(self.num_workers):
+            worker = threading.Thread(target=self._worker_loop, name=f"ingest-writer-{i}")
+            worker.daemon = True
+            worker.start()
+            self.workers.append(worker)
+        logger.info(f"✅ Fila de ingestão iniciada ({self.num_workers} escritores, capacidade {self.queue.maxsize})")
+        
+    def enqueue(self, records):
+        """
+        Enfileira uma lista de frames já processados para persistência
+        Retorna: False se a fila estiver cheia
+        """
+        try:
+            self.queue.put_nowait(records)
+        except queue.Full:
+            with self.stats_lock:
+                self.frames_rejected += len(records)
+            logger.warning(f"⚠️ Fila de ingestão cheia, {len(records)} frames rejeitados")
+            return False
+            
+        with self.stats_lock:
+            self.frames_enqueued += len(records)
+        return True
+        
+    def _worker_loop(self):
+        """Drena a fila e grava os frames no banco"""
+        while True:
+            records = self.queue.get()
+            try:
+                if records is None:
+                    return
+                    
+                if len(records) == 1:
+                    results = [self.db_manager.insert_radar_data(records[0])]
+                else:
+                    results = self.db_manager.insert_radar_data_batch(records)
+                    
+                persisted = sum(1 for success in results if success)
+                with self.stats_lock:
+                    self.frames_persisted += persisted
+                    self.frames_failed += len(records) - persisted
+                    
+                if persisted < len(records):
+                    logger.error(f"❌ Escritor: {len(records) - persisted} frames não foram persistidos")
+                    
+            except Exception as e:
+                with self.stats_lock:
+                    self.frames_failed += len(records)
+                logger.error(f"❌ Erro no escritor da fila de ingestão: {str(e)}")
+                logger.error(traceback.format_exc())
+            finally:
+                self.queue.task_done()
+                
+    def stop(self, timeout=10):
+        """Drena o que restou na fila e encerra os escritores"""
+        if not self.is_running:
+            return
+        self.is_running = False
+        
+        logger.info(f"Encerrando fila de ingestão ({self.queue.qsize()} lotes pendentes)...")
+        for _ in self.workers:
+            self.queue.put(None)
+        for worker in self.workers:
+            worker.join(timeout=timeout)
+        logger.info("✅ Fila de ingestão encerrada")
+        
+    def get_stats(self):
+        """Retorna os contadores da fila"""
+        with self.stats_lock:
+            return {
+                "queue_depth": self.queue.qsize(),
+                "queue_capacity": self.queue.maxsize,
+                "workers": self.num_workers,
+                "frames_enqueued": self.frames_enqueued,
+                "frames_persisted": self.frames_persisted,
+                "frames_failed": self.frames_failed,
+                "frames_rejected": self.frames_rejected
+            }
+
+# Modo de ingestão: 'sync' grava antes de responder, 'async' responde 202 e grava em background
+INGEST_MODE = os.getenv("RADAR_INGEST_MODE", "sync").lower()
+
+ingest_queue = None
+if INGEST_MODE == 'async' and db_manager:
+    ingest_queue = IngestQueue(
+        db_manager,
+        max_size=int(os.getenv("RADAR_INGEST_QUEUE_SIZE", 1000)),
+        num_workers=int(os.getenv("RADAR_INGEST_WORKERS", 1))
+    )
+    ingest_queue.start()
+    atexit.register(ingest_queue.stop)
+
+# Limite de frames aceitos em uma única requisição de lote
+MAX_BATCH_FRAMES = int(os.getenv("RADAR_BATCH_MAX_FRAMES", DEFAULT_MAX_BATCH_FRAMES))
+
+# Limites do corpo HTTP (Content-Encoding gzip/deflate é descomprimido em streaming)
+BODY_LIMITS = {
+    "max_body_bytes": int(os.getenv("RADAR_MAX_BODY_BYTES", 1024 * 1024)),
+    "max_decompressed_bytes": int(os.getenv("RADAR_MAX_DECOMPRESSED_BYTES", 8 * 1024 * 1024)),
+    "max_ratio": float(os.getenv("RADAR_MAX_COMPRESSION_RATIO", 100))
+}
+
+def process_radar_frame(raw_data, current_time, apply_sampling=True):
+    """
+    Executa o pipeline de um frame: conversão, amostragem, área, seção e scores
+    apply_sampling=False é usado nos lotes: o dispositivo já amostrou os frames
+    Retorna: (status, converted_data, next_interval)
+    status pode ser: 'accepted', 'skipped', 'invalid'
+    """
+    # Converter dados
+    converted_data = convert_radar_data(raw_data)
+    if not converted_data:
+        return 'invalid', None, None
+
+    # Estado próprio do dispositivo (amostragem, analytics), isolado dos demais radares
+    serial_number = converted_data.get('serial_number') or 'SERIAL_2'
+    state = device_states.get(serial_number)
+
+    # Verificar política de amostragem
+    with state.lock:
+        if apply_sampling:
+            should_sample, next_interval = state.sampler.should_sample(
+                current_time, 
+                converted_data['move_speed']
+            )
+        else:
+            should_sample, next_interval = True, state.sampler.current_sampling_interval
+
+    if not should_sample:
+        logger.info(f"Amostra ignorada pela política de amostragem. Próximo intervalo: {next_interval}ms")
+        return 'skipped', converted_data, next_interval
+        
+    # Adicionar timestamp
+    converted_data['timestamp'] = current_time.strftime('%Y-%m-%d %H:%M:%S')
+
+    # Identificar área e seção baseado na posição (um acesso ao raster)
+    section, area, zone = position_classifier.classify(
+        converted_data['x_point'],
+        converted_data['y_point'],
+        converted_data['move_speed']
+    )
+    area_name = area['area_name'] if area else None
+    logger.info(f"🎯 Área atual: {area_name} (zona: {zone['area_name']}, distância: {converted_data['y_point']:.2f}m)")
+    
+    if section:
+        converted_data['section_id'] = section['section_id']
+        converted_data['product_id'] = section['product_id']
+        logger.info(f"📍 Seção detectada: {section['name']} (Produto: {section['product_id']})")
+    else:
+        converted_data['section_id'] = None
+        converted_data['product_id'] = None
+        
+    # Adicionar informação da área e da zona (tabela areas)
+    converted_data['area'] = area_name
+    converted_data['zone'] = zone['area_name']
+    
+    with state.lock:
+        # Suavizar dados vitais na janela do dispositivo (usados só no score de satisfação;
+        # heart_rate e breath_rate gravados continuam sendo as leituras do radar)
+        heart_rate = state.smoother.smooth_heart_rate(converted_data.get('heart_rate'))
+        breath_rate = state.smoother.smooth_breath_rate(converted_data.get('breath_rate'))
+        
+        # Atualizar engajamento incrementalmente com o frame atual
+        engagement_level, engagement_duration = state.engagement.update(
+            converted_data['x_point'],
+            converted_data['y_point'],
+            converted_data['move_speed'],
+            current_time.timestamp()
+        )
+        is_engaged = engagement_level == 2
+        engagement_duration = int(engagement_duration)
+        converted_data['is_engaged'] = is_engaged
+        converted_data['engagement_duration'] = engagement_duration
+        
+        # Calcular satisfação com os valores suavizados
+        satisfaction_data = state.analytics.calculate_satisfaction_score(
+            converted_data.get('move_speed'),
+            heart_rate,
+            breath_rate
+        )
+    
+    converted_data['satisfaction_score'] = satisfaction_data[0]
+    converted_data['satisfaction_class'] = satisfaction_data[1]
+    
+    # Log dos dados calculados
+    logger.info(f"Dados de engajamento: engajado={is_engaged}, duração={engagement_duration}s")
+    logger.info(f"Dados de satisfação: score={satisfaction_data[0]}, class={satisfaction_data[1]}")
+    
+    return 'accepted', converted_data, next_interval
+
 @app.route('/radar/data', methods=['POST'])
 def receive_radar_data():
     """Endpoint para receber dados do radar"""
     try:
-        # Obter dados do request
-        data = request.get_json()
+        # Obter dados do request (descomprimindo gzip/deflate se necessário)
+        try:
+            data = json.loads(read_request_body(request, **BODY_LIMITS))
+        except RequestBodyError as e:
+            return jsonify({
+                "status": "error",
+                "message": str(e)
+            }), e.status_code
+        except ValueError as e:
+            return jsonify({
+                "status": "error",
+                "message": f"JSON inválido: {str(e)}"
+            }), 400
         current_time = datetime.now()
         
         logger.info("==================================================")
@@ -1528,77 +2252,35 @@ def receive_radar_data():
         logger.info(f"Headers: {request.headers}")
         logger.info(f"Dados recebidos: {data}")
         
-        # Converter dados
-        converted_data = convert_radar_data(data)
-        if not converted_data:
+        status, converted_data, next_interval = process_radar_frame(data, current_time)
+        
+        if status == 'invalid':
             return jsonify({
                 "status": "error",
                 "message": "Dados inválidos"
             }), 400
 
-        # Verificar política de amostragem
-        should_sample, next_interval = adaptive_sampler.should_sample(
-            current_time, 
-            converted_data['move_speed']
-        )
-
-        if not should_sample:
-            logger.info(f"Amostra ignorada pela política de amostragem. Próximo intervalo: {next_interval}ms")
+        if status == 'skipped':
             return jsonify({
                 "status": "success",
                 "message": "Amostra ignorada pela política de amostragem",
                 "next_sample_interval_ms": next_interval
             })
-            
-        # Adicionar timestamp
-        converted_data['timestamp'] = current_time.strftime('%Y-%m-%d %H:%M:%S')
-
-        # Identificar área atual
-        area = area_manager.get_area_at_position(
-            converted_data['x_point'],
-            converted_data['y_point'],
-            converted_data['move_speed']
-        )
-        logger.info(f"🎯 Área atual: {area['area_name']} (distância: {area['distance']:.2f}m)")
-        
-        # Identificar seção baseado na posição
-        section = shelf_manager.get_section_at_position(
-            converted_data['x_point'],
-            converted_data['y_point']
-        )
-        
-        if section:
-            converted_data['section_id'] = section['section_id']
-            converted_data['product_id'] = section['product_id']
-            logger.info(f"📍 Seção detectada: {section['name']} (Produto: {section['product_id']})")
-        else:
-            converted_data['section_id'] = None
-            converted_data['product_id'] = None
-            
-        # Adicionar informação da área
-        converted_data['area'] = area['area_name']
-        
-        # Obter últimos registros para calcular engajamento
-        last_records = db_manager.get_last_records(10)
-        
-        # Calcular engajamento
-        is_engaged, engagement_duration = analytics_manager.calculate_engagement(last_records)
-        converted_data['is_engaged'] = is_engaged
-        converted_data['engagement_duration'] = engagement_duration
-        
-        # Calcular satisfação
-        satisfaction_data = analytics_manager.calculate_satisfaction_score(
-            converted_data.get('move_speed'),
-            converted_data.get('heart_rate'),
-            converted_data.get('breath_rate')
-        )
         
-        converted_data['satisfaction_score'] = satisfaction_data[0]
-        converted_data['satisfaction_class'] = satisfaction_data[1]
-        
-        # Log dos dados calculados
-        logger.info(f"Dados de engajamento: engajado={is_engaged}, duração={engagement_duration}s")
-        logger.info(f"Dados de satisfação: score={satisfaction_data[0]}, class={satisfaction_data[1]}")
+        # Modo assíncrono: enfileirar e responder sem esperar o banco
+        if ingest_queue:
+            if not ingest_queue.enqueue([converted_data]):
+                return jsonify({
+                    "status": "error",
+                    "message": "Fila de ingestão cheia, tente novamente"
+                }), 503
+                
+            return jsonify({
+                "status": "accepted",
+                "message": "Dados enfileirados para persistência",
+                "data": converted_data,
+                "next_sample_interval_ms": next_interval
+            }), 202
         
         # Inserir dados no banco
         success = db_manager.insert_radar_data(converted_data)
@@ -1625,6 +2307,136 @@ def receive_radar_data():
             "message": f"Erro ao processar dados: {str(e)}"
         }), 500
 
+@app.route('/radar/data/batch', methods=['POST'])
+def receive_radar_data_batch():
+    """
+    Endpoint para receber vários frames de um mesmo dispositivo em uma requisição
+    Corpo: array JSON de frames ou NDJSON (um frame por linha), opcionalmente com
+    Content-Encoding gzip ou deflate
+    O serial_number pode vir na query string, no header X-Serial-Number ou em cada frame
+    """
+    try:
+        current_time = datetime.now()
+        
+        logger.info("==================================================")
+        logger.info("📡 Requisição POST recebida em /radar/data/batch")
+        
+        try:
+            body = read_request_body(request, **BODY_LIMITS)
+            frames = parse_batch_body(body.decode('utf-8', errors='replace'))
+        except RequestBodyError as e:
+            return jsonify({
+                "status": "error",
+                "message": str(e)
+            }), e.status_code
+        except ValueError as e:
+            return jsonify({
+                "status": "error",
+                "message": f"Corpo do lote inválido: {str(e)}"
+            }), 400
+            
+        if not frames:
+            return jsonify({
+                "status": "error",
+                "message": "Nenhum frame recebido"
+            }), 400
+            
+        if len(frames) > MAX_BATCH_FRAMES:
+            return jsonify({
+                "status": "error",
+                "message": f"Lote excede o limite de {MAX_BATCH_FRAMES} frames"
+            }), 413
+        
+        if not db_manager:
+            return jsonify({
+                "status": "error",
+                "message": "Banco de dados não disponível"
+            }), 500
+            
+        serial_number = request.args.get('serial_number') or request.headers.get('X-Serial-Number')
+        logger.info(f"Lote com {len(frames)} frames (dispositivo: {serial_number})")
+        
+        if serial_number:
+            for frame in frames:
+                if frame is not None and not frame.get('serial_number'):
+                    frame['serial_number'] = serial_number
+        
+        # Frames sem timestamp são espaçados pelo intervalo de amostragem do dispositivo
+        batch_serial = serial_number or next(
+            (frame.get('serial_number') for frame in frames if frame and frame.get('serial_number')),
+            'SERIAL_2'
+        )
+        sampling_interval = device_states.get(batch_serial).sampler.current_sampling_interval
+        frame_times = assign_batch_frame_times(frames, current_time, sampling_interval)
+        
+        results = []
+        accepted = []
+        next_interval = None
+        
+        for index, frame in enumerate(frames):
+            if frame is None:
+                results.append({"index": index, "status": "invalid"})
+                continue
+                
+            status, converted_data, next_interval = process_radar_frame(
+                frame, frame_times[index], apply_sampling=False
+            )
+            results.append({"index": index, "status": status})
+            
+            if status == 'accepted':
+                accepted.append((index, converted_data))
+        
+        # Modo assíncrono: enfileirar o lote inteiro como uma unidade de escrita
+        if ingest_queue:
+            if accepted and not ingest_queue.enqueue([data for _, data in accepted]):
+                return jsonify({
+                    "status": "error",
+                    "message": "Fila de ingestão cheia, tente novamente"
+                }), 503
+                
+            for index, _ in accepted:
+                results[index]["status"] = "queued"
+                
+            counts = {}
+            for result in results:
+                counts[result["status"]] = counts.get(result["status"], 0) + 1
+                
+            return jsonify({
+                "status": "accepted",
+                "message": "Lote enfileirado para persistência",
+                "counts": counts,
+                "results": results,
+                "next_sample_interval_ms": next_interval
+            }), 202
+        
+        # Persistir todos os frames aceitos com um único INSERT multi-linha
+        inserted = db_manager.insert_radar_data_batch([data for _, data in accepted])
+        for (index, _), success in zip(accepted, inserted):
+            if not success:
+                results[index]["status"] = "error"
+        
+        counts = {}
+        for result in results:
+            counts[result["status"]] = counts.get(result["status"], 0) + 1
+        
+        logger.info(f"Lote processado: {counts}")
+        
+        return jsonify({
+            "status": "success" if not counts.get("error") else "partial",
+            "message": "Lote processado",
+            "counts": counts,
+            "results": results,
+            "next_sample_interval_ms": next_interval
+        }), 200 if not counts.get("error") else 207
+        
+    except Exception as e:
+        logger.error(f"❌ Erro ao processar lote: {str(e)}")
+        logger.error(traceback.format_exc())
+        return jsonify({
+            "status": "error",
+            "message": f"Erro ao processar lote: {str(e)}"
+        }), 500
+
 @app.route('/radar/status', methods=['GET'])
 def get_status():
     """Endpoint para verificar status"""
@@ -1633,34 +2445,33 @@ def get_status():
             "server": "online",
             "database": "offline",
             "last_records": None,
-            "connection_info": {}
+            "connection_info": {},
+            "ingest_mode": INGEST_MODE,
+            "ingest_queue": ingest_queue.get_stats() if ingest_queue else None,
+            "write_buffer": db_manager.get_write_buffer_stats() if db_manager else None
         }
 
         try:
             # Verificar conexão
-            if db_manager and db_manager.conn:
-                is_connected = db_manager.conn.is_connected()
-                status["connection_info"]["is_connected"] = is_connected
+            if db_manager and db_manager.pool.ready:
+                status["connection_info"]["pool"] = db_manager.get_pool_stats()
                 
-                if is_connected:
+                # Obter informações do servidor
+                try:
+                    with db_manager.connection() as (conn, cursor):
+                        cursor.execute("SELECT VERSION() as version")
+                        version = cursor.fetchone()
+                    status["connection_info"]["is_connected"] = True
                     status["database"] = "online"
                     status["last_records"] = db_manager.get_last_records(5)
                     
-                    # Obter informações do servidor
-                    try:
-                        cursor = db_manager.conn.cursor(dictionary=True)
-                        cursor.execute("SELECT VERSION() as version")
-                        version = cursor.fetchone()
-                        cursor.close()
-                        
-                        if version:
-                            status["connection_info"]["version"] = version["version"]
-                    except Exception as e:
-                        status["connection_info"]["version_error"] = str(e)
-                else:
-                    status["connection_info"]["connection_error"] = "Connection object exists but is not connected"
+                    if version:
+                        status["connection_info"]["version"] = version["version"]
+                except Exception as e:
+                    status["connection_info"]["is_connected"] = False
+                    status["connection_info"]["connection_error"] = str(e)
             else:
-                status["connection_info"]["error"] = "Database manager or connection object is None"
+                status["connection_info"]["error"] = "Database manager or connection pool is None"
         except Exception as e:
             status["connection_info"]["exception"] = str(e)
 
@@ -1858,8 +2669,13 @@ def get_sampling_config():
             "low_activity_interval_ms": adaptive_sampler.LOW_ACTIVITY_INTERVAL,
             "idle_interval_ms": adaptive_sampler.IDLE_INTERVAL,
             "max_idle_count": adaptive_sampler.max_idle_count,
-            "current_sampling_interval_ms": adaptive_sampler.current_sampling_interval,
-            "consecutive_idle_count": adaptive_sampler.consecutive_idle_count
+            "devices": {
+                state.serial_number: {
+                    "current_sampling_interval_ms": state.sampler.current_sampling_interval,
+                    "consecutive_idle_count": state.sampler.consecutive_idle_count
+                }
+                for state in device_states.all_states()
+            }
         }
         
         return jsonify({
@@ -1908,8 +2724,8 @@ def update_sampling_config():
         if 'max_idle_count' in config:
             adaptive_sampler.max_idle_count = int(config['max_idle_count'])
         
-        # Resetar o estado do amostrador ao aplicar novas configurações
-        adaptive_sampler.reset()
+        # Aplicar a nova configuração (e resetar o estado) em todos os dispositivos
+        device_states.apply_sampler_config()
         
         logger.info(f"Configuração de amostragem atualizada: {config}")
         
@@ -1923,8 +2739,7 @@ def update_sampling_config():
                 "medium_activity_interval_ms": adaptive_sampler.MEDIUM_ACTIVITY_INTERVAL,
                 "low_activity_interval_ms": adaptive_sampler.LOW_ACTIVITY_INTERVAL,
                 "idle_interval_ms": adaptive_sampler.IDLE_INTERVAL,
-                "max_idle_count": adaptive_sampler.max_idle_count,
-                "current_sampling_interval_ms": adaptive_sampler.current_sampling_interval
+                "max_idle_count": adaptive_sampler.max_idle_count
             }
         })
     except Exception as e:
@@ -1945,6 +2760,7 @@ if __name__ == "__main__":
     print("\n" + "="*50)
     print("🚀 Servidor Radar iniciando...")
     print(f"📡 Endpoint dados: http://{host}:{port}/radar/data")
+    print(f"📦 Endpoint lote: http://{host}:{port}/radar/data/batch")
     print(f"ℹ️  Endpoint status: http://{host}:{port}/radar/status")
     print(f"👥 Endpoint sessões: http://{host}:{port}/radar/sessions")
     print(f"👤 Endpoint sessão específica: http://{host}:{port}/radar/sessions/<session_id>")
@@ -1952,6 +2768,9 @@ if __name__ == "__main__":
     print(f"🛒 Endpoint seções da gôndola: http://{host}:{port}/shelf/sections")
     print(f"📍 Endpoint zonas: http://{host}:{port}/zones")
     print(f"📍 Endpoint áreas: http://{host}:{port}/areas")
+    print(f"📥 Modo de ingestão: {INGEST_MODE}")
+    if db_manager and db_manager.WRITE_BEHIND:
+        print(f"💾 Write-behind: flush a cada {db_manager.WRITE_BUFFER_SIZE} linhas ou {db_manager.WRITE_BUFFER_INTERVAL}s")
     print("⚡ Use Ctrl+C para encerrar")
     print("="*50 + "\n")
     
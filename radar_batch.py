@@ -0,0 +1,86 @@
+"""
+Lotes de frames do radar recebidos em /radar/data/batch
+(codigo_versao_final_2.py, teste_coca_cola.py, teste_coca_cola1.py)
+
+O corpo é um array JSON ou NDJSON (um frame por linha). O ESP32 acumula os frames e
+envia o lote de uma vez, então o horário da requisição não é o horário de captura:
+frames sem 'timestamp' são espaçados para trás a partir do recebimento, pelo intervalo
+de amostragem do dispositivo, para que engajamento e ordenação vejam tempo decorrido
+"""
+import json
+import logging
+from datetime import datetime, timedelta
+
+logger = logging.getLogger('radar_app')
+
+# Limite padrão de frames por requisição (cada servidor lê RADAR_BATCH_MAX_FRAMES)
+DEFAULT_MAX_BATCH_FRAMES = 500
+
+
+def parse_batch_body(body):
+    """
+    Interpreta o corpo de uma requisição de lote: array JSON ou NDJSON (um frame por linha)
+    Retorna: lista de frames (dict) ou None para linhas inválidas
+    """
+    text = body.strip()
+    if not text:
+        return []
+
+    if text.startswith('['):
+        frames = json.loads(text)
+        return [frame if isinstance(frame, dict) else None for frame in frames]
+
+    frames = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            frame = json.loads(line)
+            frames.append(frame if isinstance(frame, dict) else None)
+        except ValueError:
+            frames.append(None)
+    return frames
+
+
+def parse_frame_time(raw_data, default_time):
+    """
+    Obtém o horário de captura do frame, se o dispositivo enviou um
+    Aceita 'timestamp' em epoch (segundos ou milissegundos) ou '%Y-%m-%d %H:%M:%S'
+    """
+    timestamp = raw_data.get('timestamp') if isinstance(raw_data, dict) else None
+    if timestamp is None:
+        return default_time
+    try:
+        if isinstance(timestamp, (int, float)):
+            # Valores muito grandes estão em milissegundos
+            if timestamp > 1e11:
+                timestamp = timestamp / 1000.0
+            return datetime.fromtimestamp(timestamp)
+        return datetime.strptime(timestamp, '%Y-%m-%d %H:%M:%S')
+    except (ValueError, TypeError, OverflowError, OSError):
+        logger.warning(f"Timestamp inválido no frame: {timestamp}, usando horário atual")
+        return default_time
+
+
+def assign_batch_frame_times(frames, received_at, interval_ms):
+    """
+    Horário de captura de cada frame do lote
+    Frames com 'timestamp' usam o próprio; os demais são espaçados por interval_ms,
+    terminando em received_at (o último frame sem timestamp é o mais recente)
+    Retorna: lista de datetime alinhada com frames (None para frames inválidos)
+    """
+    untimed = [i for i, frame in enumerate(frames)
+               if frame is not None and frame.get('timestamp') is None]
+    offsets = {index: len(untimed) - 1 - position for position, index in enumerate(untimed)}
+    step = timedelta(milliseconds=interval_ms)
+
+    times = []
+    for index, frame in enumerate(frames):
+        if frame is None:
+            times.append(None)
+        elif index in offsets:
+            times.append(received_at - step * offsets[index])
+        else:
+            times.append(parse_frame_time(frame, received_at))
+    return times
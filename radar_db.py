@@ -0,0 +1,155 @@
+"""
+Pool de conexões MySQL compartilhado pelos servidores Flask
+(codigo_versao_final_2.py, teste_coca_cola.py, teste_coca_cola1.py)
+
+Cada requisição empresta uma conexão própria em vez de dividir uma única conexão e
+cursor entre as threads do Flask. O pool do mysql.connector falha imediatamente
+quando esgotado; aqui um semáforo faz as threads esperarem por uma conexão livre
+"""
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+import mysql.connector
+import mysql.connector.pooling
+
+logger = logging.getLogger('radar_app')
+
+
+class ConnectionPool:
+    def __init__(self, db_config, pool_name="radar_pool", pool_size=5,
+                 wait_timeout=10.0, ping_idle_seconds=30.0):
+        self.db_config = db_config
+        self.POOL_NAME = pool_name
+        self.POOL_SIZE = pool_size
+        self.POOL_WAIT_TIMEOUT = wait_timeout       # segundos esperando uma conexão livre
+        self.PING_IDLE_SECONDS = ping_idle_seconds  # ping só após esse tempo ociosa
+
+        self._pool = None
+        self._pool_slots = threading.BoundedSemaphore(self.POOL_SIZE)
+        self._local = threading.local()
+        self._last_used = {}  # id da conexão física -> último uso (time.time())
+
+        # Métricas do pool
+        self._stats_lock = threading.Lock()
+        self.stats = {
+            'checkouts': 0,
+            'in_use': 0,
+            'max_in_use': 0,
+            'total_wait_ms': 0.0,
+            'max_wait_ms': 0.0,
+            'timeouts': 0,
+            'health_check_failures': 0
+        }
+
+    @property
+    def ready(self):
+        """Indica se o pool já foi criado"""
+        return self._pool is not None
+
+    def create(self):
+        """Cria o pool e testa uma conexão; lança a exceção do mysql.connector se falhar"""
+        self._pool = mysql.connector.pooling.MySQLConnectionPool(
+            pool_name=self.POOL_NAME,
+            pool_size=self.POOL_SIZE,
+            pool_reset_session=False,  # nenhuma variável de sessão é alterada; evita um reset por checkout
+            **self.db_config
+        )
+        with self.connection() as (conn, cursor):
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+
+    @contextmanager
+    def connection(self):
+        """
+        Empresta uma conexão do pool e um cursor para a thread atual
+        Chamadas aninhadas na mesma thread reutilizam a mesma conexão
+        """
+        current = getattr(self._local, 'current', None)
+        if current is not None:
+            yield current
+            return
+
+        if self._pool is None:
+            raise mysql.connector.errors.PoolError("Pool de conexões não inicializado")
+
+        wait_start = time.time()
+        if not self._pool_slots.acquire(timeout=self.POOL_WAIT_TIMEOUT):
+            with self._stats_lock:
+                self.stats['timeouts'] += 1
+            raise mysql.connector.errors.PoolError(
+                f"Nenhuma conexão livre no pool após {self.POOL_WAIT_TIMEOUT}s"
+            )
+
+        conn = None
+        cursor = None
+        conn_failed = False
+        try:
+            conn = self._pool.get_connection()
+            wait_ms = (time.time() - wait_start) * 1000
+
+            # Health check só para conexões ociosas há mais de PING_IDLE_SECONDS:
+            # as usadas há pouco estão vivas e o ping custaria um round trip ao banco remoto
+            conn_key = id(getattr(conn, '_cnx', conn))
+            with self._stats_lock:
+                last_used = self._last_used.get(conn_key)
+            if last_used is None or time.time() - last_used > self.PING_IDLE_SECONDS:
+                try:
+                    conn.ping(reconnect=True, attempts=1, delay=0)
+                except mysql.connector.Error:
+                    conn_failed = True
+                    with self._stats_lock:
+                        self.stats['health_check_failures'] += 1
+                    raise
+
+            with self._stats_lock:
+                self.stats['checkouts'] += 1
+                self.stats['in_use'] += 1
+                self.stats['max_in_use'] = max(self.stats['max_in_use'], self.stats['in_use'])
+                self.stats['total_wait_ms'] += wait_ms
+                self.stats['max_wait_ms'] = max(self.stats['max_wait_ms'], wait_ms)
+
+            cursor = conn.cursor(dictionary=True, buffered=True)
+            self._local.current = (conn, cursor)
+            try:
+                yield conn, cursor
+            except Exception:
+                conn_failed = True
+                try:
+                    conn.rollback()
+                except:
+                    pass
+                raise
+            finally:
+                self._local.current = None
+                with self._stats_lock:
+                    self.stats['in_use'] -= 1
+        finally:
+            if cursor is not None:
+                try:
+                    cursor.close()
+                except:
+                    pass
+            if conn is not None:
+                # Conexão que falhou é verificada de novo no próximo checkout
+                with self._stats_lock:
+                    if conn_failed:
+                        self._last_used.pop(conn_key, None)
+                    else:
+                        self._last_used[conn_key] = time.time()
+                try:
+                    conn.close()  # devolve a conexão ao pool
+                except:
+                    pass
+            self._pool_slots.release()
+
+    def get_stats(self):
+        """Retorna métricas do pool de conexões"""
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats['pool_size'] = self.POOL_SIZE
+        stats['avg_wait_ms'] = round(stats['total_wait_ms'] / stats['checkouts'], 2) if stats['checkouts'] else 0.0
+        stats['total_wait_ms'] = round(stats['total_wait_ms'], 2)
+        stats['max_wait_ms'] = round(stats['max_wait_ms'], 2)
+        return stats
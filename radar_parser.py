@@ -0,0 +1,357 @@
+"""
+Parser compartilhado dos quadros de texto do radar mmWave
+Usado pela serial (codigo_versao_final.py, codigo_conexaousb.py), pelo servidor TCP
+(teste_beluga_2.py) e pela leitura de capturas em arquivo (ex.: teste.txt)
+
+Uma única expressão compilada percorre o texto uma vez e extrai todos os pares
+'chave: valor'; os marcadores são verificados com busca de substring (em C, mais
+barata que incluí-los na expressão)
+
+Também define o formato binário versionado (struct little-endian) aceito pelas
+entradas HTTP, TCP, UDP e serial
+"""
+import re
+import struct
+import numpy as np
+
+HUMAN_DETECTED_MARKER = '-----Human Detected-----'
+TARGET_MARKER = 'Target 1:'
+
+# Campos do quadro e seus tipos; a ordem define os slots de RadarFrame
+FRAME_FIELDS = {
+    'x_point': float,
+    'y_point': float,
+    'dop_index': int,
+    'cluster_index': int,
+    'move_speed': float,  # cm/s, como enviado pelo radar
+    'total_phase': float,
+    'breath_phase': float,
+    'heart_phase': float,
+    'breath_rate': float,
+    'heart_rate': float,
+    'distance': float,
+}
+
+_TOKEN_RE = re.compile(r'([A-Za-z_]+)\s*:\s*([-+]?\d*\.?\d+)(\s*[cC][mM]/[sS])?')
+
+
+class RadarFrame:
+    """
+    Registro de campos fixos de um quadro do radar
+    Campos ausentes ficam como None; human_detected/target_found indicam os marcadores
+    """
+    __slots__ = tuple(FRAME_FIELDS) + ('human_detected', 'target_found')
+
+    def __init__(self):
+        for name in FRAME_FIELDS:
+            setattr(self, name, None)
+        self.human_detected = False
+        self.target_found = False
+
+    def has_position(self):
+        return self.x_point is not None and self.y_point is not None
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in FRAME_FIELDS}
+
+
+def parse_frame(text, require_speed_unit=True):
+    """
+    Analisa um quadro (ou uma linha) de texto em uma única passada
+    Vale a primeira ocorrência de cada campo; por padrão move_speed só é aceito com a unidade cm/s
+    """
+    frame = RadarFrame()
+    frame.human_detected = HUMAN_DETECTED_MARKER in text
+    frame.target_found = TARGET_MARKER in text
+    for key, value, unit in _TOKEN_RE.findall(text):
+        key = key.lower()
+        field_type = FRAME_FIELDS.get(key)
+        if field_type is None or getattr(frame, key) is not None:
+            continue
+        if key == 'move_speed' and require_speed_unit and not unit:
+            continue
+        if field_type is int:
+            # Inteiros truncam a parte decimal, como a regex antiga que parava no ponto
+            setattr(frame, key, int(float(value)))
+        else:
+            setattr(frame, key, float(value))
+    return frame
+
+
+def split_frames(lines):
+    """
+    Agrupa linhas (de um arquivo de captura ou de um stream) em textos de quadro,
+    um por marcador '-----Human Detected-----'
+    """
+    current = []
+    for line in lines:
+        if HUMAN_DETECTED_MARKER in line and current:
+            yield ''.join(current)
+            current = []
+        current.append(line if line.endswith('\n') else line + '\n')
+    if current:
+        yield ''.join(current)
+
+
+def read_capture(path):
+    """Lê uma captura em arquivo e retorna os quadros com posição detectada"""
+    with open(path, 'r', encoding='utf-8', errors='ignore') as capture:
+        return [frame for frame in map(parse_frame, split_frames(capture)) if frame.has_position()]
+
+
+class SerialFrameAssembler:
+    """
+    Monta quadros de texto a partir dos bytes da serial sem concatenar strings
+    Os bytes são gravados (readinto) direto num bytearray pré-alocado; a cada leitura só os
+    bytes novos são varridos em busca de '\\n'. Um quadro começa na linha com o marcador
+    '-----Human Detected-----' e termina na linha com 'move_speed:'; só então é decodificado
+    Pacotes binários (BINARY_MAGIC) entre quadros de texto são decodificados direto do buffer
+    """
+    def __init__(self, capacity=8192):
+        self.capacity = capacity
+        self.buffer = bytearray(capacity)
+        self.view = memoryview(self.buffer)
+        self.length = 0
+        self.scan_pos = 0      # Próximo byte ainda não varrido
+        self.line_start = 0    # Início da linha corrente (incompleta)
+        self.frame_start = None  # Início do quadro em montagem (None fora de quadro)
+        self.frames_dropped = 0
+        self.START_MARKER = HUMAN_DETECTED_MARKER.encode()
+        self.END_TOKEN = b'move_speed:'
+
+    def writable(self):
+        """Região livre do buffer para readinto; compacta os bytes já consumidos se preciso"""
+        keep = self.frame_start if self.frame_start is not None else self.line_start
+        if keep and self.capacity - self.length < self.capacity // 4:
+            remaining = self.length - keep
+            self.buffer[:remaining] = self.view[keep:self.length]
+            self.length = remaining
+            self.scan_pos -= keep
+            self.line_start -= keep
+            if self.frame_start is not None:
+                self.frame_start = 0
+        if self.length == self.capacity:
+            # Quadro (ou linha) maior que o buffer: descartar e recomeçar
+            self.frames_dropped += 1
+            self.length = self.scan_pos = self.line_start = 0
+            self.frame_start = None
+        return self.view[self.length:]
+
+    def commit(self, count):
+        """
+        Registra count bytes gravados em writable() e retorna os quadros completos:
+        str para quadros de texto e dict para cada frame de um pacote binário
+        """
+        self.length += count
+        frames = []
+        buffer = self.buffer
+        while True:
+            # Pacote binário no início de linha, fora de um quadro de texto
+            if self.frame_start is None and buffer.startswith(BINARY_MAGIC, self.line_start, self.length):
+                available = self.length - self.line_start
+                if available < BINARY_HEADER.size:
+                    break
+                size = BINARY_HEADER.size + buffer[self.line_start + 3] * BINARY_FRAME.size
+                if available < size:
+                    break
+                try:
+                    frames.extend(decode_binary_frames(buffer[self.line_start:self.line_start + size])[2])
+                except (ValueError, struct.error):
+                    self.frames_dropped += 1
+                self.line_start += size
+                self.scan_pos = self.line_start
+                continue
+            newline = buffer.find(b'\n', max(self.scan_pos, self.line_start), self.length)
+            if newline == -1:
+                break
+            line_start = self.line_start
+            self.line_start = newline + 1
+            if self.frame_start is None:
+                if buffer.find(self.START_MARKER, line_start, newline) != -1:
+                    self.frame_start = line_start
+            elif buffer.find(self.END_TOKEN, line_start, newline) != -1:
+                frames.append(buffer[self.frame_start:newline + 1].decode('utf-8', errors='ignore'))
+                self.frame_start = None
+        self.scan_pos = self.length
+        if self.frame_start is None and self.line_start == self.length:
+            # Nada pendente: reaproveitar o buffer desde o início sem copiar
+            self.length = self.scan_pos = self.line_start = 0
+        return frames
+
+
+# Campos de cada frame do datagrama compacto (UDP), na ordem das colunas
+COMPACT_FIELDS = ('x_point', 'y_point', 'move_speed', 'heart_rate', 'breath_rate')
+
+
+def parse_compact_datagram(payload):
+    """
+    Analisa um datagrama compacto de telemetria:
+        <device_id>,<seq>\\n
+        <x>,<y>,<move_speed>,<heart_rate>,<breath_rate>\\n   (um ou mais frames)
+    heart_rate/breath_rate podem vir vazios. Retorna (device_id, seq, [frames]);
+    levanta ValueError se o datagrama estiver malformado
+    """
+    lines = payload.decode('ascii').split('\n')
+    header = lines[0].split(',')
+    if len(header) != 2 or not header[0]:
+        raise ValueError("cabeçalho inválido, esperado '<device_id>,<seq>'")
+    device_id = header[0].strip()
+    seq = int(header[1])
+    frames = []
+    for line in lines[1:]:
+        if not line.strip():
+            continue
+        values = line.split(',')
+        if len(values) != len(COMPACT_FIELDS):
+            raise ValueError(f"frame com {len(values)} campos, esperado {len(COMPACT_FIELDS)}")
+        frame = {'device_id': device_id}
+        for key, value in zip(COMPACT_FIELDS, values):
+            value = value.strip()
+            frame[key] = float(value) if value else None
+        if frame['x_point'] is None or frame['y_point'] is None or frame['move_speed'] is None:
+            raise ValueError("x_point, y_point e move_speed são obrigatórios")
+        frames.append(frame)
+    return device_id, seq, frames
+
+
+class SequenceTracker:
+    """
+    Acompanha números de sequência por dispositivo (janela deslizante de 64, como RTP/IPsec)
+    Conta recebidos, perdidos, fora de ordem e duplicados; um salto maior que
+    RESTART_GAP é tratado como reinício do dispositivo
+    """
+    WINDOW = 64
+    RESTART_GAP = 1024
+
+    def __init__(self):
+        self.devices = {}
+
+    def record(self, device_id, seq):
+        """Registra um datagrama; retorna False se for duplicado (deve ser descartado)"""
+        state = self.devices.get(device_id)
+        if state is None:
+            self.devices[device_id] = {
+                'highest': seq, 'window': 1, 'received': 1,
+                'lost': 0, 'reordered': 0, 'duplicates': 0, 'restarts': 0
+            }
+            return True
+        highest = state['highest']
+        if abs(seq - highest) > self.RESTART_GAP:
+            # Salto grande em qualquer direção: dispositivo reiniciou a contagem
+            state.update(highest=seq, window=1)
+            state['restarts'] += 1
+            state['received'] += 1
+            return True
+        if seq > highest:
+            gap = seq - highest
+            state['window'] = ((state['window'] << gap) | 1) & ((1 << self.WINDOW) - 1)
+            state['highest'] = seq
+            state['lost'] += gap - 1  # Provisório: chegadas atrasadas descontam
+            state['received'] += 1
+            return True
+        offset = highest - seq
+        if offset < self.WINDOW and state['window'] >> offset & 1:
+            state['duplicates'] += 1
+            return False
+        if offset < self.WINDOW:
+            state['window'] |= 1 << offset
+        state['reordered'] += 1
+        state['lost'] = max(0, state['lost'] - 1)
+        state['received'] += 1
+        return True
+
+    def get_stats(self):
+        return {
+            device_id: {key: value for key, value in state.items() if key != 'window'}
+            for device_id, state in self.devices.items()
+        }
+
+
+# Formato binário v1 (little-endian):
+#   cabeçalho: magic 0xAA 0x55 | versão (B) | nº de frames (B) | device_id (16s, ASCII com \0) | seq (I)
+#   frame:     x, y, move_speed (cm/s), heart_rate, breath_rate, distance (f32; NaN = ausente)
+#              dop_index (h) | cluster_index (B) | reservado (B)
+# O magic não é texto UTF-8 válido, então não colide com as linhas dos protocolos de texto
+BINARY_MAGIC = b'\xaa\x55'
+BINARY_VERSION = 1
+BINARY_HEADER = struct.Struct('<2sBB16sI')
+BINARY_FRAME = struct.Struct('<6fhBx')
+BINARY_FRAME_FIELDS = ('x_point', 'y_point', 'move_speed', 'heart_rate', 'breath_rate', 'distance',
+                       'dop_index', 'cluster_index')
+BINARY_FRAME_DTYPE = np.dtype([
+    ('x_point', '<f4'), ('y_point', '<f4'), ('move_speed', '<f4'),
+    ('heart_rate', '<f4'), ('breath_rate', '<f4'), ('distance', '<f4'),
+    ('dop_index', '<i2'), ('cluster_index', 'u1'), ('reserved', 'u1')
+])
+BINARY_MAX_FRAMES = 255
+
+
+def is_binary_frame(data):
+    return data[:2] == BINARY_MAGIC
+
+
+def binary_packet_size(data):
+    """Tamanho total do pacote binário no início de data, ou None se o cabeçalho ainda não chegou"""
+    if len(data) < BINARY_HEADER.size:
+        return None
+    return BINARY_HEADER.size + data[3] * BINARY_FRAME.size
+
+
+def _unpack_binary_header(data):
+    magic, version, count, device_id, seq = BINARY_HEADER.unpack_from(data)
+    if magic != BINARY_MAGIC:
+        raise ValueError("magic inválido para frame binário")
+    if version != BINARY_VERSION:
+        raise ValueError(f"versão de frame binário não suportada: {version}")
+    if len(data) < BINARY_HEADER.size + count * BINARY_FRAME.size:
+        raise ValueError("pacote binário truncado")
+    return count, device_id.rstrip(b'\0').decode('ascii') or None, seq
+
+
+def encode_binary_frames(device_id, seq, frames):
+    """Empacota frames (dicts) no formato binário v1; campos ausentes viram NaN/0"""
+    if len(frames) > BINARY_MAX_FRAMES:
+        raise ValueError(f"no máximo {BINARY_MAX_FRAMES} frames por pacote")
+    nan = float('nan')
+    packet = bytearray(BINARY_HEADER.size + len(frames) * BINARY_FRAME.size)
+    BINARY_HEADER.pack_into(packet, 0, BINARY_MAGIC, BINARY_VERSION, len(frames),
+                            (device_id or '').encode('ascii'), seq & 0xFFFFFFFF)
+    offset = BINARY_HEADER.size
+    for frame in frames:
+        floats = [nan if frame.get(key) is None else frame[key] for key in BINARY_FRAME_FIELDS[:6]]
+        BINARY_FRAME.pack_into(packet, offset, *floats,
+                               int(frame.get('dop_index') or 0), int(frame.get('cluster_index') or 0))
+        offset += BINARY_FRAME.size
+    return bytes(packet)
+
+
+def decode_binary_frames(data):
+    """
+    Decodifica um pacote binário direto do buffer (struct.unpack_from / memoryview)
+    Retorna (device_id, seq, [frames]); NaN vira None. Levanta ValueError se inválido
+    """
+    view = memoryview(data)
+    count, device_id, seq = _unpack_binary_header(view)
+    frames = []
+    for values in BINARY_FRAME.iter_unpack(view[BINARY_HEADER.size:BINARY_HEADER.size + count * BINARY_FRAME.size]):
+        frame = {key: (None if value != value else value) for key, value in zip(BINARY_FRAME_FIELDS, values)}
+        frame['device_id'] = device_id
+        frames.append(frame)
+    return device_id, seq, frames
+
+
+def decode_binary_frames_array(data):
+    """Decodifica os frames de um pacote binário direto num array estruturado NumPy (sem cópia)"""
+    count, device_id, seq = _unpack_binary_header(data)
+    frames = np.frombuffer(data, dtype=BINARY_FRAME_DTYPE, count=count, offset=BINARY_HEADER.size)
+    return device_id, seq, frames
+
+
+def frames_from_array(device_id, frames):
+    """Converte o array estruturado em dicts de frame (uma única conversão tolist em C)"""
+    result = []
+    for values in frames.tolist():
+        frame = {key: (None if value != value else value) for key, value in zip(BINARY_FRAME_FIELDS, values)}
+        frame['device_id'] = device_id
+        result.append(frame)
+    return result
@@ -0,0 +1,360 @@
+"""
+Estado de processamento por dispositivo compartilhado pelos servidores Flask
+(codigo_versao_final_2.py, teste_coca_cola.py): engajamento incremental, janelas
+deslizantes, suavização dos sinais vitais, amostragem adaptativa e o registro
+de estados por serial_number
+
+AnalyticsManager e UserSessionManager continuam em cada servidor (regras diferentes);
+DeviceState recebe as fábricas dessas classes
+"""
+import logging
+import threading
+
+logger = logging.getLogger('radar_app')
+
+
+class EngagementTracker:
+    """
+    Máquina de estados incremental de engajamento
+    Consome um frame por vez e mantém como estado o início da sequência de baixo movimento,
+    o deslocamento acumulado e o nível (0/1/2); cada frame custa O(1), sem reordenar nem
+    interpretar timestamps em texto
+    """
+    
+    def __init__(self, movement_threshold=20.0, min_duration=5, max_displacement=None, max_gap=None):
+        self.MOVEMENT_THRESHOLD = movement_threshold  # cm/s
+        self.MIN_DURATION = min_duration              # segundos para engajamento completo
+        self.MAX_DISPLACEMENT = max_displacement      # metros acumulados na sequência (None = sem limite)
+        self.MAX_GAP = max_gap                        # segundos entre frames (None = sem limite)
+        self.reset()
+        
+    def reset(self):
+        """Descarta a sequência atual"""
+        self.streak_start = None
+        self.streak_frames = 0
+        self.displacement = 0.0
+        self.last_time = None
+        self.last_position = None
+        
+    def update(self, x, y, move_speed, timestamp):
+        """
+        Consome um frame (timestamp em segundos desde a época)
+        Retorna: (nível, duração) como current()
+        """
+        if self.last_time is not None:
+            if timestamp < self.last_time:
+                # Frame fora de ordem: não altera a sequência
+                return self.current()
+            if self.MAX_GAP is not None and timestamp - self.last_time > self.MAX_GAP:
+                self.reset()
+                
+        x = float(x)
+        y = float(y)
+        if float(move_speed) <= self.MOVEMENT_THRESHOLD:
+            if self.streak_start is None:
+                self.streak_start = timestamp
+                self.streak_frames = 0
+                self.displacement = 0.0
+            elif self.last_position is not None:
+                self.displacement += ((x - self.last_position[0]) ** 2 + (y - self.last_position[1]) ** 2) ** 0.5
+                
+            if self.MAX_DISPLACEMENT is not None and self.displacement > self.MAX_DISPLACEMENT:
+                # Deslocou demais: a sequência recomeça neste frame
+                self.streak_start = timestamp
+                self.streak_frames = 0
+                self.displacement = 0.0
+            self.streak_frames += 1
+        else:
+            # Reset se movimento for alto
+            self.streak_start = None
+            self.streak_frames = 0
+            self.displacement = 0.0
+            
+        self.last_time = timestamp
+        self.last_position = (x, y)
+        return self.current()
+        
+    def current(self):
+        """
+        Retorna: (nível, duração em segundos)
+        - 0: Não detectado
+        - 1: Engajamento inicial (< MIN_DURATION)
+        - 2: Engajamento completo (>= MIN_DURATION)
+        """
+        if self.streak_start is None or self.streak_frames < 2:
+            return 0, 0.0
+        duration = self.last_time - self.streak_start
+        return (2 if duration >= self.MIN_DURATION else 1), duration
+
+
+class RollingWindow:
+    """
+    Janela deslizante de tamanho fixo sobre um buffer circular
+    Mantém soma e soma dos quadrados acumuladas: média e desvio padrão custam O(1)
+    """
+    
+    def __init__(self, size):
+        self.size = size
+        self.values = [0.0] * size
+        self.count = 0
+        self.position = 0
+        self.total = 0.0
+        self.total_squares = 0.0
+        self.updates = 0
+        
+    def push(self, value):
+        """Adiciona um valor, descartando o mais antigo se a janela estiver cheia"""
+        value = float(value)
+        if self.count == self.size:
+            old = self.values[self.position]
+            self.total -= old
+            self.total_squares -= old * old
+        else:
+            self.count += 1
+        self.values[self.position] = value
+        self.position = (self.position + 1) % self.size
+        self.total += value
+        self.total_squares += value * value
+        
+        # Recalcular as somas de tempos em tempos para não acumular erro de ponto flutuante
+        self.updates += 1
+        if self.updates >= 100 * self.size:
+            self.updates = 0
+            window = self.values[:self.count] if self.count < self.size else self.values
+            self.total = sum(window)
+            self.total_squares = sum(v * v for v in window)
+            
+    def __len__(self):
+        return self.count
+        
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+        
+    def std(self):
+        """Desvio padrão populacional da janela"""
+        if not self.count:
+            return 0.0
+        mean = self.total / self.count
+        return max(self.total_squares / self.count - mean * mean, 0.0) ** 0.5
+
+
+class DataSmoother:
+    def __init__(self, window_size=5):
+        """
+        Inicializa o suavizador de dados
+        window_size: tamanho da janela para média móvel
+        """
+        self.window_size = window_size
+        self.heart_rate_history = RollingWindow(window_size)
+        self.breath_rate_history = RollingWindow(window_size)
+        
+    def smooth_heart_rate(self, heart_rate):
+        """Suaviza o valor de heart_rate usando média móvel"""
+        if heart_rate is None:
+            return None
+            
+        self.heart_rate_history.push(heart_rate)
+        if len(self.heart_rate_history) < 2:
+            return heart_rate
+            
+        return self.heart_rate_history.mean()
+        
+    def smooth_breath_rate(self, breath_rate):
+        """Suaviza o valor de breath_rate usando média móvel"""
+        if breath_rate is None:
+            return None
+            
+        self.breath_rate_history.push(breath_rate)
+        if len(self.breath_rate_history) < 2:
+            return breath_rate
+            
+        return self.breath_rate_history.mean()
+        
+    def detect_anomalies(self, heart_rate, breath_rate):
+        """
+        Detecta anomalias nos dados vitais
+        Retorna: (is_heart_anomaly, is_breath_anomaly)
+        """
+        if not len(self.heart_rate_history) or not len(self.breath_rate_history):
+            return False, False
+            
+        # Médias e desvios padrão mantidos incrementalmente pelas janelas
+        heart_mean = self.heart_rate_history.mean()
+        breath_mean = self.breath_rate_history.mean()
+        
+        heart_std = self.heart_rate_history.std()
+        breath_std = self.breath_rate_history.std()
+        
+        # Definir limites para detecção de anomalias (2 desvios padrão)
+        heart_threshold = 2 * heart_std
+        breath_threshold = 2 * breath_std
+        
+        # Verificar se os valores atuais são anomalias
+        is_heart_anomaly = heart_rate is not None and abs(heart_rate - heart_mean) > heart_threshold
+        is_breath_anomaly = breath_rate is not None and abs(breath_rate - breath_mean) > breath_threshold
+        
+        return is_heart_anomaly, is_breath_anomaly
+
+
+class AdaptiveSampler:
+    def __init__(self):
+        # Configurações de amostragem
+        self.HIGH_ACTIVITY_THRESHOLD = 30.0  # cm/s - acima disso é considerado movimento significativo
+        self.LOW_ACTIVITY_THRESHOLD = 10.0   # cm/s - abaixo disso é considerado movimento mínimo
+        
+        # Intervalos de amostragem em milissegundos
+        self.HIGH_ACTIVITY_INTERVAL = 200    # 5 amostras por segundo para atividade alta
+        self.MEDIUM_ACTIVITY_INTERVAL = 500  # 2 amostras por segundo para atividade média
+        self.LOW_ACTIVITY_INTERVAL = 1000    # 1 amostra por segundo para atividade baixa
+        self.IDLE_INTERVAL = 2000            # 1 amostra a cada 2 segundos para inatividade
+        
+        # Estado atual
+        self.current_sampling_interval = self.MEDIUM_ACTIVITY_INTERVAL
+        self.last_sample_time = None
+        self.last_movement_speed = 0
+        self.consecutive_idle_count = 0
+        self.max_idle_count = 5  # Número máximo de amostras consecutivas em estado de inatividade
+        
+    def should_sample(self, current_time, movement_speed):
+        """
+        Determina se devemos coletar uma amostra com base na atividade atual
+        Retorna: (bool, int) - se deve amostrar e o próximo intervalo recomendado
+        """
+        # Na primeira chamada, sempre amostrar
+        if self.last_sample_time is None:
+            self.last_sample_time = current_time
+            return True, self.MEDIUM_ACTIVITY_INTERVAL
+        
+        # Calcular tempo decorrido desde a última amostra
+        elapsed_time = (current_time - self.last_sample_time).total_seconds() * 1000  # em ms
+        
+        # Determinar o intervalo de amostragem com base na velocidade de movimento
+        if movement_speed > self.HIGH_ACTIVITY_THRESHOLD:
+            # Atividade alta - amostragem frequente
+            self.current_sampling_interval = self.HIGH_ACTIVITY_INTERVAL
+            self.consecutive_idle_count = 0
+            logger.info(f"Atividade alta detectada: {movement_speed:.1f} cm/s - amostragem a cada {self.current_sampling_interval} ms")
+        elif movement_speed > self.LOW_ACTIVITY_THRESHOLD:
+            # Atividade média - amostragem normal
+            self.current_sampling_interval = self.MEDIUM_ACTIVITY_INTERVAL
+            self.consecutive_idle_count = 0
+            logger.info(f"Atividade média detectada: {movement_speed:.1f} cm/s - amostragem a cada {self.current_sampling_interval} ms")
+        else:
+            # Atividade baixa ou inatividade
+            if movement_speed <= self.LOW_ACTIVITY_THRESHOLD / 2:
+                # Incrementar contador de inatividade
+                self.consecutive_idle_count += 1
+                
+                # Após várias amostras consecutivas de inatividade, reduzir ainda mais a frequência
+                if self.consecutive_idle_count >= self.max_idle_count:
+                    self.current_sampling_interval = self.IDLE_INTERVAL
+                    logger.info(f"Inatividade prolongada: {movement_speed:.1f} cm/s - amostragem a cada {self.current_sampling_interval} ms")
+                else:
+                    self.current_sampling_interval = self.LOW_ACTIVITY_INTERVAL
+                    logger.info(f"Atividade baixa detectada: {movement_speed:.1f} cm/s - amostragem a cada {self.current_sampling_interval} ms")
+            else:
+                self.current_sampling_interval = self.LOW_ACTIVITY_INTERVAL
+                logger.info(f"Atividade baixa detectada: {movement_speed:.1f} cm/s - amostragem a cada {self.current_sampling_interval} ms")
+        
+        # Verificar se o tempo decorrido é maior que o intervalo atual
+        should_sample = elapsed_time >= self.current_sampling_interval
+        
+        # Mudanças abruptas na velocidade sempre devem ser amostradas
+        if abs(movement_speed - self.last_movement_speed) > self.HIGH_ACTIVITY_THRESHOLD:
+            logger.info(f"Mudança abrupta na velocidade detectada: {self.last_movement_speed:.1f} -> {movement_speed:.1f} cm/s")
+            should_sample = True
+        
+        # Atualizar estado se for amostrar
+        if should_sample:
+            self.last_sample_time = current_time
+            self.last_movement_speed = movement_speed
+        
+        return should_sample, self.current_sampling_interval
+        
+    def reset(self):
+        """Reinicia o estado do amostrador"""
+        self.last_sample_time = None
+        self.last_movement_speed = 0
+        self.consecutive_idle_count = 0
+        self.current_sampling_interval = self.MEDIUM_ACTIVITY_INTERVAL
+        
+    def apply_config(self, template):
+        """Copia os limites e intervalos de outro amostrador e reinicia o estado"""
+        self.HIGH_ACTIVITY_THRESHOLD = template.HIGH_ACTIVITY_THRESHOLD
+        self.LOW_ACTIVITY_THRESHOLD = template.LOW_ACTIVITY_THRESHOLD
+        self.HIGH_ACTIVITY_INTERVAL = template.HIGH_ACTIVITY_INTERVAL
+        self.MEDIUM_ACTIVITY_INTERVAL = template.MEDIUM_ACTIVITY_INTERVAL
+        self.LOW_ACTIVITY_INTERVAL = template.LOW_ACTIVITY_INTERVAL
+        self.IDLE_INTERVAL = template.IDLE_INTERVAL
+        self.max_idle_count = template.max_idle_count
+        self.reset()
+
+
+class DeviceState:
+    """
+    Estado de processamento de um único dispositivo (radar)
+    Cada dispositivo tem seu próprio relógio de amostragem, janela de suavização
+    e analytics, protegidos por um lock próprio
+    
+    Com session_manager_factory, o engajamento é acompanhado por sessão
+    (get_engagement_tracker); sem ele, um único rastreador cobre o dispositivo (engagement)
+    """
+    
+    def __init__(self, serial_number, sampler_template, analytics_factory,
+                 session_manager_factory=None, smoothing_window=5):
+        self.serial_number = serial_number
+        self.lock = threading.Lock()
+        self.sampler = AdaptiveSampler()
+        self.sampler.apply_config(sampler_template)
+        self.smoother = DataSmoother(window_size=smoothing_window)
+        self.analytics = analytics_factory()
+        self.session_manager = session_manager_factory() if session_manager_factory else None
+        self.engagement = None if self.session_manager else self.analytics.create_engagement_tracker()
+        self.engagement_trackers = {}  # {session_id: EngagementTracker}
+        
+    def get_engagement_tracker(self, session_id):
+        """Rastreador de engajamento da sessão (chamado com self.lock adquirido)"""
+        tracker = self.engagement_trackers.get(session_id)
+        if tracker is None:
+            # Descartar rastreadores de sessões que já não estão ativas
+            for stale_id in [sid for sid in self.engagement_trackers if sid not in self.session_manager.active_sessions]:
+                del self.engagement_trackers[stale_id]
+            tracker = self.analytics.create_engagement_tracker()
+            self.engagement_trackers[session_id] = tracker
+        return tracker
+
+
+class DeviceStateRegistry:
+    """
+    Registro de estados por serial_number, criados sob demanda
+    state_factory(serial_number, sampler_template) cria o DeviceState de um dispositivo novo
+    """
+    
+    def __init__(self, sampler_template, state_factory):
+        self.sampler_template = sampler_template
+        self.state_factory = state_factory
+        self.states = {}  # {serial_number: DeviceState}
+        self.lock = threading.Lock()
+        
+    def get(self, serial_number):
+        """Retorna o estado do dispositivo, criando-o na primeira vez que é visto"""
+        state = self.states.get(serial_number)
+        if state is None:
+            with self.lock:
+                state = self.states.get(serial_number)
+                if state is None:
+                    state = self.state_factory(serial_number, self.sampler_template)
+                    self.states[serial_number] = state
+                    logger.info(f"Estado criado para o dispositivo {serial_number}")
+        return state
+        
+    def all_states(self):
+        """Retorna uma cópia da lista de estados"""
+        with self.lock:
+            return list(self.states.values())
+            
+    def apply_sampler_config(self):
+        """Propaga a configuração modelo para os amostradores de todos os dispositivos"""
+        for state in self.all_states():
+            with state.lock:
+                state.sampler.apply_config(self.sampler_template)
@@ -0,0 +1,119 @@
+"""
+Leitura do corpo das requisições HTTP do radar
+(codigo_versao_final_2.py, teste_beluga_2.py, teste_coca_cola.py, teste_coca_cola1.py)
+Aceita Content-Encoding gzip/deflate; a descompressão é feita em streaming, pedaço a
+pedaço, então o corpo comprimido nunca fica inteiro em memória junto com o descomprimido
+
+Limites aplicados durante a leitura:
+- tamanho do corpo recebido (comprimido ou não)
+- tamanho do corpo descomprimido
+- razão descomprimido/comprimido (proteção contra "bombas" de compressão)
+"""
+import zlib
+
+DEFAULT_MAX_BODY_BYTES = 1024 * 1024
+DEFAULT_MAX_DECOMPRESSED_BYTES = 8 * 1024 * 1024
+DEFAULT_MAX_COMPRESSION_RATIO = 100
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+# Abaixo deste tamanho descomprimido a razão não é verificada (corpos pequenos e repetitivos)
+RATIO_CHECK_MIN_BYTES = 64 * 1024
+
+SUPPORTED_ENCODINGS = ('identity', 'gzip', 'x-gzip', 'deflate')
+
+
+class RequestBodyError(Exception):
+    """Corpo rejeitado; status_code é o código HTTP a devolver (400, 413 ou 415)"""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _is_zlib_header(chunk):
+    """'deflate' deveria vir com cabeçalho zlib, mas alguns clientes mandam deflate cru"""
+    return len(chunk) >= 2 and chunk[0] & 0x0F == 8 and ((chunk[0] << 8) | chunk[1]) % 31 == 0
+
+
+def _make_decompressor(encoding, first_chunk):
+    if encoding in ('gzip', 'x-gzip'):
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    if _is_zlib_header(first_chunk):
+        return zlib.decompressobj(zlib.MAX_WBITS)
+    return zlib.decompressobj(-zlib.MAX_WBITS)
+
+
+def read_body(stream, content_encoding=None, content_length=None,
+              max_body_bytes=DEFAULT_MAX_BODY_BYTES,
+              max_decompressed_bytes=DEFAULT_MAX_DECOMPRESSED_BYTES,
+              max_ratio=DEFAULT_MAX_COMPRESSION_RATIO,
+              chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Lê o corpo de 'stream' em pedaços, descomprimindo conforme content_encoding
+    Retorna: bytearray com o corpo já descomprimido
+    Lança RequestBodyError quando o corpo excede algum limite ou está corrompido
+    """
+    encoding = (content_encoding or 'identity').strip().lower()
+    if encoding not in SUPPORTED_ENCODINGS:
+        raise RequestBodyError(f"Content-Encoding não suportado: {content_encoding}", 415)
+
+    if content_length is not None and content_length > max_body_bytes:
+        raise RequestBodyError(f"Corpo excede o limite de {max_body_bytes} bytes", 413)
+
+    body = bytearray()
+    received = 0
+    decompressor = None
+
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        received += len(chunk)
+        if received > max_body_bytes:
+            raise RequestBodyError(f"Corpo excede o limite de {max_body_bytes} bytes", 413)
+
+        if encoding == 'identity':
+            body += chunk
+            continue
+
+        if decompressor is None:
+            decompressor = _make_decompressor(encoding, chunk)
+
+        # Saída limitada a chunk_size por chamada: os limites são checados antes de crescer mais
+        data = chunk
+        while True:
+            try:
+                piece = decompressor.decompress(data, chunk_size)
+            except zlib.error as e:
+                raise RequestBodyError(f"Corpo comprimido inválido: {e}")
+            body += piece
+
+            if len(body) > max_decompressed_bytes:
+                raise RequestBodyError(
+                    f"Corpo descomprimido excede o limite de {max_decompressed_bytes} bytes", 413)
+            if len(body) > RATIO_CHECK_MIN_BYTES and len(body) > max_ratio * received:
+                raise RequestBodyError(
+                    f"Taxa de compressão excede o limite de {max_ratio}:1", 413)
+
+            data = decompressor.unconsumed_tail
+            if not data and len(piece) < chunk_size:
+                break
+
+        if decompressor.eof:
+            break
+
+    if decompressor is not None and not decompressor.eof:
+        raise RequestBodyError("Corpo comprimido truncado")
+
+    # bytearray evita uma cópia extra; json.loads, decode e struct aceitam diretamente
+    return body
+
+
+def read_request_body(request, **limits):
+    """Atalho para Flask: usa request.stream, Content-Encoding e Content-Length da requisição"""
+    return read_body(
+        request.stream,
+        request.headers.get('Content-Encoding'),
+        request.content_length,
+        **limits
+    )
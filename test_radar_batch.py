@@ -0,0 +1,92 @@
+"""
+Testes do recebimento em lote (/radar/data/batch)
+O teste do endpoint precisa de flask, mysql-connector e python-dotenv instalados;
+o banco não é usado (db_manager é substituído por um registro em memória)
+"""
+import json
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+from radar_batch import assign_batch_frame_times, parse_batch_body
+from radar_state import EngagementTracker
+
+
+def make_ndjson(count, **extra):
+    lines = []
+    for i in range(count):
+        frame = {"x_point": 0.1 * i, "y_point": 1.0, "move_speed": 0.0,
+                 "heart_rate": 70, "breath_rate": 15}
+        frame.update(extra)
+        lines.append(json.dumps(frame))
+    return "\n".join(lines)
+
+
+def test_untimed_frames_are_spaced_by_interval():
+    received_at = datetime(2024, 1, 1, 12, 0, 0)
+    frames = parse_batch_body(make_ndjson(10))
+
+    times = assign_batch_frame_times(frames, received_at, 500)
+
+    assert times[-1] == received_at
+    assert times[0] == received_at - timedelta(milliseconds=500 * 9)
+    assert all(b - a == timedelta(milliseconds=500) for a, b in zip(times, times[1:]))
+
+
+def test_frame_timestamps_are_kept_and_invalid_lines_skipped():
+    received_at = datetime(2024, 1, 1, 12, 0, 0)
+    frames = parse_batch_body('{"timestamp": "2024-01-01 11:00:00"}\nnão é json\n{"x_point": 1}')
+
+    times = assign_batch_frame_times(frames, received_at, 1000)
+
+    assert times == [datetime(2024, 1, 1, 11, 0, 0), None, received_at]
+
+
+def test_spaced_frames_accumulate_engagement():
+    received_at = datetime(2024, 1, 1, 12, 0, 0)
+    frames = parse_batch_body(make_ndjson(10))
+    tracker = EngagementTracker()
+
+    for frame_time in assign_batch_frame_times(frames, received_at, 1000):
+        level, duration = tracker.update(1.0, 1.0, 0.0, frame_time.timestamp())
+
+    assert duration == 9
+    assert level == 2
+
+
+class RecordingDatabase:
+    def __init__(self):
+        self.records = []
+
+    def insert_radar_data_batch(self, records):
+        self.records.extend(records)
+        return [True] * len(records)
+
+
+def test_batch_endpoint_accepts_all_untimed_frames(monkeypatch):
+    pytest.importorskip("flask")
+    pytest.importorskip("mysql.connector")
+    pytest.importorskip("dotenv")
+
+    # Porta fechada: a conexão inicial falha rápido e o servidor sobe sem banco
+    os.environ.setdefault("DB_HOST", "127.0.0.1")
+    os.environ.setdefault("DB_PORT", "1")
+    server = pytest.importorskip("codigo_versao_final_2")
+
+    database = RecordingDatabase()
+    monkeypatch.setattr(server, "db_manager", database)
+    monkeypatch.setattr(server, "ingest_queue", None)
+
+    response = server.app.test_client().post(
+        "/radar/data/batch?serial_number=TESTE_LOTE",
+        data=make_ndjson(10),
+        content_type="application/x-ndjson"
+    )
+
+    body = response.get_json()
+    assert response.status_code == 200
+    assert body["counts"] == {"accepted": 10}
+    assert len(database.records) == 10
+    timestamps = [record["timestamp"] for record in database.records]
+    assert timestamps == sorted(timestamps)
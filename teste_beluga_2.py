@@ -1,4 +1,5 @@
 import mysql.connector
+import mysql.connector.pooling
 from datetime import datetime
 import logging
 import json
@@ -7,9 +8,19 @@ import os
 from dotenv import load_dotenv
 from flask import Flask, request, jsonify
 import threading
-import socket
+import asyncio
 import netifaces
 import re
+import time
+import struct
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from radar_parser import (
+    parse_frame, parse_compact_datagram, SequenceTracker,
+    BINARY_MAGIC, BINARY_HEADER, BINARY_FRAME, is_binary_frame,
+    decode_binary_frames, decode_binary_frames_array, frames_from_array
+)
+from request_body import read_request_body, RequestBodyError
 
 # Configurar logging
 logging.basicConfig(
@@ -33,29 +44,44 @@ db_config = {
 
 app = Flask(__name__)
 
+# Limites do corpo HTTP (Content-Encoding gzip/deflate é descomprimido em streaming)
+BODY_LIMITS = {
+    "max_body_bytes": int(os.getenv("RADAR_MAX_BODY_BYTES", 1024 * 1024)),
+    "max_decompressed_bytes": int(os.getenv("RADAR_MAX_DECOMPRESSED_BYTES", 8 * 1024 * 1024)),
+    "max_ratio": float(os.getenv("RADAR_MAX_COMPRESSION_RATIO", 100))
+}
+
 class RadarDataHandler:
     def __init__(self):
         self.mysql_manager = MySQLManager()
         self.current_sequence_id = 0
-        self.last_move_speed = None
+        self.last_move_speeds = {}  # {device_id: última velocidade}; sequências não se misturam entre radares
+        # Frames do TCP chegam por vários workers: a sequência de engajamento é atualizada sob lock
+        self._sequence_lock = threading.Lock()
 
-    def process_radar_data(self, data: Dict) -> Dict:
-        """Processa dados recebidos do radar ESP"""
+    def process_radar_data(self, data: Dict, received_at: datetime = None) -> Dict:
+        """
+        Processa dados recebidos do radar ESP
+        received_at: horário de recebimento (TCP/UDP marcam no event loop); None = agora
+        """
         try:
             logging.info(f"Iniciando processamento dos dados: {json.dumps(data)}")
             
             # Processa a velocidade para determinar sequência de engajamento
-            if data["move_speed"] == 0:
-                if self.last_move_speed is None or self.last_move_speed > 0:
-                    self.current_sequence_id += 1
-                data["sequencia_engajamento"] = self.current_sequence_id
-            else:
-                data["sequencia_engajamento"] = None
+            with self._sequence_lock:
+                device_id = data.get("device_id")
+                last_move_speed = self.last_move_speeds.get(device_id)
+                if data["move_speed"] == 0:
+                    if last_move_speed is None or last_move_speed > 0:
+                        self.current_sequence_id += 1
+                    data["sequencia_engajamento"] = self.current_sequence_id
+                else:
+                    data["sequencia_engajamento"] = None
 
-            self.last_move_speed = data["move_speed"]
+                self.last_move_speeds[device_id] = data["move_speed"]
 
             # Adiciona timestamp
-            data["timestamp"] = datetime.now().isoformat()
+            data["timestamp"] = (received_at or datetime.now()).isoformat()
             
             logging.info(f"Dados processados, enviando para o banco: {json.dumps(data)}")
 
@@ -70,52 +96,135 @@ class RadarDataHandler:
 
 class MySQLManager:
     def __init__(self):
-        self.conn = mysql.connector.connect(**db_config)
-        self.cursor = self.conn.cursor()
+        self.pool_size = int(os.getenv("DB_POOL_SIZE", 5))
+        self.pool_wait_timeout = float(os.getenv("DB_POOL_WAIT_TIMEOUT", 10))  # segundos
+        self.ping_idle_seconds = float(os.getenv("DB_PING_IDLE_SECONDS", 30))  # ping só após esse tempo ociosa
+        self.pool = mysql.connector.pooling.MySQLConnectionPool(
+            pool_name="beluga_pool",
+            pool_size=self.pool_size,
+            pool_reset_session=False,  # nenhuma variável de sessão é alterada; evita um reset por checkout
+            **db_config
+        )
+        # O pool do mysql.connector falha imediatamente quando esgotado;
+        # o semáforo faz as threads TCP/Flask esperarem por uma conexão livre
+        self._pool_slots = threading.BoundedSemaphore(self.pool_size)
+        self._last_used = {}  # id da conexão física -> último uso (time.time())
+
+        # Métricas do pool
+        self._stats_lock = threading.Lock()
+        self.pool_stats = {
+            'checkouts': 0,
+            'in_use': 0,
+            'max_in_use': 0,
+            'total_wait_ms': 0.0,
+            'max_wait_ms': 0.0,
+            'timeouts': 0,
+            'health_check_failures': 0
+        }
+
         self._create_tables()
 
-        # Inicia thread de reconexão
-        self.keep_alive_thread = threading.Thread(target=self._keep_alive, daemon=True)
-        self.keep_alive_thread.start()
+    @contextmanager
+    def connection(self):
+        """Empresta uma conexão do pool para uma unidade de trabalho"""
+        wait_start = time.time()
+        if not self._pool_slots.acquire(timeout=self.pool_wait_timeout):
+            with self._stats_lock:
+                self.pool_stats['timeouts'] += 1
+            raise mysql.connector.errors.PoolError(
+                f"Nenhuma conexão livre no pool após {self.pool_wait_timeout}s"
+            )
+
+        conn = None
+        cursor = None
+        conn_failed = False
+        try:
+            conn = self.pool.get_connection()
+            wait_ms = (time.time() - wait_start) * 1000
 
-    def _keep_alive(self):
-        """Mantém conexão com MySQL ativa"""
-        while True:
+            # Health check só para conexões ociosas há mais de ping_idle_seconds:
+            # as usadas há pouco estão vivas e o ping custaria um round trip ao banco remoto
+            conn_key = id(getattr(conn, '_cnx', conn))
+            with self._stats_lock:
+                last_used = self._last_used.get(conn_key)
+            if last_used is None or time.time() - last_used > self.ping_idle_seconds:
+                try:
+                    conn.ping(reconnect=True, attempts=1, delay=0)
+                except mysql.connector.Error:
+                    conn_failed = True
+                    with self._stats_lock:
+                        self.pool_stats['health_check_failures'] += 1
+                    raise
+
+            with self._stats_lock:
+                self.pool_stats['checkouts'] += 1
+                self.pool_stats['in_use'] += 1
+                self.pool_stats['max_in_use'] = max(self.pool_stats['max_in_use'], self.pool_stats['in_use'])
+                self.pool_stats['total_wait_ms'] += wait_ms
+                self.pool_stats['max_wait_ms'] = max(self.pool_stats['max_wait_ms'], wait_ms)
+
+            cursor = conn.cursor()
             try:
-                if not self.conn.is_connected():
-                    self.conn.ping(reconnect=True)
-                threading.Event().wait(60)  # Verifica a cada minuto
-            except Exception as e:
-                logging.error(f"Erro na conexão MySQL: {e}")
+                yield conn, cursor
+            except Exception:
+                conn_failed = True
+                try:
+                    conn.rollback()
+                except Exception:
+                    pass
+                raise
+            finally:
+                with self._stats_lock:
+                    self.pool_stats['in_use'] -= 1
+        finally:
+            if cursor is not None:
+                try:
+                    cursor.close()
+                except Exception:
+                    pass
+            if conn is not None:
+                # Conexão que falhou é verificada de novo no próximo checkout
+                with self._stats_lock:
+                    if conn_failed:
+                        self._last_used.pop(conn_key, None)
+                    else:
+                        self._last_used[conn_key] = time.time()
                 try:
-                    self.conn = mysql.connector.connect(**db_config)
-                    self.cursor = self.conn.cursor()
-                except Exception as e:
-                    logging.error(f"Falha na reconexão: {e}")
+                    conn.close()  # devolve a conexão ao pool
+                except Exception:
+                    pass
+            self._pool_slots.release()
+
+    def get_pool_stats(self) -> Dict:
+        """Retorna métricas do pool de conexões"""
+        with self._stats_lock:
+            stats = dict(self.pool_stats)
+        stats['pool_size'] = self.pool_size
+        stats['avg_wait_ms'] = round(stats['total_wait_ms'] / stats['checkouts'], 2) if stats['checkouts'] else 0.0
+        stats['total_wait_ms'] = round(stats['total_wait_ms'], 2)
+        stats['max_wait_ms'] = round(stats['max_wait_ms'], 2)
+        return stats
 
     def _create_tables(self):
         """Cria as tabelas necessárias"""
-        self.cursor.execute("""
-            CREATE TABLE IF NOT EXISTS radar_interacoes (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                x_point FLOAT,
-                y_point FLOAT,
-                move_speed FLOAT,
-                heart_rate FLOAT NULL,
-                breath_rate FLOAT NULL,
-                timestamp DATETIME,
-                sequencia_engajamento INT NULL
-            )
-        """)
-        self.conn.commit()
+        with self.connection() as (conn, cursor):
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS radar_interacoes (
+                    id INT AUTO_INCREMENT PRIMARY KEY,
+                    x_point FLOAT,
+                    y_point FLOAT,
+                    move_speed FLOAT,
+                    heart_rate FLOAT NULL,
+                    breath_rate FLOAT NULL,
+                    timestamp DATETIME,
+                    sequencia_engajamento INT NULL
+                )
+            """)
+            conn.commit()
 
     def insert_interacao(self, data: Dict):
         """Insere uma nova interação"""
         try:
-            if not self.conn.is_connected():
-                logging.warning("Conexão perdida com o MySQL. Tentando reconectar...")
-                self.conn.ping(reconnect=True)
-                
             sql = """
                 INSERT INTO radar_interacoes
                 (x_point, y_point, move_speed, heart_rate, breath_rate, timestamp, sequencia_engajamento)
@@ -134,8 +243,9 @@ class MySQLManager:
             logging.info(f"Executando SQL: {sql}")
             logging.info(f"Valores: {values}")
             
-            self.cursor.execute(sql, values)
-            self.conn.commit()
+            with self.connection() as (conn, cursor):
+                cursor.execute(sql, values)
+                conn.commit()
             
             logging.info("Dados inseridos com sucesso no MySQL")
             
@@ -146,90 +256,304 @@ class MySQLManager:
             logging.error(f"Erro geral ao inserir dados: {e}")
             raise
 
+class ConnectionFrameState:
+    """
+    Estado de montagem de frame de uma única conexão TCP
+    Registro de campos fixos (__slots__): cada conexão monta seus frames sem estado
+    compartilhado, então linhas de radares diferentes nunca se misturam
+    """
+    __slots__ = ('device_id', 'x_point', 'y_point', 'move_speed', 'heart_rate', 'breath_rate')
+    FIELDS = ('x_point', 'y_point', 'move_speed', 'heart_rate', 'breath_rate')
+
+    def __init__(self):
+        self.device_id = None
+        self.clear()
+
+    def clear(self):
+        self.x_point = None
+        self.y_point = None
+        self.move_speed = None
+        self.heart_rate = None
+        self.breath_rate = None
+
+    def feed_line(self, line):
+        """
+        Incorpora uma linha ao frame em montagem
+        Retorna o frame completo (dict com device_id) quando breath_rate fecha o bloco, senão None
+        """
+        frame = parse_frame(line, require_speed_unit=False)
+        for key in self.FIELDS:
+            value = getattr(frame, key)
+            if value is not None:
+                setattr(self, key, value)
+                
+        # breath_rate fecha o bloco: se temos todos os dados necessários, entrega o frame
+        if frame.breath_rate is None:
+            return None
+        if self.x_point is None or self.y_point is None or self.move_speed is None:
+            return None
+        data = {'x_point': self.x_point, 'y_point': self.y_point, 'move_speed': self.move_speed}
+        if self.heart_rate is not None:
+            data['heart_rate'] = self.heart_rate
+        data['breath_rate'] = self.breath_rate
+        data['device_id'] = self.device_id
+        self.clear()
+        return data
+
+class RadarLineProtocol(asyncio.Protocol):
+    """
+    Protocolo de uma conexão de radar no event loop do TCPServer
+    Cada conexão tem seu próprio bytearray; a cada recebimento só os bytes novos são
+    varridos em busca de '\n' e as linhas completas seguem para o servidor
+    """
+    def __init__(self, server):
+        self.server = server
+        self.transport = None
+        self.address = None
+        self.buffer = bytearray()
+        self.scan_pos = 0
+        self.state = ConnectionFrameState()
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.address = transport.get_extra_info('peername')
+        self.server.connection_opened()
+        logging.info(f"Nova conexão de {self.address}")
+
+    def data_received(self, data):
+        # Horário de chegada marcado aqui, não no worker (que depende do agendamento das threads)
+        received_at = datetime.now()
+        buffer = self.buffer
+        buffer += data
+        length = len(buffer)
+        pos = 0
+        while pos < length:
+            # Pacote binário (começa com o magic, que nunca aparece em texto UTF-8)
+            if buffer.startswith(BINARY_MAGIC, pos):
+                if length - pos < BINARY_HEADER.size:
+                    break
+                size = BINARY_HEADER.size + buffer[pos + 3] * BINARY_FRAME.size
+                if length - pos < size:
+                    break
+                self.server._process_binary(buffer[pos:pos + size], self.state, received_at)
+                pos += size
+                continue
+                
+            newline = buffer.find(b'\n', max(pos, self.scan_pos))
+            if newline == -1:
+                break
+            line = buffer[pos:newline].decode('utf-8', errors='ignore')
+            pos = newline + 1
+            self.server._process_line(line.strip(), self.state, received_at)
+            
+        if pos:
+            del buffer[:pos]  # Um único memmove por recebimento
+        if len(buffer) > self.server.MAX_LINE_BYTES:
+            logging.warning(f"Linha maior que {self.server.MAX_LINE_BYTES} bytes de {self.address}, descartada")
+            self.server.lines_dropped += 1
+            buffer.clear()
+        self.scan_pos = len(buffer)
+
+    def connection_lost(self, exc):
+        if exc:
+            logging.error(f"Erro ao processar dados do cliente {self.address}: {exc}")
+        self.server.connection_closed()
+        logging.info(f"Conexão fechada com {self.address}")
+
+class RadarDatagramProtocol(asyncio.DatagramProtocol):
+    """
+    Recepção UDP de datagramas compactos de telemetria no mesmo event loop do TCPServer
+    Cada datagrama (texto compacto ou pacote binário) traz device_id e número de
+    sequência e pode conter vários frames
+    """
+    def __init__(self, server):
+        self.server = server
+
+    def datagram_received(self, data, addr):
+        server = self.server
+        server.datagrams_received += 1
+        try:
+            if is_binary_frame(data):
+                device_id, seq, frames = decode_binary_frames(data)
+            else:
+                device_id, seq, frames = parse_compact_datagram(data)
+        except (ValueError, UnicodeDecodeError, struct.error) as e:
+            server.datagrams_malformed += 1
+            if server.datagrams_malformed % 100 == 1:
+                logging.warning(f"Datagrama UDP inválido de {addr}: {e}")
+            return
+        with server._stats_lock:
+            fresh = server.sequence_tracker.record(device_id, seq)
+        if not fresh:
+            return  # Duplicado
+        received_at = datetime.now()
+        for frame in frames:
+            server._submit_frame(frame, received_at, addr)
+
+    def error_received(self, exc):
+        logging.error(f"Erro no socket UDP: {exc}")
+
 class TCPServer:
-    def __init__(self, host='0.0.0.0', port=1234):
+    """
+    Servidor TCP dos radares (ESP32) em um único event loop asyncio
+    Multiplexa todas as conexões numa thread; os frames montados vão para workers de
+    thread única (shards), que fazem o processamento e a gravação no MySQL (bloqueantes).
+    Cada radar (ou conexão sem device_id) cai sempre no mesmo shard, então seus frames
+    são processados na ordem de chegada
+    Opcionalmente escuta datagramas UDP compactos (udp_port) no mesmo loop
+    """
+    def __init__(self, host='0.0.0.0', port=1234, udp_port=None):
         self.host = host
         self.port = port
-        self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.udp_port = udp_port
+        self.udp_transport = None
+        self.sequence_tracker = SequenceTracker()
         self.radar_handler = RadarDataHandler()
-        self.current_data = {}
+        self.MAX_LINE_BYTES = int(os.getenv("TCP_MAX_LINE_BYTES", 65536))
+        self.MAX_PENDING_FRAMES = int(os.getenv("TCP_MAX_PENDING_FRAMES", 10000))
+        self.shards = [
+            ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"tcp-worker-{i}")
+            for i in range(max(1, int(os.getenv("TCP_WORKERS", 8))))
+        ]
+        self.loop = None
+        self.server = None
+        self._loop_thread = None
+        self._started = threading.Event()
+        self._start_error = None
+        
+        # Contadores para monitoramento
+        self._stats_lock = threading.Lock()
+        self.connections_active = 0
+        self.connections_total = 0
+        self.frames_submitted = 0
+        self.frames_dropped = 0
+        self.lines_dropped = 0
+        self.pending_frames = 0
+        self.datagrams_received = 0
+        self.datagrams_malformed = 0
         
     def start(self):
+        """Sobe o event loop numa thread e aguarda o bind da porta"""
+        self._loop_thread = threading.Thread(target=self._run_loop, name="tcp-event-loop")
+        self._loop_thread.daemon = True
+        self._loop_thread.start()
+        self._started.wait()
+        if self._start_error:
+            logging.error(f"Erro ao iniciar servidor TCP: {self._start_error}")
+            raise self._start_error
+        logging.info(f"Servidor TCP iniciado em {self.host}:{self.port}")
+        if self.udp_port:
+            logging.info(f"Recepção UDP iniciada em {self.host}:{self.udp_port}")
+
+    def _run_loop(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
         try:
-            self.server_socket.bind((self.host, self.port))
-            self.server_socket.listen(5)
-            logging.info(f"Servidor TCP iniciado em {self.host}:{self.port}")
-            
-            # Inicia thread para aceitar conexões
-            accept_thread = threading.Thread(target=self._accept_connections)
-            accept_thread.daemon = True
-            accept_thread.start()
-            
+            self.server = self.loop.run_until_complete(self.loop.create_server(
+                lambda: RadarLineProtocol(self),
+                self.host, self.port,
+                reuse_address=True,
+                backlog=int(os.getenv("TCP_BACKLOG", 1024))
+            ))
+            if self.udp_port:
+                self.udp_transport, _ = self.loop.run_until_complete(self.loop.create_datagram_endpoint(
+                    lambda: RadarDatagramProtocol(self),
+                    local_addr=(self.host, self.udp_port)
+                ))
         except Exception as e:
-            logging.error(f"Erro ao iniciar servidor TCP: {e}")
-            raise
+            self._start_error = e
+            self._started.set()
+            return
+        self._started.set()
+        try:
+            self.loop.run_forever()
+        finally:
+            if self.udp_transport:
+                self.udp_transport.close()
+            self.server.close()
+            self.loop.run_until_complete(self.server.wait_closed())
+            self.loop.close()
 
-    def _accept_connections(self):
-        while True:
-            try:
-                client_socket, address = self.server_socket.accept()
-                logging.info(f"Nova conexão de {address}")
-                
-                # Inicia thread para lidar com o cliente
-                client_thread = threading.Thread(target=self._handle_client, args=(client_socket, address))
-                client_thread.daemon = True
-                client_thread.start()
-                
-            except Exception as e:
-                logging.error(f"Erro ao aceitar conexão: {e}")
+    def stop(self):
+        """Fecha o listener e aguarda os frames pendentes nos workers"""
+        if self.loop and self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+        if self._loop_thread:
+            self._loop_thread.join(timeout=5)
+        for shard in self.shards:
+            shard.shutdown(wait=True)
 
-    def _handle_client(self, client_socket, address):
-        buffer = ""
-        device_id = None
-        
+    def connection_opened(self):
+        self.connections_active += 1
+        self.connections_total += 1
+
+    def connection_closed(self):
+        self.connections_active -= 1
+
+    def _submit_frame(self, frame, received_at, source):
+        """
+        Entrega o frame ao shard do seu radar; descarta se os workers estão muito atrasados
+        source identifica a origem (estado da conexão ou endereço) para frames sem device_id
+        """
+        with self._stats_lock:
+            if self.pending_frames >= self.MAX_PENDING_FRAMES:
+                self.frames_dropped += 1
+                if self.frames_dropped % 100 == 1:
+                    logging.warning(f"Workers TCP sobrecarregados, frames descartados: {self.frames_dropped}")
+                return
+            self.pending_frames += 1
+            self.frames_submitted += 1
+        shard_key = frame.get('device_id') or source
+        shard = self.shards[hash(shard_key) % len(self.shards)]
+        future = shard.submit(self.radar_handler.process_radar_data, frame, received_at)
+        future.add_done_callback(self._frame_done)
+
+    def _frame_done(self, future):
+        with self._stats_lock:
+            self.pending_frames -= 1
+
+    def get_stats(self) -> Dict:
+        """Retorna os contadores do servidor TCP"""
+        with self._stats_lock:
+            return {
+                'connections_active': self.connections_active,
+                'connections_total': self.connections_total,
+                'frames_submitted': self.frames_submitted,
+                'frames_pending': self.pending_frames,
+                'frames_dropped': self.frames_dropped,
+                'lines_dropped': self.lines_dropped,
+                'udp': {
+                    'datagrams_received': self.datagrams_received,
+                    'datagrams_malformed': self.datagrams_malformed,
+                    'devices': self.sequence_tracker.get_stats()
+                }
+            }
+
+    def _process_binary(self, packet, state, received_at):
+        """Frames de um pacote binário recebido no stream TCP"""
         try:
-            while True:
-                data = client_socket.recv(1024).decode('utf-8')
-                if not data:
-                    break
-                
-                buffer += data
-                
-                # Processa o buffer linha por linha
-                while '\n' in buffer:
-                    line, buffer = buffer.split('\n', 1)
-                    self._process_line(line.strip(), device_id)
-                    
-                    # Extrai device_id se ainda não tiver
-                    if not device_id and '[' in line and ']' in line:
-                        device_id = re.search(r'\[(.*?)\]', line).group(1)
-                        
-        except Exception as e:
-            logging.error(f"Erro ao processar dados do cliente {address}: {e}")
-        finally:
-            client_socket.close()
-            logging.info(f"Conexão fechada com {address}")
+            device_id, seq, frames = decode_binary_frames(packet)
+        except (ValueError, struct.error) as e:
+            logging.error(f"Pacote binário inválido: {e}")
+            return
+        if device_id and state.device_id is None:
+            state.device_id = device_id
+        for frame in frames:
+            if frame['device_id'] is None:
+                frame['device_id'] = state.device_id
+            self._submit_frame(frame, received_at, id(state))
 
-    def _process_line(self, line, device_id):
+    def _process_line(self, line, state, received_at):
         try:
-            # Extrai valores usando regex
-            if 'x_point:' in line:
-                self.current_data['x_point'] = float(re.search(r'x_point: ([-\d.]+)', line).group(1))
-            elif 'y_point:' in line:
-                self.current_data['y_point'] = float(re.search(r'y_point: ([-\d.]+)', line).group(1))
-            elif 'move_speed:' in line:
-                self.current_data['move_speed'] = float(re.search(r'move_speed: ([-\d.]+)', line).group(1))
-            elif 'heart_rate:' in line:
-                self.current_data['heart_rate'] = float(re.search(r'heart_rate: ([-\d.]+)', line).group(1))
-            elif 'breath_rate:' in line:
-                self.current_data['breath_rate'] = float(re.search(r'breath_rate: ([-\d.]+)', line).group(1))
-                
-                # Se temos todos os dados necessários, processa
-                if all(k in self.current_data for k in ['x_point', 'y_point', 'move_speed']):
-                    self.current_data['device_id'] = device_id
-                    self.radar_handler.process_radar_data(self.current_data.copy())
-                    self.current_data.clear()
+            # device_id é capturado uma vez por conexão e vai em todos os frames dela
+            if state.device_id is None and '[' in line and ']' in line:
+                match = re.search(r'\[(.*?)\]', line)
+                if match:
+                    state.device_id = match.group(1)
+                    
+            frame = state.feed_line(line)
+            if frame is not None:
+                self._submit_frame(frame, received_at, id(state))
                     
         except Exception as e:
             logging.error(f"Erro ao processar linha '{line}': {e}")
@@ -241,7 +565,31 @@ radar_handler = RadarDataHandler()
 def receive_radar_data():
     """Endpoint para receber dados do ESP"""
     try:
-        data = request.get_json()
+        # Corpo lido em streaming, descomprimindo gzip/deflate se necessário
+        try:
+            body = read_request_body(request, **BODY_LIMITS)
+        except RequestBodyError as e:
+            return jsonify({"status": "error", "message": str(e)}), e.status_code
+            
+        # Lote binário (application/octet-stream): decodificado direto num array NumPy
+        if request.mimetype == 'application/octet-stream':
+            try:
+                device_id, seq, frames = decode_binary_frames_array(body)
+            except (ValueError, struct.error) as e:
+                return jsonify({"status": "error", "message": f"Frame binário inválido: {e}"}), 400
+            logging.info(f"Lote binário recebido do radar {device_id} (seq {seq}): {len(frames)} frames")
+            failed = 0
+            for frame in frames_from_array(device_id, frames):
+                if radar_handler.process_radar_data(frame)["status"] != "success":
+                    failed += 1
+            if failed:
+                return jsonify({"status": "error", "message": f"{failed} de {len(frames)} frames falharam"}), 500
+            return jsonify({"status": "success", "message": f"{len(frames)} frames processados com sucesso"})
+            
+        try:
+            data = json.loads(body)
+        except ValueError as e:
+            return jsonify({"status": "error", "message": f"JSON inválido: {e}"}), 400
         logging.info(f"Dados recebidos do radar: {json.dumps(data)}")
         result = radar_handler.process_radar_data(data)
         return jsonify(result)
@@ -250,8 +598,9 @@ def receive_radar_data():
         return jsonify({"status": "error", "message": str(e)}), 500
 
 if __name__ == "__main__":
-    # Inicia servidor TCP
-    tcp_server = TCPServer()
+    # Inicia servidor TCP (e UDP, se RADAR_UDP_PORT estiver definido)
+    udp_port = int(os.getenv("RADAR_UDP_PORT", 0)) or None
+    tcp_server = TCPServer(udp_port=udp_port)
     tcp_server.start()
     
     # Mostra IPs disponíveis
@@ -268,6 +617,8 @@ if __name__ == "__main__":
             continue
 
     print(f"\nServidor TCP rodando na porta 1234")
+    if udp_port:
+        print(f"Recepção UDP rodando na porta {udp_port}")
     print(f"Servidor Flask rodando na porta 8000")
     print("Você pode acessar usando qualquer um dos IPs acima")
     
@@ -9,6 +9,13 @@ import traceback
 import time
 import numpy as np
 import uuid
+import threading
+from radar_state import (
+    EngagementTracker, AdaptiveSampler, DeviceState, DeviceStateRegistry
+)
+from request_body import read_request_body, RequestBodyError
+from radar_db import ConnectionPool
+from radar_batch import DEFAULT_MAX_BATCH_FRAMES, parse_batch_body, assign_batch_frame_times
 
 # Configuração básica de logging
 logging.basicConfig(
@@ -26,6 +33,16 @@ load_dotenv()
 
 app = Flask(__name__)
 
+# Limites do corpo HTTP (Content-Encoding gzip/deflate é descomprimido em streaming)
+BODY_LIMITS = {
+    "max_body_bytes": int(os.getenv("RADAR_MAX_BODY_BYTES", 1024 * 1024)),
+    "max_decompressed_bytes": int(os.getenv("RADAR_MAX_DECOMPRESSED_BYTES", 8 * 1024 * 1024)),
+    "max_ratio": float(os.getenv("RADAR_MAX_COMPRESSION_RATIO", 100))
+}
+
+# Limite de frames aceitos em uma única requisição de lote
+MAX_BATCH_FRAMES = int(os.getenv("RADAR_BATCH_MAX_FRAMES", DEFAULT_MAX_BATCH_FRAMES))
+
 def convert_radar_data(raw_data):
     """Converte dados do radar para o formato do banco"""
     try:
@@ -167,25 +184,34 @@ class ShelfManager:
         self.MAX_SECTIONS_X = 4    # Número máximo de seções na horizontal
         self.MAX_SECTIONS_Y = 3    # Número máximo de seções na vertical
         
+        # Raster de Voronoi: cada célula guarda a seção de centro mais próximo
+        self.NEAREST_RESOLUTION = 0.01  # Tamanho da célula em metros
+        self.NEAREST_HALF_RANGE = 2.0   # Cobre [-2m, 2m] em x e em y
+        self._nearest_index = None      # (seções, centros, grade); substituído atomicamente
+        self._nearest_lock = threading.Lock()
+        self.NEAREST_RETRY_SECONDS = 5.0  # intervalo mínimo entre reconstruções após falha no banco
+        self._next_nearest_attempt = 0
+        
     def initialize_database(self, db_manager):
         """Inicializa a tabela de seções da gôndola"""
         try:
-            # Criar tabela para seções da gôndola
-            db_manager.cursor.execute("""
-                CREATE TABLE IF NOT EXISTS shelf_sections (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    section_name VARCHAR(50),
-                    x_start FLOAT,
-                    y_start FLOAT,
-                    x_end FLOAT,
-                    y_end FLOAT,
-                    product_id VARCHAR(50),
-                    product_name VARCHAR(100),
-                    last_updated DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-                    is_active BOOLEAN DEFAULT TRUE
-                )
-            """)
-            db_manager.conn.commit()
+            with db_manager.connection() as (conn, cursor):
+                # Criar tabela para seções da gôndola
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS shelf_sections (
+                        id INT AUTO_INCREMENT PRIMARY KEY,
+                        section_name VARCHAR(50),
+                        x_start FLOAT,
+                        y_start FLOAT,
+                        x_end FLOAT,
+                        y_end FLOAT,
+                        product_id VARCHAR(50),
+                        product_name VARCHAR(100),
+                        last_updated DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                        is_active BOOLEAN DEFAULT TRUE
+                    )
+                """)
+                conn.commit()
             logger.info("✅ Tabela shelf_sections criada/verificada com sucesso!")
             
         except Exception as e:
@@ -209,8 +235,9 @@ class ShelfManager:
                 LIMIT 1
             """
             
-            db_manager.cursor.execute(query, (x, x, y, y))
-            section = db_manager.cursor.fetchone()
+            with db_manager.connection() as (conn, cursor):
+                cursor.execute(query, (x, x, y, y))
+                section = cursor.fetchone()
             
             if section:
                 logger.info(f"Seção encontrada: {section['section_name']} (Produto: {section['product_name']})")
@@ -246,10 +273,12 @@ class ShelfManager:
                 section_data['product_name']
             )
             
-            db_manager.cursor.execute(query, params)
-            db_manager.conn.commit()
+            with db_manager.connection() as (conn, cursor):
+                cursor.execute(query, params)
+                conn.commit()
             
             logger.info(f"✅ Seção {section_data['section_name']} adicionada com sucesso!")
+            self.rebuild_nearest_index(db_manager)
             return True
             
         except Exception as e:
@@ -286,10 +315,12 @@ class ShelfManager:
                 WHERE id = %s
             """
             
-            db_manager.cursor.execute(query, params)
-            db_manager.conn.commit()
+            with db_manager.connection() as (conn, cursor):
+                cursor.execute(query, params)
+                conn.commit()
             
             logger.info(f"✅ Seção {section_id} atualizada com sucesso!")
+            self.rebuild_nearest_index(db_manager)
             return True
             
         except Exception as e:
@@ -298,7 +329,7 @@ class ShelfManager:
             return False
             
     def get_all_sections(self, db_manager):
-        """Retorna todas as seções ativas"""
+        """Retorna todas as seções ativas, ou None se a consulta falhar"""
         try:
             query = """
                 SELECT * FROM shelf_sections
@@ -306,15 +337,123 @@ class ShelfManager:
                 ORDER BY section_name
             """
             
-            db_manager.cursor.execute(query)
-            sections = db_manager.cursor.fetchall()
+            with db_manager.connection() as (conn, cursor):
+                cursor.execute(query)
+                sections = cursor.fetchall()
             
             return sections
             
         except Exception as e:
             logger.error(f"❌ Erro ao buscar seções: {str(e)}")
             logger.error(traceback.format_exc())
-            return []
+            return None
+
+    def rebuild_nearest_index(self, db_manager):
+        """
+        Reconstrói o raster de seção mais próxima a partir das seções ativas
+        Chamado na primeira busca e sempre que uma seção é adicionada ou atualizada
+        Se o banco falhar, mantém o raster anterior (ou nenhum, e a próxima busca tenta de novo)
+        Retorna: True se o raster foi reconstruído
+        """
+        with self._nearest_lock:
+            sections = self.get_all_sections(db_manager)
+            if sections is None:
+                self._next_nearest_attempt = time.time() + self.NEAREST_RETRY_SECONDS
+                logger.warning("⚠️ Raster de seção mais próxima não reconstruído; mantendo o anterior")
+                return False
+            centers = np.array([
+                ((section['x_start'] + section['x_end']) / 2, (section['y_start'] + section['y_end']) / 2)
+                for section in sections
+            ], dtype=float).reshape(-1, 2)
+            
+            size = int(round(2 * self.NEAREST_HALF_RANGE / self.NEAREST_RESOLUTION))
+            axis = -self.NEAREST_HALF_RANGE + (np.arange(size) + 0.5) * self.NEAREST_RESOLUTION
+            grid = np.full((size, size), -1, dtype=np.int16)
+            best_distance = np.full((size, size), np.inf)
+            second_distance = np.full((size, size), np.inf)
+            
+            # Comparação estrita: em empate vale a primeira seção, como no loop original
+            for i, (center_x, center_y) in enumerate(centers):
+                distance = np.sqrt((axis[:, None] - center_x) ** 2 + (axis[None, :] - center_y) ** 2)
+                closer = distance < best_distance
+                second_distance = np.where(closer, best_distance, np.minimum(second_distance, distance))
+                best_distance[closer] = distance[closer]
+                grid[closer] = i
+                
+            # Células cortadas por uma fronteira de Voronoi ficam com -1 e são resolvidas
+            # com a distância exata (um ponto dista no máximo meia diagonal do centro da célula)
+            half_diagonal = self.NEAREST_RESOLUTION * np.sqrt(2) / 2
+            grid[second_distance - best_distance <= 2 * half_diagonal] = -1
+                
+            self._nearest_index = (sections, centers, grid)
+            
+        logger.info(f"✅ Raster de seção mais próxima reconstruído ({len(sections)} seções)")
+        return True
+        
+    def _ensure_nearest_index(self, db_manager):
+        """Constrói o raster na primeira busca; após falha, espera NEAREST_RETRY_SECONDS"""
+        if self._nearest_index is None and time.time() >= self._next_nearest_attempt:
+            self.rebuild_nearest_index(db_manager)
+        return self._nearest_index is not None
+        
+    def _nearest_cells(self, xs, ys):
+        """Células do raster para os pontos e máscara dos que estão dentro dele"""
+        size = self._nearest_index[2].shape[0]
+        ix = np.floor((xs + self.NEAREST_HALF_RANGE) / self.NEAREST_RESOLUTION).astype(np.int64)
+        iy = np.floor((ys + self.NEAREST_HALF_RANGE) / self.NEAREST_RESOLUTION).astype(np.int64)
+        inside = (ix >= 0) & (ix < size) & (iy >= 0) & (iy < size)
+        return np.clip(ix, 0, size - 1), np.clip(iy, 0, size - 1), inside
+        
+    def get_nearest_section(self, x, y, db_manager):
+        """
+        Retorna a seção ativa cujo centro é o mais próximo de (x, y), ou None se não houver seções
+        """
+        if not self._ensure_nearest_index(db_manager):
+            return None
+        sections, centers, grid = self._nearest_index
+        if not sections:
+            return None
+            
+        ix, iy, inside = self._nearest_cells(np.array([x]), np.array([y]))
+        if inside[0] and grid[ix[0], iy[0]] >= 0:
+            return sections[grid[ix[0], iy[0]]]
+            
+        # Fora do raster ou perto de uma fronteira: distância direta a todos os centros
+        distances = (centers[:, 0] - x) ** 2 + (centers[:, 1] - y) ** 2
+        return sections[int(np.argmin(distances))]
+        
+    def get_nearest_sections(self, xs, ys, db_manager):
+        """
+        Versão em lote de get_nearest_section para arrays de pontos
+        Retorna: dict com arrays 'section_id' e 'product_id' (-1/None se não houver seções)
+        """
+        xs = np.asarray(xs, dtype=float)
+        ys = np.asarray(ys, dtype=float)
+        if not self._ensure_nearest_index(db_manager):
+            sections = []
+        else:
+            sections, centers, grid = self._nearest_index
+        if not sections:
+            return {
+                'section_id': np.full(xs.shape, -1, dtype=np.int64),
+                'product_id': np.full(xs.shape, None, dtype=object)
+            }
+            
+        ix, iy, inside = self._nearest_cells(xs, ys)
+        nearest = grid[ix, iy].astype(np.int64)
+        
+        outside = np.flatnonzero(~inside | (nearest < 0))
+        if outside.size:
+            distances = ((xs[outside, None] - centers[None, :, 0]) ** 2 +
+                         (ys[outside, None] - centers[None, :, 1]) ** 2)
+            nearest[outside] = np.argmin(distances, axis=1)
+            
+        section_ids = np.array([section['id'] for section in sections], dtype=np.int64)
+        product_ids = np.array([section['product_id'] for section in sections], dtype=object)
+        return {
+            'section_id': section_ids[nearest],
+            'product_id': product_ids[nearest]
+        }
 
 # Instância global do gerenciador de seções
 shelf_manager = ShelfManager()
@@ -336,34 +475,32 @@ db_config = {
 
 class DatabaseManager:
     def __init__(self):
-        self.conn = None
-        self.cursor = None
         self.last_sequence = 0
         self.last_move_speed = None
+        
+        # Pool de conexões (radar_db.py): cada requisição usa uma conexão própria
+        self.POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+        self.pool = ConnectionPool(
+            db_config,
+            pool_name="radar_pool",
+            pool_size=self.POOL_SIZE,
+            wait_timeout=float(os.getenv("DB_POOL_WAIT_TIMEOUT", 10)),  # segundos
+            ping_idle_seconds=float(os.getenv("DB_PING_IDLE_SECONDS", 30))  # ping só após esse tempo ociosa
+        )
         self.connect_with_retry()
         
     def connect_with_retry(self, max_attempts=5):
-        """Tenta conectar ao banco com retry"""
+        """Cria o pool de conexões com retry"""
         attempt = 0
         while attempt < max_attempts:
             try:
                 attempt += 1
-                logger.info(f"Tentativa {attempt} de {max_attempts} para conectar ao banco...")
-                
-                if self.conn:
-                    try:
-                        self.conn.close()
-                    except:
-                        pass
-                
-                self.conn = mysql.connector.connect(**db_config)
-                self.cursor = self.conn.cursor(dictionary=True, buffered=True)
+                logger.info(f"Tentativa {attempt} de {max_attempts} para criar pool de conexões ({self.POOL_SIZE} conexões)...")
                 
-                # Testar conexão
-                self.cursor.execute("SELECT 1")
-                self.cursor.fetchone()
+                # Criar o pool e testar uma conexão
+                self.pool.create()
                 
-                logger.info("✅ Conexão estabelecida com sucesso!")
+                logger.info("✅ Pool de conexões estabelecido com sucesso!")
                 self.initialize_database()
                 return True
                 
@@ -375,103 +512,115 @@ class DatabaseManager:
                 time.sleep(2)
         return False
 
+    def connection(self):
+        """
+        Empresta uma conexão do pool e um cursor para a thread atual
+        Uso: with db_manager.connection() as (conn, cursor)
+        """
+        return self.pool.connection()
+
+    def get_pool_stats(self):
+        """Retorna métricas do pool de conexões"""
+        return self.pool.get_stats()
+
     def initialize_database(self):
         """Inicializa o banco de dados"""
         try:
-            # Verificar tabela de dispositivos
-            logger.info("Verificando tabela de dispositivos...")
-            self.cursor.execute("""
-                CREATE TABLE IF NOT EXISTS Dispositivos (
-                    serial_number VARCHAR(50) PRIMARY KEY,
-                    nome VARCHAR(100),
-                    tipo VARCHAR(50),
-                    status VARCHAR(20) DEFAULT 'ATIVO',
-                    data_cadastro DATETIME DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            
-            # Verificar dispositivo padrão
-            logger.info("Verificando dispositivo padrão...")
-            self.cursor.execute("""
-                INSERT IGNORE INTO Dispositivos 
-                (serial_number, nome, tipo)
-                VALUES 
-                ('RADAR_1', 'Radar Principal', 'RADAR')
-            """)
-            
-            # Verificar tabela radar_dados
-            logger.info("Verificando tabela radar_dados...")
-            self.cursor.execute("""
-                CREATE TABLE IF NOT EXISTS radar_dados (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    x_point FLOAT,
-                    y_point FLOAT,
-                    move_speed FLOAT,
-                    heart_rate FLOAT,
-                    breath_rate FLOAT,
-                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    serial_number VARCHAR(50),
-                    satisfaction_score FLOAT,
-                    satisfaction_class VARCHAR(20),
-                    is_engaged BOOLEAN,
-                    engagement_duration INT,
-                    session_id VARCHAR(50),
-                    section_id INT,
-                    product_id VARCHAR(50),
-                    FOREIGN KEY (serial_number) REFERENCES Dispositivos(serial_number)
-                )
-            """)
-            
-            # Verificar tabela radar_sessoes
-            logger.info("Verificando tabela radar_sessoes...")
-            self.cursor.execute("""
-                CREATE TABLE IF NOT EXISTS radar_sessoes (
-                    session_id VARCHAR(50) PRIMARY KEY,
-                    start_time DATETIME,
-                    end_time DATETIME,
-                    duration INT,
-                    avg_heart_rate FLOAT,
-                    avg_breath_rate FLOAT,
-                    avg_satisfaction FLOAT,
-                    satisfaction_class VARCHAR(20),
-                    is_engaged BOOLEAN,
-                    data_points INT
-                )
-            """)
-            
-            # Verificar tabela shelf_sections
-            logger.info("Verificando tabela shelf_sections...")
-            self.cursor.execute("""
-                CREATE TABLE IF NOT EXISTS shelf_sections (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    section_name VARCHAR(50),
-                    x_start FLOAT,
-                    y_start FLOAT,
-                    x_end FLOAT,
-                    y_end FLOAT,
-                    product_id VARCHAR(50),
-                    product_name VARCHAR(100),
-                    last_updated DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-                    is_active BOOLEAN DEFAULT TRUE
-                )
-            """)
-            
-            # Verificar se já existem seções
-            self.cursor.execute("SELECT COUNT(*) as count FROM shelf_sections")
-            count = self.cursor.fetchone()['count']
-            
-            # Só adicionar seções padrão se a tabela estiver vazia
-            if count == 0:
-                logger.info("Adicionando seções padrão...")
-                self.cursor.execute("""
-                    INSERT INTO shelf_sections 
-                    (section_name, x_start, y_start, x_end, y_end, product_id, product_name)
+            with self.connection() as (conn, cursor):
+                # Verificar tabela de dispositivos
+                logger.info("Verificando tabela de dispositivos...")
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS Dispositivos (
+                        serial_number VARCHAR(50) PRIMARY KEY,
+                        nome VARCHAR(100),
+                        tipo VARCHAR(50),
+                        status VARCHAR(20) DEFAULT 'ATIVO',
+                        data_cadastro DATETIME DEFAULT CURRENT_TIMESTAMP
+                    )
+                """)
+                
+                # Verificar dispositivo padrão
+                logger.info("Verificando dispositivo padrão...")
+                cursor.execute("""
+                    INSERT IGNORE INTO Dispositivos 
+                    (serial_number, nome, tipo)
                     VALUES 
-                    ('Sagatiba', 0.0, 0.0, 0.5, 0.3, 'SAGATIBA001', 'Sagatiba'),
-                    ('Skyy', 0.5, 0.0, 1.0, 0.3, 'SKYY001', 'Skyy')
+                    ('RADAR_1', 'Radar Principal', 'RADAR')
                 """)
-            
-            self.conn.commit()
+                
+                # Verificar tabela radar_dados
+                logger.info("Verificando tabela radar_dados...")
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS radar_dados (
+                        id INT AUTO_INCREMENT PRIMARY KEY,
+                        x_point FLOAT,
+                        y_point FLOAT,
+                        move_speed FLOAT,
+                        heart_rate FLOAT,
+                        breath_rate FLOAT,
+                        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                        serial_number VARCHAR(50),
+                        satisfaction_score FLOAT,
+                        satisfaction_class VARCHAR(20),
+                        is_engaged BOOLEAN,
+                        engagement_duration INT,
+                        session_id VARCHAR(50),
+                        section_id INT,
+                        product_id VARCHAR(50),
+                        FOREIGN KEY (serial_number) REFERENCES Dispositivos(serial_number)
+                    )
+                """)
+                
+                # Verificar tabela radar_sessoes
+                logger.info("Verificando tabela radar_sessoes...")
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS radar_sessoes (
+                        session_id VARCHAR(50) PRIMARY KEY,
+                        start_time DATETIME,
+                        end_time DATETIME,
+                        duration INT,
+                        avg_heart_rate FLOAT,
+                        avg_breath_rate FLOAT,
+                        avg_satisfaction FLOAT,
+                        satisfaction_class VARCHAR(20),
+                        is_engaged BOOLEAN,
+                        data_points INT
+                    )
+                """)
+                
+                # Verificar tabela shelf_sections
+                logger.info("Verificando tabela shelf_sections...")
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS shelf_sections (
+                        id INT AUTO_INCREMENT PRIMARY KEY,
+                        section_name VARCHAR(50),
+                        x_start FLOAT,
+                        y_start FLOAT,
+                        x_end FLOAT,
+                        y_end FLOAT,
+                        product_id VARCHAR(50),
+                        product_name VARCHAR(100),
+                        last_updated DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                        is_active BOOLEAN DEFAULT TRUE
+                    )
+                """)
+                
+                # Verificar se já existem seções
+                cursor.execute("SELECT COUNT(*) as count FROM shelf_sections")
+                count = cursor.fetchone()['count']
+                
+                # Só adicionar seções padrão se a tabela estiver vazia
+                if count == 0:
+                    logger.info("Adicionando seções padrão...")
+                    cursor.execute("""
+                        INSERT INTO shelf_sections 
+                        (section_name, x_start, y_start, x_end, y_end, product_id, product_name)
+                        VALUES 
+                        ('Sagatiba', 0.0, 0.0, 0.5, 0.3, 'SAGATIBA001', 'Sagatiba'),
+                        ('Skyy', 0.5, 0.0, 1.0, 0.3, 'SKYY001', 'Skyy')
+                    """)
+                
+                conn.commit()
             logger.info("✅ Banco de dados atualizado com sucesso!")
             
         except Exception as e:
@@ -482,27 +631,28 @@ class DatabaseManager:
     def ensure_device_exists(self, serial_number, nome=None, tipo=None):
         """Garante que o dispositivo existe no banco"""
         try:
-            # Verificar se o dispositivo já existe
-            self.cursor.execute("""
-                SELECT serial_number FROM Dispositivos
-                WHERE serial_number = %s
-            """, (serial_number,))
-            
-            device = self.cursor.fetchone()
-            
-            if not device:
-                # Inserir novo dispositivo
-                logger.info(f"Inserindo novo dispositivo: {serial_number}")
-                self.cursor.execute("""
-                    INSERT INTO Dispositivos (serial_number, nome, tipo)
-                    VALUES (%s, %s, %s)
-                """, (
-                    serial_number,
-                    nome or f"Radar {serial_number}",
-                    tipo or "RADAR"
-                ))
-                self.conn.commit()
-                logger.info(f"✅ Dispositivo {serial_number} inserido com sucesso!")
+            with self.connection() as (conn, cursor):
+                # Verificar se o dispositivo já existe
+                cursor.execute("""
+                    SELECT serial_number FROM Dispositivos
+                    WHERE serial_number = %s
+                """, (serial_number,))
+                
+                device = cursor.fetchone()
+                
+                if not device:
+                    # Inserir novo dispositivo
+                    logger.info(f"Inserindo novo dispositivo: {serial_number}")
+                    cursor.execute("""
+                        INSERT INTO Dispositivos (serial_number, nome, tipo)
+                        VALUES (%s, %s, %s)
+                    """, (
+                        serial_number,
+                        nome or f"Radar {serial_number}",
+                        tipo or "RADAR"
+                    ))
+                    conn.commit()
+                    logger.info(f"✅ Dispositivo {serial_number} inserido com sucesso!")
             
             return True
         except Exception as e:
@@ -515,11 +665,6 @@ class DatabaseManager:
             logger.info("="*50)
             logger.info("Iniciando inserção de dados no banco...")
             
-            # Verificar conexão antes de inserir
-            if not self.conn or not self.conn.is_connected():
-                logger.info("Conexão não disponível, tentando reconectar...")
-                self.connect_with_retry()
-            
             # Garantir que o dispositivo existe
             serial_number = data.get('serial_number', 'RADAR_1')
             if not self.ensure_device_exists(serial_number):
@@ -573,9 +718,10 @@ class DatabaseManager:
             logger.info(f"Query SQL: {query}")
             logger.info(f"Parâmetros: {params}")
             
-            # Executar inserção
-            self.cursor.execute(query, params)
-            self.conn.commit()
+            with self.connection() as (conn, cursor):
+                # Executar inserção
+                cursor.execute(query, params)
+                conn.commit()
             
             logger.info("✅ Dados inseridos com sucesso!")
             logger.info("="*50)
@@ -593,17 +739,15 @@ class DatabaseManager:
     def get_last_records(self, limit=5):
         """Obtém últimos registros"""
         try:
-            if not self.conn or not self.conn.is_connected():
-                self.connect_with_retry()
-                
             query = """
                 SELECT * FROM radar_dados
                 ORDER BY timestamp DESC 
                 LIMIT %s
             """
             
-            self.cursor.execute(query, (limit,))
-            records = self.cursor.fetchall()
+            with self.connection() as (conn, cursor):
+                cursor.execute(query, (limit,))
+                records = cursor.fetchall()
             
             # Converter datetime para string
             for record in records:
@@ -621,11 +765,6 @@ class DatabaseManager:
             logger.info("="*50)
             logger.info(f"Salvando resumo da sessão {session_data['session_id']}...")
             
-            # Verificar conexão antes de inserir
-            if not self.conn or not self.conn.is_connected():
-                logger.info("Conexão não disponível, tentando reconectar...")
-                self.connect_with_retry()
-            
             # Preparar query
             query = """
                 INSERT INTO radar_sessoes
@@ -677,9 +816,10 @@ class DatabaseManager:
             logger.info(f"Query SQL: {query}")
             logger.info(f"Parâmetros: {params}")
             
-            # Executar inserção
-            self.cursor.execute(query, params)
-            self.conn.commit()
+            with self.connection() as (conn, cursor):
+                # Executar inserção
+                cursor.execute(query, params)
+                conn.commit()
             
             logger.info(f"✅ Resumo da sessão {session_data['session_id']} salvo com sucesso!")
             logger.info("="*50)
@@ -696,17 +836,15 @@ class DatabaseManager:
     def get_sessions(self, limit=10):
         """Obtém as sessões mais recentes"""
         try:
-            if not self.conn or not self.conn.is_connected():
-                self.connect_with_retry()
-                
             query = """
                 SELECT * FROM radar_sessoes
                 ORDER BY end_time DESC 
                 LIMIT %s
             """
             
-            self.cursor.execute(query, (limit,))
-            sessions = self.cursor.fetchall()
+            with self.connection() as (conn, cursor):
+                cursor.execute(query, (limit,))
+                sessions = cursor.fetchall()
             
             # Converter datetime para string
             for session in sessions:
@@ -724,36 +862,34 @@ class DatabaseManager:
     def get_session_by_id(self, session_id):
         """Obtém uma sessão específica pelo ID"""
         try:
-            if not self.conn or not self.conn.is_connected():
-                self.connect_with_retry()
+            with self.connection() as (conn, cursor):
+                # Buscar resumo da sessão
+                query_session = """
+                    SELECT * FROM radar_sessoes
+                    WHERE session_id = %s
+                """
                 
-            # Buscar resumo da sessão
-            query_session = """
-                SELECT * FROM radar_sessoes
-                WHERE session_id = %s
-            """
-            
-            self.cursor.execute(query_session, (session_id,))
-            session = self.cursor.fetchone()
-            
-            if not session:
-                return None
+                cursor.execute(query_session, (session_id,))
+                session = cursor.fetchone()
                 
-            # Converter datetime para string
-            if isinstance(session['start_time'], datetime):
-                session['start_time'] = session['start_time'].strftime('%Y-%m-%d %H:%M:%S')
-            if isinstance(session['end_time'], datetime):
-                session['end_time'] = session['end_time'].strftime('%Y-%m-%d %H:%M:%S')
-            
-            # Buscar pontos de dados da sessão
-            query_points = """
-                SELECT * FROM radar_dados
-                WHERE session_id = %s
-                ORDER BY timestamp ASC
-            """
-            
-            self.cursor.execute(query_points, (session_id,))
-            points = self.cursor.fetchall()
+                if not session:
+                    return None
+                    
+                # Converter datetime para string
+                if isinstance(session['start_time'], datetime):
+                    session['start_time'] = session['start_time'].strftime('%Y-%m-%d %H:%M:%S')
+                if isinstance(session['end_time'], datetime):
+                    session['end_time'] = session['end_time'].strftime('%Y-%m-%d %H:%M:%S')
+                
+                # Buscar pontos de dados da sessão
+                query_points = """
+                    SELECT * FROM radar_dados
+                    WHERE session_id = %s
+                    ORDER BY timestamp ASC
+                """
+                
+                cursor.execute(query_points, (session_id,))
+                points = cursor.fetchall()
             
             # Converter datetime para string nos pontos
             for point in points:
@@ -783,8 +919,9 @@ class DatabaseManager:
                 LIMIT 1
             """
             
-            self.cursor.execute(query, (timestamp, x_point, y_point))
-            result = self.cursor.fetchone()
+            with self.connection() as (conn, cursor):
+                cursor.execute(query, (timestamp, x_point, y_point))
+                result = cursor.fetchone()
             
             if result:
                 logger.info(f"Sessão ativa encontrada: {result['session_id']}")
@@ -880,9 +1017,10 @@ class DatabaseManager:
             logger.info(f"Query: {query}")
             logger.info(f"Parâmetros: {params}")
             
-            # Executar inserção
-            self.cursor.execute(query, params)
-            self.conn.commit()
+            with self.connection() as (conn, cursor):
+                # Executar inserção
+                cursor.execute(query, params)
+                conn.commit()
             
             logger.info("✅ Dados inseridos com sucesso!")
             return True
@@ -918,103 +1056,14 @@ class AnalyticsManager:
         self.WEIGHT_HEART_RATE = 0.6  # α
         self.WEIGHT_RESP_RATE = 0.4   # β
         
-        # Rastreamento de engajamento
-        self.engagement_start_time = None
-        self.last_movement_time = None
-        
-    def calculate_engagement(self, records):
-        """
-        Calcula engajamento baseado no histórico de registros
-        Retorna: 
-        - 0: Não detectado
-        - 1: Engajamento inicial (< 5 segundos)
-        - 2: Engajamento completo (>= 5 segundos)
-        """
-        if not records or len(records) < 2:
-            logger.info("Não há registros suficientes para calcular engajamento")
-            return 0, 0
-            
-        # Filtrar registros válidos (com move_speed e timestamp)
-        valid_records = []
-        current_time = datetime.now()
-        
-        for record in records:
-            if (record.get('move_speed') is not None and 
-                record.get('timestamp') is not None):
-                try:
-                    # Tentar converter o timestamp para datetime se for string
-                    record_time = (record['timestamp'] 
-                                 if isinstance(record['timestamp'], datetime)
-                                 else datetime.strptime(record['timestamp'], '%Y-%m-%d %H:%M:%S'))
-                    
-                    # Verificar se o registro não é muito antigo (máximo 10 segundos)
-                    if (current_time - record_time).total_seconds() <= 10:
-                        valid_records.append({
-                            'move_speed': float(record['move_speed']),
-                            'timestamp': record_time,
-                            'x_point': float(record.get('x_point', 0)),
-                            'y_point': float(record.get('y_point', 0))
-                        })
-                except (ValueError, TypeError) as e:
-                    logger.error(f"Erro ao processar registro para engajamento: {str(e)}")
-                    continue
-        
-        if len(valid_records) < 2:
-            logger.info("Não há registros válidos suficientes para calcular engajamento")
-            return 0, 0
-        
-        # Ordenar registros por timestamp (mais recente primeiro)
-        valid_records.sort(key=lambda x: x['timestamp'], reverse=True)
-        
-        # Verificar engajamento
-        engagement_count = 0
-        total_movement = 0
-        last_position = None
-        start_time = None
-        
-        for record in valid_records:
-            current_time = record['timestamp']
-            current_position = (record['x_point'], record['y_point'])
-            move_speed = record['move_speed']
-            
-            # Calcular movimento total se houver posição anterior
-            if last_position:
-                movement = ((current_position[0] - last_position[0])**2 + 
-                          (current_position[1] - last_position[1])**2)**0.5
-                total_movement += movement
-            
-            # Verificar critérios de engajamento
-            is_engaged = (
-                move_speed <= self.MOVEMENT_THRESHOLD and  # Velocidade baixa
-                (not last_position or  # Primeiro registro
-                 total_movement <= 0.5)  # Movimento total menor que 50cm
-            )
-            
-            if is_engaged:
-                engagement_count += 1
-                if start_time is None:
-                    start_time = current_time
-            else:
-                # Reset se houver movimento significativo
-                engagement_count = 0
-                start_time = None
-                total_movement = 0
-            
-            last_position = current_position
-            
-            # Verificar se temos engajamento suficiente
-            if engagement_count >= 2:
-                duration = (valid_records[0]['timestamp'] - start_time).total_seconds()
-                
-                if duration >= self.ENGAGEMENT_MIN_DURATION:
-                    logger.info(f"Engajamento COMPLETO detectado! Duração: {duration:.1f}s")
-                    return 2, duration
-                else:
-                    logger.info(f"Engajamento INICIAL detectado! Duração: {duration:.1f}s")
-                    return 1, duration
-        
-        logger.info("Engajamento não detectado")
-        return 0, 0
+    def create_engagement_tracker(self):
+        """Cria um rastreador incremental com os limites deste AnalyticsManager"""
+        return EngagementTracker(
+            movement_threshold=self.MOVEMENT_THRESHOLD,
+            min_duration=self.ENGAGEMENT_MIN_DURATION,
+            max_displacement=0.5,  # Movimento total menor que 50cm
+            max_gap=10             # Registros com mais de 10 segundos não contam
+        )
 
     def calculate_satisfaction(self, heart_rate, breath_rate):
         """
@@ -1109,8 +1158,6 @@ class AnalyticsManager:
             'is_valid': True
         }
 
-# Instância global do analytics manager
-analytics_manager = AnalyticsManager()
 
 class UserSessionManager:
     def __init__(self):
@@ -1299,159 +1346,143 @@ class UserSessionManager:
                 except Exception as e:
                     logger.error(f"Erro ao salvar sessão expirada: {str(e)}")
 
-# Instância global do gerenciador de sessões
-user_session_manager = UserSessionManager()
 
-class DataSmoother:
-    def __init__(self, window_size=5):
-        """
-        Inicializa o suavizador de dados
-        window_size: tamanho da janela para média móvel
-        """
-        self.window_size = window_size
-        self.heart_rate_history = []
-        self.breath_rate_history = []
+# Configuração modelo do amostrador adaptativo (copiada para cada dispositivo)
+adaptive_sampler = AdaptiveSampler()
+
+# Tamanho da janela de suavização dos sinais vitais (amostras por dispositivo)
+SMOOTHING_WINDOW = int(os.getenv("RADAR_SMOOTHING_WINDOW", 5))
+
+def create_device_state(serial_number, sampler_template):
+    """Estado de um dispositivo novo, com sessões e engajamento por sessão"""
+    return DeviceState(serial_number, sampler_template, AnalyticsManager, UserSessionManager, SMOOTHING_WINDOW)
+
+# Instância global do registro de estados por dispositivo
+device_states = DeviceStateRegistry(adaptive_sampler, create_device_state)
+
+def process_radar_frame(converted_data, current_time, apply_sampling=True):
+    """
+    Executa o pipeline de um frame já convertido: amostragem, suavização, seção,
+    sessão, engajamento e satisfação
+    apply_sampling=False é usado nos lotes: o dispositivo já amostrou os frames
+    Retorna: (status, converted_data, next_interval)
+    status pode ser: 'accepted', 'skipped'
+    """
+    # Estado próprio do dispositivo (amostragem, suavização, sessões e analytics)
+    state = device_states.get(converted_data['serial_number'])
+    
+    # Verificar se devemos processar esta amostra com base na atividade atual
+    move_speed = converted_data.get('move_speed', 0)
+    with state.lock:
+        if apply_sampling:
+            should_sample, next_interval = state.sampler.should_sample(current_time, move_speed)
+        else:
+            should_sample, next_interval = True, state.sampler.current_sampling_interval
+    
+    if not should_sample:
+        return 'skipped', converted_data, next_interval
+    
+    # Registrar que a amostra foi aceita
+    logger.info(f"Amostra aceita para processamento. Próximo intervalo: {next_interval} ms")
         
-    def smooth_heart_rate(self, heart_rate):
-        """Suaviza o valor de heart_rate usando média móvel"""
-        if heart_rate is None:
-            return None
-            
-        self.heart_rate_history.append(heart_rate)
-        if len(self.heart_rate_history) > self.window_size:
-            self.heart_rate_history.pop(0)
-            
-        if len(self.heart_rate_history) < 2:
-            return heart_rate
-            
-        return sum(self.heart_rate_history) / len(self.heart_rate_history)
+    with state.lock:
+        # Suavizar dados vitais
+        heart_rate = state.smoother.smooth_heart_rate(converted_data.get('heart_rate'))
+        breath_rate = state.smoother.smooth_breath_rate(converted_data.get('breath_rate'))
         
-    def smooth_breath_rate(self, breath_rate):
-        """Suaviza o valor de breath_rate usando média móvel"""
-        if breath_rate is None:
-            return None
-            
-        self.breath_rate_history.append(breath_rate)
-        if len(self.breath_rate_history) > self.window_size:
-            self.breath_rate_history.pop(0)
-            
-        if len(self.breath_rate_history) < 2:
-            return breath_rate
-            
-        return sum(self.breath_rate_history) / len(self.breath_rate_history)
+        # Detectar anomalias
+        is_heart_anomaly, is_breath_anomaly = state.smoother.detect_anomalies(heart_rate, breath_rate)
+    
+    if is_heart_anomaly:
+        logger.warning(f"Anomalia detectada em heart_rate: {heart_rate}")
+        heart_rate = None
+    if is_breath_anomaly:
+        logger.warning(f"Anomalia detectada em breath_rate: {breath_rate}")
+        breath_rate = None
+    
+    # Atualizar dados convertidos com valores suavizados
+    converted_data['heart_rate'] = heart_rate
+    converted_data['breath_rate'] = breath_rate
+    
+    # Adicionar timestamp do frame
+    converted_data['timestamp'] = current_time.strftime('%Y-%m-%d %H:%M:%S')
+    
+    # Identificar seção e produto baseado na posição
+    section = shelf_manager.get_section_at_position(
+        converted_data['x_point'],
+        converted_data['y_point'],
+        db_manager
+    )
+    
+    if section:
+        converted_data['section_id'] = section['id']
+        converted_data['product_id'] = section['product_id']
+        logger.info(f"Pessoa detectada na seção: {section['section_name']} (Produto: {section['product_name']})")
+    else:
+        # Ponto está fora de qualquer seção, vamos ajustar para a seção mais próxima
+        logger.info(f"Ponto original ({converted_data['x_point']}, {converted_data['y_point']}) está fora de qualquer seção. Ajustando...")
+        
+        # Seção de centro mais próximo (raster pré-calculado)
+        closest_section = shelf_manager.get_nearest_section(
+            converted_data['x_point'],
+            converted_data['y_point'],
+            db_manager
+        )
         
-    def detect_anomalies(self, heart_rate, breath_rate):
-        """
-        Detecta anomalias nos dados vitais
-        Retorna: (is_heart_anomaly, is_breath_anomaly)
-        """
-        if not self.heart_rate_history or not self.breath_rate_history:
-            return False, False
+        if closest_section:
+            # Associar à seção mais próxima sem alterar coordenadas
+            logger.info(f"Associando à seção mais próxima: {closest_section['section_name']}")
             
-        # Calcular médias e desvios padrão
-        heart_mean = sum(self.heart_rate_history) / len(self.heart_rate_history)
-        breath_mean = sum(self.breath_rate_history) / len(self.breath_rate_history)
-        
-        heart_std = (sum((x - heart_mean) ** 2 for x in self.heart_rate_history) / len(self.heart_rate_history)) ** 0.5
-        breath_std = (sum((x - breath_mean) ** 2 for x in self.breath_rate_history) / len(self.breath_rate_history)) ** 0.5
-        
-        # Definir limites para detecção de anomalias (2 desvios padrão)
-        heart_threshold = 2 * heart_std
-        breath_threshold = 2 * breath_std
-        
-        # Verificar se os valores atuais são anomalias
-        is_heart_anomaly = heart_rate is not None and abs(heart_rate - heart_mean) > heart_threshold
-        is_breath_anomaly = breath_rate is not None and abs(breath_rate - breath_mean) > breath_threshold
-        
-        return is_heart_anomaly, is_breath_anomaly
-
-# Instância global do suavizador de dados
-data_smoother = DataSmoother()
-
-class AdaptiveSampler:
-    def __init__(self):
-        # Configurações de amostragem
-        self.HIGH_ACTIVITY_THRESHOLD = 30.0  # cm/s - acima disso é considerado movimento significativo
-        self.LOW_ACTIVITY_THRESHOLD = 10.0   # cm/s - abaixo disso é considerado movimento mínimo
-        
-        # Intervalos de amostragem em milissegundos
-        self.HIGH_ACTIVITY_INTERVAL = 200    # 5 amostras por segundo para atividade alta
-        self.MEDIUM_ACTIVITY_INTERVAL = 500  # 2 amostras por segundo para atividade média
-        self.LOW_ACTIVITY_INTERVAL = 1000    # 1 amostra por segundo para atividade baixa
-        self.IDLE_INTERVAL = 2000            # 1 amostra a cada 2 segundos para inatividade
-        
-        # Estado atual
-        self.current_sampling_interval = self.MEDIUM_ACTIVITY_INTERVAL
-        self.last_sample_time = None
-        self.last_movement_speed = 0
-        self.consecutive_idle_count = 0
-        self.max_idle_count = 5  # Número máximo de amostras consecutivas em estado de inatividade
-        
-    def should_sample(self, current_time, movement_speed):
-        """
-        Determina se devemos coletar uma amostra com base na atividade atual
-        Retorna: (bool, int) - se deve amostrar e o próximo intervalo recomendado
-        """
-        # Na primeira chamada, sempre amostrar
-        if self.last_sample_time is None:
-            self.last_sample_time = current_time
-            return True, self.MEDIUM_ACTIVITY_INTERVAL
-        
-        # Calcular tempo decorrido desde a última amostra
-        elapsed_time = (current_time - self.last_sample_time).total_seconds() * 1000  # em ms
-        
-        # Determinar o intervalo de amostragem com base na velocidade de movimento
-        if movement_speed > self.HIGH_ACTIVITY_THRESHOLD:
-            # Atividade alta - amostragem frequente
-            self.current_sampling_interval = self.HIGH_ACTIVITY_INTERVAL
-            self.consecutive_idle_count = 0
-            logger.info(f"Atividade alta detectada: {movement_speed:.1f} cm/s - amostragem a cada {self.current_sampling_interval} ms")
-        elif movement_speed > self.LOW_ACTIVITY_THRESHOLD:
-            # Atividade média - amostragem normal
-            self.current_sampling_interval = self.MEDIUM_ACTIVITY_INTERVAL
-            self.consecutive_idle_count = 0
-            logger.info(f"Atividade média detectada: {movement_speed:.1f} cm/s - amostragem a cada {self.current_sampling_interval} ms")
+            converted_data['section_id'] = closest_section['id']
+            converted_data['product_id'] = closest_section['product_id']
+            
+            logger.info(f"Pessoa associada à seção: {closest_section['section_name']} (Produto: {closest_section['product_name']})")
         else:
-            # Atividade baixa ou inatividade
-            if movement_speed <= self.LOW_ACTIVITY_THRESHOLD / 2:
-                # Incrementar contador de inatividade
-                self.consecutive_idle_count += 1
-                
-                # Após várias amostras consecutivas de inatividade, reduzir ainda mais a frequência
-                if self.consecutive_idle_count >= self.max_idle_count:
-                    self.current_sampling_interval = self.IDLE_INTERVAL
-                    logger.info(f"Inatividade prolongada: {movement_speed:.1f} cm/s - amostragem a cada {self.current_sampling_interval} ms")
-                else:
-                    self.current_sampling_interval = self.LOW_ACTIVITY_INTERVAL
-                    logger.info(f"Atividade baixa detectada: {movement_speed:.1f} cm/s - amostragem a cada {self.current_sampling_interval} ms")
-            else:
-                self.current_sampling_interval = self.LOW_ACTIVITY_INTERVAL
-                logger.info(f"Atividade baixa detectada: {movement_speed:.1f} cm/s - amostragem a cada {self.current_sampling_interval} ms")
-        
-        # Verificar se o tempo decorrido é maior que o intervalo atual
-        should_sample = elapsed_time >= self.current_sampling_interval
-        
-        # Mudanças abruptas na velocidade sempre devem ser amostradas
-        if abs(movement_speed - self.last_movement_speed) > self.HIGH_ACTIVITY_THRESHOLD:
-            logger.info(f"Mudança abrupta na velocidade detectada: {self.last_movement_speed:.1f} -> {movement_speed:.1f} cm/s")
-            should_sample = True
-        
-        # Atualizar estado se for amostrar
-        if should_sample:
-            self.last_sample_time = current_time
-            self.last_movement_speed = movement_speed
-        
-        return should_sample, self.current_sampling_interval
-        
-    def reset(self):
-        """Reinicia o estado do amostrador"""
-        self.last_sample_time = None
-        self.last_movement_speed = 0
-        self.consecutive_idle_count = 0
-        self.current_sampling_interval = self.MEDIUM_ACTIVITY_INTERVAL
-
-# Instância global do amostrador adaptativo
-adaptive_sampler = AdaptiveSampler()
+            logger.warning("Não foi possível encontrar uma seção próxima")
+            converted_data['section_id'] = None
+            converted_data['product_id'] = None
+    
+    # Calcular sessão e engajamento
+    with state.lock:
+        session_id, event_type, session_data = state.session_manager.detect_session(converted_data, current_time)
+    converted_data['session_id'] = session_id
+    
+    # Salvar resumo da sessão se for final de sessão
+    if event_type == 'end' and session_data:
+        try:
+            db_manager.save_session_summary(session_data)
+        except Exception as e:
+            logger.error(f"Erro ao salvar resumo da sessão: {str(e)}")
+    
+    # Atualizar engajamento incrementalmente com o frame atual da sessão
+    with state.lock:
+        if event_type == 'end':
+            tracker = state.engagement_trackers.pop(session_id, None) or state.analytics.create_engagement_tracker()
+        else:
+            tracker = state.get_engagement_tracker(session_id)
+        engagement_level, engagement_duration = tracker.update(
+            converted_data['x_point'],
+            converted_data['y_point'],
+            converted_data['move_speed'],
+            current_time.timestamp()
+        )
+    converted_data['is_engaged'] = bool(engagement_level)  # 0=não, 1=inicial, 2=completo -> converte para boolean
+    converted_data['engagement_duration'] = int(engagement_duration)
+    
+    # Calcular satisfação
+    satisfaction_data = state.analytics.calculate_satisfaction(
+        converted_data.get('heart_rate'), 
+        converted_data.get('breath_rate')
+    )
+    
+    converted_data['satisfaction_score'] = satisfaction_data['score']
+    converted_data['satisfaction_class'] = satisfaction_data['classification']
+    
+    # Log dos dados calculados
+    logger.info(f"Dados de engajamento: nível={engagement_level}, duração={engagement_duration}s")
+    logger.info(f"Dados de satisfação: score={satisfaction_data['score']}, class={satisfaction_data['classification']}")
+    
+    return 'accepted', converted_data, next_interval
 
 @app.route('/radar/data', methods=['POST'])
 def receive_radar_data():
@@ -1469,8 +1500,21 @@ def receive_radar_data():
                 "message": "Content-Type deve ser application/json"
             }), 400
         
-        # Obter dados
-        raw_data = request.get_json()
+        # Obter dados (descomprimindo gzip/deflate se necessário)
+        try:
+            raw_data = json.loads(read_request_body(request, **BODY_LIMITS))
+        except RequestBodyError as e:
+            logger.error(f"❌ Corpo rejeitado: {str(e)}")
+            return jsonify({
+                "status": "error",
+                "message": str(e)
+            }), e.status_code
+        except ValueError as e:
+            logger.error(f"❌ JSON inválido: {str(e)}")
+            return jsonify({
+                "status": "error",
+                "message": f"JSON inválido: {str(e)}"
+            }), 400
         logger.info(f"Dados recebidos: {raw_data}")
         
         # Verificar se há dados
@@ -1489,42 +1533,6 @@ def receive_radar_data():
                 "message": error
             }), 400
         
-        # Timestamp atual
-        current_time = datetime.now()
-        
-        # Verificar se devemos processar esta amostra com base na atividade atual
-        move_speed = converted_data.get('move_speed', 0)
-        should_sample, next_interval = adaptive_sampler.should_sample(current_time, move_speed)
-        
-        if not should_sample:
-            # Retornar resposta indicando que a amostra foi recebida mas não processada
-            return jsonify({
-                "status": "success",
-                "message": "Amostra ignorada pela política de amostragem adaptativa",
-                "next_sample_interval_ms": next_interval
-            })
-        
-        # Registrar que a amostra foi aceita
-        logger.info(f"Amostra aceita para processamento. Próximo intervalo: {next_interval} ms")
-            
-        # Suavizar dados vitais
-        heart_rate = data_smoother.smooth_heart_rate(converted_data.get('heart_rate'))
-        breath_rate = data_smoother.smooth_breath_rate(converted_data.get('breath_rate'))
-        
-        # Detectar anomalias
-        is_heart_anomaly, is_breath_anomaly = data_smoother.detect_anomalies(heart_rate, breath_rate)
-        
-        if is_heart_anomaly:
-            logger.warning(f"Anomalia detectada em heart_rate: {heart_rate}")
-            heart_rate = None
-        if is_breath_anomaly:
-            logger.warning(f"Anomalia detectada em breath_rate: {breath_rate}")
-            breath_rate = None
-        
-        # Atualizar dados convertidos com valores suavizados
-        converted_data['heart_rate'] = heart_rate
-        converted_data['breath_rate'] = breath_rate
-        
         # Verificar se o banco está disponível
         if not db_manager:
             logger.error("❌ Banco de dados não disponível")
@@ -1533,88 +1541,15 @@ def receive_radar_data():
                 "message": "Banco de dados não disponível"
             }), 500
         
-        # Adicionar timestamp atual
-        converted_data['timestamp'] = current_time.strftime('%Y-%m-%d %H:%M:%S')
-        
-        # Identificar seção e produto baseado na posição
-        section = shelf_manager.get_section_at_position(
-            converted_data['x_point'],
-            converted_data['y_point'],
-            db_manager
-        )
-        
-        if section:
-            converted_data['section_id'] = section['id']
-            converted_data['product_id'] = section['product_id']
-            logger.info(f"Pessoa detectada na seção: {section['section_name']} (Produto: {section['product_name']})")
-        else:
-            # Ponto está fora de qualquer seção, vamos ajustar para a seção mais próxima
-            logger.info(f"Ponto original ({converted_data['x_point']}, {converted_data['y_point']}) está fora de qualquer seção. Ajustando...")
-            
-            # Buscar todas as seções
-            all_sections = shelf_manager.get_all_sections(db_manager)
-            closest_section = None
-            min_distance = float('inf')
-            
-            # Encontrar a seção mais próxima
-            for section_item in all_sections:
-                # Calcular o centro da seção
-                section_center_x = (section_item['x_start'] + section_item['x_end']) / 2
-                section_center_y = (section_item['y_start'] + section_item['y_end']) / 2
-                
-                # Calcular distância do ponto ao centro da seção
-                distance = ((converted_data['x_point'] - section_center_x) ** 2 + 
-                           (converted_data['y_point'] - section_center_y) ** 2) ** 0.5
-                
-                # Verificar se é a seção mais próxima
-                if distance < min_distance:
-                    min_distance = distance
-                    closest_section = section_item
-            
-            if closest_section:
-                # Associar à seção mais próxima sem alterar coordenadas
-                logger.info(f"Associando à seção mais próxima: {closest_section['section_name']}")
-                
-                converted_data['section_id'] = closest_section['id']
-                converted_data['product_id'] = closest_section['product_id']
-                
-                logger.info(f"Pessoa associada à seção: {closest_section['section_name']} (Produto: {closest_section['product_name']})")
-            else:
-                logger.warning("Não foi possível encontrar uma seção próxima")
-                converted_data['section_id'] = None
-                converted_data['product_id'] = None
-        
-        # Calcular sessão e engajamento
-        session_id, event_type, session_data = user_session_manager.detect_session(converted_data)
-        converted_data['session_id'] = session_id
-        
-        # Salvar resumo da sessão se for final de sessão
-        if event_type == 'end' and session_data:
-            try:
-                db_manager.save_session_summary(session_data)
-            except Exception as e:
-                logger.error(f"Erro ao salvar resumo da sessão: {str(e)}")
-        
-        # Obter últimos 5 registros para calcular engajamento
-        last_records = db_manager.get_last_records(5)
+        status, converted_data, next_interval = process_radar_frame(converted_data, datetime.now())
         
-        # Calcular engajamento baseado nos últimos registros
-        engagement_level, engagement_duration = analytics_manager.calculate_engagement(last_records)
-        converted_data['is_engaged'] = bool(engagement_level)  # 0=não, 1=inicial, 2=completo -> converte para boolean
-        converted_data['engagement_duration'] = int(engagement_duration)
-        
-        # Calcular satisfação
-        satisfaction_data = analytics_manager.calculate_satisfaction(
-            converted_data.get('heart_rate'), 
-            converted_data.get('breath_rate')
-        )
-        
-        converted_data['satisfaction_score'] = satisfaction_data['score']
-        converted_data['satisfaction_class'] = satisfaction_data['classification']
-        
-        # Log dos dados calculados
-        logger.info(f"Dados de engajamento: nível={engagement_level}, duração={engagement_duration}s")
-        logger.info(f"Dados de satisfação: score={satisfaction_data['score']}, class={satisfaction_data['classification']}")
+        if status == 'skipped':
+            # Retornar resposta indicando que a amostra foi recebida mas não processada
+            return jsonify({
+                "status": "success",
+                "message": "Amostra ignorada pela política de amostragem adaptativa",
+                "next_sample_interval_ms": next_interval
+            })
         
         # Inserir dados no banco
         success = db_manager.insert_radar_data(converted_data)
@@ -1641,6 +1576,117 @@ def receive_radar_data():
             "message": f"Erro ao processar dados: {str(e)}"
         }), 500
 
+@app.route('/radar/data/batch', methods=['POST'])
+def receive_radar_data_batch():
+    """
+    Endpoint para receber vários frames de um mesmo dispositivo em uma requisição
+    Corpo: array JSON de frames ou NDJSON (um frame por linha), opcionalmente com
+    Content-Encoding gzip ou deflate
+    O serial_number pode vir na query string, no header X-Serial-Number ou em cada frame
+    """
+    try:
+        current_time = datetime.now()
+        
+        logger.info("="*50)
+        logger.info("📡 Requisição POST recebida em /radar/data/batch")
+        
+        try:
+            body = read_request_body(request, **BODY_LIMITS)
+            frames = parse_batch_body(body.decode('utf-8', errors='replace'))
+        except RequestBodyError as e:
+            logger.error(f"❌ Corpo rejeitado: {str(e)}")
+            return jsonify({
+                "status": "error",
+                "message": str(e)
+            }), e.status_code
+        except ValueError as e:
+            logger.error(f"❌ Corpo do lote inválido: {str(e)}")
+            return jsonify({
+                "status": "error",
+                "message": f"Corpo do lote inválido: {str(e)}"
+            }), 400
+            
+        if not frames:
+            return jsonify({
+                "status": "error",
+                "message": "Nenhum frame recebido"
+            }), 400
+            
+        if len(frames) > MAX_BATCH_FRAMES:
+            return jsonify({
+                "status": "error",
+                "message": f"Lote excede o limite de {MAX_BATCH_FRAMES} frames"
+            }), 413
+        
+        if not db_manager:
+            logger.error("❌ Banco de dados não disponível")
+            return jsonify({
+                "status": "error",
+                "message": "Banco de dados não disponível"
+            }), 500
+            
+        serial_number = request.args.get('serial_number') or request.headers.get('X-Serial-Number')
+        logger.info(f"Lote com {len(frames)} frames (dispositivo: {serial_number})")
+        
+        # Converter todos os frames antes de atribuir horários
+        converted_frames = []
+        for frame in frames:
+            if frame is None:
+                converted_frames.append(None)
+                continue
+            if serial_number and not frame.get('serial_number'):
+                frame['serial_number'] = serial_number
+            converted_data, error = convert_radar_data(frame)
+            if error:
+                logger.warning(f"Frame inválido no lote: {error}")
+                converted_frames.append(None)
+                continue
+            # Preservar o timestamp enviado pelo dispositivo para assign_batch_frame_times
+            converted_data['timestamp'] = frame.get('timestamp')
+            converted_frames.append(converted_data)
+        
+        # Frames sem timestamp são espaçados pelo intervalo de amostragem do dispositivo
+        batch_serial = serial_number or next(
+            (data['serial_number'] for data in converted_frames if data),
+            'RADAR_1'
+        )
+        sampling_interval = device_states.get(batch_serial).sampler.current_sampling_interval
+        frame_times = assign_batch_frame_times(converted_frames, current_time, sampling_interval)
+        
+        results = []
+        counts = {}
+        next_interval = None
+        
+        for index, converted_data in enumerate(converted_frames):
+            if converted_data is None:
+                status = 'invalid'
+            else:
+                status, converted_data, next_interval = process_radar_frame(
+                    converted_data, frame_times[index], apply_sampling=False
+                )
+                if status == 'accepted' and not db_manager.insert_radar_data(converted_data):
+                    status = 'error'
+            results.append({"index": index, "status": status})
+            counts[status] = counts.get(status, 0) + 1
+        
+        logger.info(f"Lote processado: {counts}")
+        
+        return jsonify({
+            "status": "success" if not counts.get("error") else "partial",
+            "message": "Lote processado",
+            "counts": counts,
+            "results": results,
+            "next_sample_interval_ms": next_interval
+        }), 200 if not counts.get("error") else 207
+        
+    except Exception as e:
+        logger.error(f"❌ Erro ao processar lote: {str(e)}")
+        logger.error(traceback.format_exc())
+        return jsonify({
+            "status": "error",
+            "message": f"Erro ao processar lote: {str(e)}"
+        }), 500
+
 @app.route('/radar/status', methods=['GET'])
 def get_status():
     """Endpoint para verificar status"""
@@ -1654,29 +1700,25 @@ def get_status():
 
         try:
             # Verificar conexão
-            if db_manager and db_manager.conn:
-                is_connected = db_manager.conn.is_connected()
-                status["connection_info"]["is_connected"] = is_connected
+            if db_manager and db_manager.pool.ready:
+                status["connection_info"]["pool"] = db_manager.get_pool_stats()
                 
-                if is_connected:
+                # Obter informações do servidor
+                try:
+                    with db_manager.connection() as (conn, cursor):
+                        cursor.execute("SELECT VERSION() as version")
+                        version = cursor.fetchone()
+                    status["connection_info"]["is_connected"] = True
                     status["database"] = "online"
                     status["last_records"] = db_manager.get_last_records(5)
                     
-                    # Obter informações do servidor
-                    try:
-                        cursor = db_manager.conn.cursor(dictionary=True)
-                        cursor.execute("SELECT VERSION() as version")
-                        version = cursor.fetchone()
-                        cursor.close()
-                        
-                        if version:
-                            status["connection_info"]["version"] = version["version"]
-                    except Exception as e:
-                        status["connection_info"]["version_error"] = str(e)
-                else:
-                    status["connection_info"]["connection_error"] = "Connection object exists but is not connected"
+                    if version:
+                        status["connection_info"]["version"] = version["version"]
+                except Exception as e:
+                    status["connection_info"]["is_connected"] = False
+                    status["connection_info"]["connection_error"] = str(e)
             else:
-                status["connection_info"]["error"] = "Database manager or connection object is None"
+                status["connection_info"]["error"] = "Database manager or connection pool is None"
         except Exception as e:
             status["connection_info"]["exception"] = str(e)
 
@@ -1761,6 +1803,11 @@ def get_sections():
             }), 500
             
         sections = shelf_manager.get_all_sections(db_manager)
+        if sections is None:
+            return jsonify({
+                "status": "error",
+                "message": "Erro ao buscar seções no banco"
+            }), 500
         
         return jsonify({
             "status": "success",
@@ -1874,8 +1921,13 @@ def get_sampling_config():
             "low_activity_interval_ms": adaptive_sampler.LOW_ACTIVITY_INTERVAL,
             "idle_interval_ms": adaptive_sampler.IDLE_INTERVAL,
             "max_idle_count": adaptive_sampler.max_idle_count,
-            "current_sampling_interval_ms": adaptive_sampler.current_sampling_interval,
-            "consecutive_idle_count": adaptive_sampler.consecutive_idle_count
+            "devices": {
+                state.serial_number: {
+                    "current_sampling_interval_ms": state.sampler.current_sampling_interval,
+                    "consecutive_idle_count": state.sampler.consecutive_idle_count
+                }
+                for state in device_states.all_states()
+            }
         }
         
         return jsonify({
@@ -1924,8 +1976,8 @@ def update_sampling_config():
         if 'max_idle_count' in config:
             adaptive_sampler.max_idle_count = int(config['max_idle_count'])
         
-        # Resetar o estado do amostrador ao aplicar novas configurações
-        adaptive_sampler.reset()
+        # Aplicar a nova configuração (e resetar o estado) em todos os dispositivos
+        device_states.apply_sampler_config()
         
         logger.info(f"Configuração de amostragem atualizada: {config}")
         
@@ -1939,8 +1991,7 @@ def update_sampling_config():
                 "medium_activity_interval_ms": adaptive_sampler.MEDIUM_ACTIVITY_INTERVAL,
                 "low_activity_interval_ms": adaptive_sampler.LOW_ACTIVITY_INTERVAL,
                 "idle_interval_ms": adaptive_sampler.IDLE_INTERVAL,
-                "max_idle_count": adaptive_sampler.max_idle_count,
-                "current_sampling_interval_ms": adaptive_sampler.current_sampling_interval
+                "max_idle_count": adaptive_sampler.max_idle_count
             }
         })
     except Exception as e:
@@ -9,6 +9,9 @@ import traceback
 import time
 import numpy as np
 import uuid
+from request_body import read_request_body, RequestBodyError
+from radar_db import ConnectionPool
+from radar_batch import DEFAULT_MAX_BATCH_FRAMES, parse_batch_body, assign_batch_frame_times
 
 # Configuração básica de logging
 logging.basicConfig(
@@ -26,6 +29,19 @@ load_dotenv()
 
 app = Flask(__name__)
 
+# Limites do corpo HTTP (Content-Encoding gzip/deflate é descomprimido em streaming)
+BODY_LIMITS = {
+    "max_body_bytes": int(os.getenv("RADAR_MAX_BODY_BYTES", 1024 * 1024)),
+    "max_decompressed_bytes": int(os.getenv("RADAR_MAX_DECOMPRESSED_BYTES", 8 * 1024 * 1024)),
+    "max_ratio": float(os.getenv("RADAR_MAX_COMPRESSION_RATIO", 100))
+}
+
+# Limite de frames aceitos em uma única requisição de lote
+MAX_BATCH_FRAMES = int(os.getenv("RADAR_BATCH_MAX_FRAMES", DEFAULT_MAX_BATCH_FRAMES))
+
+# Espaçamento atribuído aos frames do lote enviados sem timestamp
+BATCH_FRAME_INTERVAL_MS = int(os.getenv("RADAR_BATCH_FRAME_INTERVAL_MS", 500))
+
 def convert_radar_data(raw_data):
     """Converte dados do radar para o formato do banco"""
     try:
@@ -180,22 +196,23 @@ class ShelfManager:
     def initialize_database(self, db_manager):
         """Inicializa a tabela de seções da gôndola"""
         try:
-            # Criar tabela para seções da gôndola
-            db_manager.cursor.execute("""
-                CREATE TABLE IF NOT EXISTS shelf_sections (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    section_name VARCHAR(50),
-                    x_start FLOAT,
-                    y_start FLOAT,
-                    x_end FLOAT,
-                    y_end FLOAT,
-                    product_id VARCHAR(50),
-                    product_name VARCHAR(100),
-                    last_updated DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-                    is_active BOOLEAN DEFAULT TRUE
-                )
-            """)
-            db_manager.conn.commit()
+            with db_manager.connection() as (conn, cursor):
+                # Criar tabela para seções da gôndola
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS shelf_sections (
+                        id INT AUTO_INCREMENT PRIMARY KEY,
+                        section_name VARCHAR(50),
+                        x_start FLOAT,
+                        y_start FLOAT,
+                        x_end FLOAT,
+                        y_end FLOAT,
+                        product_id VARCHAR(50),
+                        product_name VARCHAR(100),
+                        last_updated DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                        is_active BOOLEAN DEFAULT TRUE
+                    )
+                """)
+                conn.commit()
             logger.info("✅ Tabela shelf_sections criada/verificada com sucesso!")
             
             # Criar seções padrão, caso não exista nenhuma na tabela.
@@ -212,34 +229,35 @@ class ShelfManager:
            A primeira seção ocupará y de 0.0 a 0.5 e a segunda de 0.5 a 1.0.
         """
         try:
-            # Verifica se já existem seções cadastradas
-            db_manager.cursor.execute("SELECT COUNT(*) as count FROM shelf_sections")
-            result = db_manager.cursor.fetchone()
-            if result and result['count'] == 0:
-                sections = [
-                    {
-                        'section_name': 'Seção Inferior',
-                        'x_start': 0.0,
-                        'y_start': 0.0,
-                        'x_end': self.total_width,   # consideramos largura total da gôndola
-                        'y_end': 0.5,
-                        'product_id': 'PROD_1',
-                        'product_name': 'Produto 1'
-                    },
-                    {
-                        'section_name': 'Seção Superior',
-                        'x_start': 0.0,
-                        'y_start': 0.5,
-                        'x_end': self.total_width,
-                        'y_end': 1.0,
-                        'product_id': 'PROD_2',
-                        'product_name': 'Produto 2'
-                    }
-                ]
-                for sec in sections:
-                    self.add_section(sec, db_manager)
-                db_manager.conn.commit()
-                logger.info("✅ Seções padrão criadas com sucesso.")
+            with db_manager.connection() as (conn, cursor):
+                # Verifica se já existem seções cadastradas
+                cursor.execute("SELECT COUNT(*) as count FROM shelf_sections")
+                result = cursor.fetchone()
+                if result and result['count'] == 0:
+                    sections = [
+                        {
+                            'section_name': 'Seção Inferior',
+                            'x_start': 0.0,
+                            'y_start': 0.0,
+                            'x_end': self.total_width,   # consideramos largura total da gôndola
+                            'y_end': 0.5,
+                            'product_id': 'PROD_1',
+                            'product_name': 'Produto 1'
+                        },
+                        {
+                            'section_name': 'Seção Superior',
+                            'x_start': 0.0,
+                            'y_start': 0.5,
+                            'x_end': self.total_width,
+                            'y_end': 1.0,
+                            'product_id': 'PROD_2',
+                            'product_name': 'Produto 2'
+                        }
+                    ]
+                    for sec in sections:
+                        self.add_section(sec, db_manager)
+                    conn.commit()
+                    logger.info("✅ Seções padrão criadas com sucesso.")
         except Exception as e:
             logger.error(f"Erro ao criar seções padrão: {str(e)}")
             logger.error(traceback.format_exc())
@@ -260,8 +278,9 @@ class ShelfManager:
                 LIMIT 1
             """
             
-            db_manager.cursor.execute(query, (x, x, y, y))
-            section = db_manager.cursor.fetchone()
+            with db_manager.connection() as (conn, cursor):
+                cursor.execute(query, (x, x, y, y))
+                section = cursor.fetchone()
             
             if section:
                 logger.info(f"Seção encontrada: {section['section_name']} (Produto: {section['product_name']})")
@@ -297,8 +316,9 @@ class ShelfManager:
                 section_data['product_name']
             )
             
-            db_manager.cursor.execute(query, params)
-            db_manager.conn.commit()
+            with db_manager.connection() as (conn, cursor):
+                cursor.execute(query, params)
+                conn.commit()
             
             logger.info(f"✅ Seção {section_data['section_name']} adicionada com sucesso!")
             return True
@@ -337,8 +357,9 @@ class ShelfManager:
                 WHERE id = %s
             """
             
-            db_manager.cursor.execute(query, params)
-            db_manager.conn.commit()
+            with db_manager.connection() as (conn, cursor):
+                cursor.execute(query, params)
+                conn.commit()
             
             logger.info(f"✅ Seção {section_id} atualizada com sucesso!")
             return True
@@ -357,8 +378,9 @@ class ShelfManager:
                 ORDER BY section_name
             """
             
-            db_manager.cursor.execute(query)
-            sections = db_manager.cursor.fetchall()
+            with db_manager.connection() as (conn, cursor):
+                cursor.execute(query)
+                sections = cursor.fetchall()
             
             return sections
             
@@ -370,51 +392,49 @@ class ShelfManager:
 # Instância global do gerenciador de seções
 shelf_manager = ShelfManager()
 
+# Configurações do MySQL (driver puro Python e configurações SSL mais simples)
+db_config = {
+    "host": os.getenv("DB_HOST", "168.75.89.11"),
+    "user": os.getenv("DB_USER", "belugaDB"),
+    "password": os.getenv("DB_PASSWORD", "Rpcr@300476"),
+    "database": os.getenv("DB_NAME", "Beluga_Analytics"),
+    "port": int(os.getenv("DB_PORT", 3306)),
+    "use_pure": True,
+    "ssl_disabled": True,
+    "auth_plugin": "mysql_native_password",
+    "connect_timeout": 120,
+    "charset": "utf8mb4",
+    "collation": "utf8mb4_unicode_ci"
+}
+
 class DatabaseManager:
     def __init__(self):
-        self.conn = None
-        self.cursor = None
         self.last_sequence = 0
         self.last_move_speed = None
+        
+        # Pool de conexões (radar_db.py): cada requisição usa uma conexão própria
+        self.POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+        self.pool = ConnectionPool(
+            db_config,
+            pool_name="radar_pool",
+            pool_size=self.POOL_SIZE,
+            wait_timeout=float(os.getenv("DB_POOL_WAIT_TIMEOUT", 10)),  # segundos
+            ping_idle_seconds=float(os.getenv("DB_PING_IDLE_SECONDS", 30))  # ping só após esse tempo ociosa
+        )
         self.connect_with_retry()
         
     def connect_with_retry(self, max_attempts=5):
-        """Tenta conectar ao banco com retry"""
+        """Cria o pool de conexões com retry"""
         attempt = 0
         while attempt < max_attempts:
             try:
                 attempt += 1
-                logger.info(f"Tentativa {attempt} de {max_attempts} para conectar ao banco...")
-                
-                if self.conn:
-                    try:
-                        self.conn.close()
-                    except:
-                        pass
-                
-                # Usando driver puro Python e configurações SSL mais simples
-                db_config = {
-                    "host": os.getenv("DB_HOST", "168.75.89.11"),
-                    "user": os.getenv("DB_USER", "belugaDB"),
-                    "password": os.getenv("DB_PASSWORD", "Rpcr@300476"),
-                    "database": os.getenv("DB_NAME", "Beluga_Analytics"),
-                    "port": int(os.getenv("DB_PORT", 3306)),
-                    "use_pure": True,
-                    "ssl_disabled": True,
-                    "auth_plugin": "mysql_native_password",
-                    "connect_timeout": 120,
-                    "pool_size": 3,
-                    "charset": "utf8mb4",
-                    "collation": "utf8mb4_unicode_ci"
-                }
-                self.conn = mysql.connector.connect(**db_config)
-                self.cursor = self.conn.cursor(dictionary=True)
+                logger.info(f"Tentativa {attempt} de {max_attempts} para criar pool de conexões ({self.POOL_SIZE} conexões)...")
                 
-                # Testar conexão
-                self.cursor.execute("SELECT 1")
-                self.cursor.fetchone()
+                # Criar o pool e testar uma conexão
+                self.pool.create()
                 
-                logger.info("✅ Conexão estabelecida com sucesso!")
+                logger.info("✅ Pool de conexões estabelecido com sucesso!")
                 self.initialize_database()
                 return True
                 
@@ -426,112 +446,124 @@ class DatabaseManager:
                 time.sleep(2)
         return False
 
+    def connection(self):
+        """
+        Empresta uma conexão do pool e um cursor para a thread atual
+        Uso: with db_manager.connection() as (conn, cursor)
+        """
+        return self.pool.connection()
+
+    def get_pool_stats(self):
+        """Retorna métricas do pool de conexões"""
+        return self.pool.get_stats()
+
     def initialize_database(self):
         """Inicializa o banco de dados"""
         try:
-            # Verificar/criar tabela de dispositivos primeiro
-            logger.info("Verificando tabela de dispositivos...")
-            self.cursor.execute("""
-                CREATE TABLE IF NOT EXISTS Dispositivos (
-                    serial_number VARCHAR(50) PRIMARY KEY,
-                    nome VARCHAR(100),
-                    tipo VARCHAR(50),
-                    status VARCHAR(20) DEFAULT 'ATIVO',
-                    data_cadastro DATETIME DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            
-            # Inserir dispositivo padrão se não existir
-            logger.info("Verificando dispositivo padrão...")
-            self.cursor.execute("""
-                INSERT IGNORE INTO Dispositivos (serial_number, nome, tipo)
-                VALUES ('RADAR_2', 'Radar Principal', 'RADAR')
-            """)
-            
-            # Verificar se a tabela radar_dados existe
-            self.cursor.execute("SHOW TABLES LIKE 'radar_dados'")
-            table_exists = self.cursor.fetchone()
-            
-            if not table_exists:
-                # Criar tabela se não existir
-                logger.info("Criando tabela radar_dados...")
-                self.cursor.execute("""
-                    CREATE TABLE radar_dados (
-                        id INT AUTO_INCREMENT PRIMARY KEY,
-                        x_point FLOAT,
-                        y_point FLOAT,
-                        move_speed FLOAT,
-                        heart_rate FLOAT,
-                        breath_rate FLOAT,
-                        satisfaction_score FLOAT,
-                        satisfaction_class VARCHAR(20),
-                        is_engaged BOOLEAN,
-                        engagement_duration INT,
-                        session_id VARCHAR(36),
-                        section_id INT,
-                        product_id VARCHAR(50),
-                        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                        serial_number VARCHAR(50),
-                        FOREIGN KEY (serial_number) REFERENCES Dispositivos(serial_number)
+            with self.connection() as (conn, cursor):
+                # Verificar/criar tabela de dispositivos primeiro
+                logger.info("Verificando tabela de dispositivos...")
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS Dispositivos (
+                        serial_number VARCHAR(50) PRIMARY KEY,
+                        nome VARCHAR(100),
+                        tipo VARCHAR(50),
+                        status VARCHAR(20) DEFAULT 'ATIVO',
+                        data_cadastro DATETIME DEFAULT CURRENT_TIMESTAMP
                     )
                 """)
-                logger.info("Tabela radar_dados criada com sucesso!")
-            
-            # Verificar se a coluna serial_number existe
-            self.cursor.execute("SHOW COLUMNS FROM radar_dados LIKE 'serial_number'")
-            serial_number_exists = self.cursor.fetchone()
-            
-            if not serial_number_exists:
-                logger.info("Adicionando coluna serial_number...")
-                try:
-                    # Adicionar coluna com valor padrão
-                    self.cursor.execute("""
-                        ALTER TABLE radar_dados 
-                        ADD COLUMN serial_number VARCHAR(50),
-                        ADD FOREIGN KEY (serial_number) REFERENCES Dispositivos(serial_number)
-                    """)
-                    # Atualizar registros existentes
-                    self.cursor.execute("""
-                        UPDATE radar_dados 
-                        SET serial_number = 'RADAR_2' 
-                        WHERE serial_number IS NULL
+                
+                # Inserir dispositivo padrão se não existir
+                logger.info("Verificando dispositivo padrão...")
+                cursor.execute("""
+                    INSERT IGNORE INTO Dispositivos (serial_number, nome, tipo)
+                    VALUES ('RADAR_2', 'Radar Principal', 'RADAR')
+                """)
+                
+                # Verificar se a tabela radar_dados existe
+                cursor.execute("SHOW TABLES LIKE 'radar_dados'")
+                table_exists = cursor.fetchone()
+                
+                if not table_exists:
+                    # Criar tabela se não existir
+                    logger.info("Criando tabela radar_dados...")
+                    cursor.execute("""
+                        CREATE TABLE radar_dados (
+                            id INT AUTO_INCREMENT PRIMARY KEY,
+                            x_point FLOAT,
+                            y_point FLOAT,
+                            move_speed FLOAT,
+                            heart_rate FLOAT,
+                            breath_rate FLOAT,
+                            satisfaction_score FLOAT,
+                            satisfaction_class VARCHAR(20),
+                            is_engaged BOOLEAN,
+                            engagement_duration INT,
+                            session_id VARCHAR(36),
+                            section_id INT,
+                            product_id VARCHAR(50),
+                            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                            serial_number VARCHAR(50),
+                            FOREIGN KEY (serial_number) REFERENCES Dispositivos(serial_number)
+                        )
                     """)
-                    logger.info("Coluna serial_number adicionada e atualizada com sucesso!")
-                except Exception as e:
-                    logger.error(f"Erro ao adicionar coluna serial_number: {str(e)}")
-            
-            # Verificar e adicionar outras colunas que estão faltando
-            logger.info("Verificando outras colunas da tabela radar_dados...")
-            
-            # Verificar se as colunas existem
-            self.cursor.execute("DESCRIBE radar_dados")
-            columns = self.cursor.fetchall()
-            existing_columns = [column['Field'] for column in columns]
-            
-            logger.info(f"Colunas existentes: {existing_columns}")
-            
-            # Colunas que devem existir
-            required_columns = {
-                'satisfaction_score': 'ADD COLUMN satisfaction_score FLOAT',
-                'satisfaction_class': 'ADD COLUMN satisfaction_class VARCHAR(20)',
-                'is_engaged': 'ADD COLUMN is_engaged BOOLEAN',
-                'engagement_duration': 'ADD COLUMN engagement_duration INT',
-                'session_id': 'ADD COLUMN session_id VARCHAR(36)',
-                'section_id': 'ADD COLUMN section_id INT',
-                'product_id': 'ADD COLUMN product_id VARCHAR(50)'
-            }
-            
-            # Adicionar colunas faltantes
-            for column, add_command in required_columns.items():
-                if column not in existing_columns:
-                    logger.info(f"Adicionando coluna {column}...")
+                    logger.info("Tabela radar_dados criada com sucesso!")
+                
+                # Verificar se a coluna serial_number existe
+                cursor.execute("SHOW COLUMNS FROM radar_dados LIKE 'serial_number'")
+                serial_number_exists = cursor.fetchone()
+                
+                if not serial_number_exists:
+                    logger.info("Adicionando coluna serial_number...")
                     try:
-                        self.cursor.execute(f"ALTER TABLE radar_dados {add_command}")
-                        logger.info(f"Coluna {column} adicionada com sucesso!")
+                        # Adicionar coluna com valor padrão
+                        cursor.execute("""
+                            ALTER TABLE radar_dados 
+                            ADD COLUMN serial_number VARCHAR(50),
+                            ADD FOREIGN KEY (serial_number) REFERENCES Dispositivos(serial_number)
+                        """)
+                        # Atualizar registros existentes
+                        cursor.execute("""
+                            UPDATE radar_dados 
+                            SET serial_number = 'RADAR_2' 
+                            WHERE serial_number IS NULL
+                        """)
+                        logger.info("Coluna serial_number adicionada e atualizada com sucesso!")
                     except Exception as e:
-                        logger.error(f"Erro ao adicionar coluna {column}: {str(e)}")
-            
-            self.conn.commit()
+                        logger.error(f"Erro ao adicionar coluna serial_number: {str(e)}")
+                
+                # Verificar e adicionar outras colunas que estão faltando
+                logger.info("Verificando outras colunas da tabela radar_dados...")
+                
+                # Verificar se as colunas existem
+                cursor.execute("DESCRIBE radar_dados")
+                columns = cursor.fetchall()
+                existing_columns = [column['Field'] for column in columns]
+                
+                logger.info(f"Colunas existentes: {existing_columns}")
+                
+                # Colunas que devem existir
+                required_columns = {
+                    'satisfaction_score': 'ADD COLUMN satisfaction_score FLOAT',
+                    'satisfaction_class': 'ADD COLUMN satisfaction_class VARCHAR(20)',
+                    'is_engaged': 'ADD COLUMN is_engaged BOOLEAN',
+                    'engagement_duration': 'ADD COLUMN engagement_duration INT',
+                    'session_id': 'ADD COLUMN session_id VARCHAR(36)',
+                    'section_id': 'ADD COLUMN section_id INT',
+                    'product_id': 'ADD COLUMN product_id VARCHAR(50)'
+                }
+                
+                # Adicionar colunas faltantes
+                for column, add_command in required_columns.items():
+                    if column not in existing_columns:
+                        logger.info(f"Adicionando coluna {column}...")
+                        try:
+                            cursor.execute(f"ALTER TABLE radar_dados {add_command}")
+                            logger.info(f"Coluna {column} adicionada com sucesso!")
+                        except Exception as e:
+                            logger.error(f"Erro ao adicionar coluna {column}: {str(e)}")
+                
+                conn.commit()
             logger.info("✅ Banco de dados atualizado com sucesso!")
             
         except Exception as e:
@@ -542,27 +574,28 @@ class DatabaseManager:
     def ensure_device_exists(self, serial_number, nome=None, tipo=None):
         """Garante que o dispositivo existe no banco"""
         try:
-            # Verificar se o dispositivo já existe
-            self.cursor.execute("""
-                SELECT serial_number FROM Dispositivos
-                WHERE serial_number = %s
-            """, (serial_number,))
-            
-            device = self.cursor.fetchone()
-            
-            if not device:
-                # Inserir novo dispositivo
-                logger.info(f"Inserindo novo dispositivo: {serial_number}")
-                self.cursor.execute("""
-                    INSERT INTO Dispositivos (serial_number, nome, tipo)
-                    VALUES (%s, %s, %s)
-                """, (
-                    serial_number,
-                    nome or f"Radar {serial_number}",
-                    tipo or "RADAR"
-                ))
-                self.conn.commit()
-                logger.info(f"✅ Dispositivo {serial_number} inserido com sucesso!")
+            with self.connection() as (conn, cursor):
+                # Verificar se o dispositivo já existe
+                cursor.execute("""
+                    SELECT serial_number FROM Dispositivos
+                    WHERE serial_number = %s
+                """, (serial_number,))
+                
+                device = cursor.fetchone()
+                
+                if not device:
+                    # Inserir novo dispositivo
+                    logger.info(f"Inserindo novo dispositivo: {serial_number}")
+                    cursor.execute("""
+                        INSERT INTO Dispositivos (serial_number, nome, tipo)
+                        VALUES (%s, %s, %s)
+                    """, (
+                        serial_number,
+                        nome or f"Radar {serial_number}",
+                        tipo or "RADAR"
+                    ))
+                    conn.commit()
+                    logger.info(f"✅ Dispositivo {serial_number} inserido com sucesso!")
             
             return True
         except Exception as e:
@@ -575,11 +608,6 @@ class DatabaseManager:
             logger.info("="*50)
             logger.info("Iniciando inserção de dados no banco...")
             
-            # Verificar conexão antes de inserir
-            if not self.conn or not self.conn.is_connected():
-                logger.info("Conexão não disponível, tentando reconectar...")
-                self.connect_with_retry()
-            
             # Garantir que o dispositivo existe
             serial_number = data.get('serial_number', 'RADAR_2')
             if not self.ensure_device_exists(serial_number):
@@ -633,9 +661,10 @@ class DatabaseManager:
             logger.info(f"Query: {query}")
             logger.info(f"Parâmetros: {params}")
             
-            # Executar inserção
-            self.cursor.execute(query, params)
-            self.conn.commit()
+            with self.connection() as (conn, cursor):
+                # Executar inserção
+                cursor.execute(query, params)
+                conn.commit()
             
             logger.info("✅ Dados inseridos com sucesso!")
             return True
@@ -652,17 +681,15 @@ class DatabaseManager:
     def get_last_records(self, limit=5):
         """Obtém últimos registros"""
         try:
-            if not self.conn or not self.conn.is_connected():
-                self.connect_with_retry()
-                
             query = """
                 SELECT * FROM radar_dados
                 ORDER BY timestamp DESC 
                 LIMIT %s
             """
             
-            self.cursor.execute(query, (limit,))
-            records = self.cursor.fetchall()
+            with self.connection() as (conn, cursor):
+                cursor.execute(query, (limit,))
+                records = cursor.fetchall()
             
             # Converter datetime para string
             for record in records:
@@ -680,11 +707,6 @@ class DatabaseManager:
             logger.info("="*50)
             logger.info(f"Salvando resumo da sessão {session_data['session_id']}...")
             
-            # Verificar conexão antes de inserir
-            if not self.conn or not self.conn.is_connected():
-                logger.info("Conexão não disponível, tentando reconectar...")
-                self.connect_with_retry()
-            
             # Preparar query
             query = """
                 INSERT INTO radar_sessoes
@@ -736,9 +758,10 @@ class DatabaseManager:
             logger.info(f"Query SQL: {query}")
             logger.info(f"Parâmetros: {params}")
             
-            # Executar inserção
-            self.cursor.execute(query, params)
-            self.conn.commit()
+            with self.connection() as (conn, cursor):
+                # Executar inserção
+                cursor.execute(query, params)
+                conn.commit()
             
             logger.info(f"✅ Resumo da sessão {session_data['session_id']} salvo com sucesso!")
             logger.info("="*50)
@@ -755,17 +778,15 @@ class DatabaseManager:
     def get_sessions(self, limit=10):
         """Obtém as sessões mais recentes"""
         try:
-            if not self.conn or not self.conn.is_connected():
-                self.connect_with_retry()
-                
             query = """
                 SELECT * FROM radar_sessoes
                 ORDER BY end_time DESC 
                 LIMIT %s
             """
             
-            self.cursor.execute(query, (limit,))
-            sessions = self.cursor.fetchall()
+            with self.connection() as (conn, cursor):
+                cursor.execute(query, (limit,))
+                sessions = cursor.fetchall()
             
             # Converter datetime para string
             for session in sessions:
@@ -783,36 +804,34 @@ class DatabaseManager:
     def get_session_by_id(self, session_id):
         """Obtém uma sessão específica pelo ID"""
         try:
-            if not self.conn or not self.conn.is_connected():
-                self.connect_with_retry()
+            with self.connection() as (conn, cursor):
+                # Buscar resumo da sessão
+                query_session = """
+                    SELECT * FROM radar_sessoes
+                    WHERE session_id = %s
+                """
                 
-            # Buscar resumo da sessão
-            query_session = """
-                SELECT * FROM radar_sessoes
-                WHERE session_id = %s
-            """
-            
-            self.cursor.execute(query_session, (session_id,))
-            session = self.cursor.fetchone()
-            
-            if not session:
-                return None
+                cursor.execute(query_session, (session_id,))
+                session = cursor.fetchone()
                 
-            # Converter datetime para string
-            if isinstance(session['start_time'], datetime):
-                session['start_time'] = session['start_time'].strftime('%Y-%m-%d %H:%M:%S')
-            if isinstance(session['end_time'], datetime):
-                session['end_time'] = session['end_time'].strftime('%Y-%m-%d %H:%M:%S')
-            
-            # Buscar pontos de dados da sessão
-            query_points = """
-                SELECT * FROM radar_dados
-                WHERE session_id = %s
-                ORDER BY timestamp ASC
-            """
-            
-            self.cursor.execute(query_points, (session_id,))
-            points = self.cursor.fetchall()
+                if not session:
+                    return None
+                    
+                # Converter datetime para string
+                if isinstance(session['start_time'], datetime):
+                    session['start_time'] = session['start_time'].strftime('%Y-%m-%d %H:%M:%S')
+                if isinstance(session['end_time'], datetime):
+                    session['end_time'] = session['end_time'].strftime('%Y-%m-%d %H:%M:%S')
+                
+                # Buscar pontos de dados da sessão
+                query_points = """
+                    SELECT * FROM radar_dados
+                    WHERE session_id = %s
+                    ORDER BY timestamp ASC
+                """
+                
+                cursor.execute(query_points, (session_id,))
+                points = cursor.fetchall()
             
             # Converter datetime para string nos pontos
             for point in points:
@@ -897,9 +916,10 @@ class DatabaseManager:
             logger.info(f"Query: {query}")
             logger.info(f"Parâmetros: {params}")
             
-            # Executar inserção
-            self.cursor.execute(query, params)
-            self.conn.commit()
+            with self.connection() as (conn, cursor):
+                # Executar inserção
+                cursor.execute(query, params)
+                conn.commit()
             
             logger.info("✅ Dados inseridos com sucesso!")
             return True
@@ -1381,6 +1401,115 @@ class DataSmoother:
 # Instância global do suavizador de dados
 data_smoother = DataSmoother()
 
+def process_radar_frame(converted_data, current_time):
+    """
+    Executa o pipeline de um frame já convertido: suavização, seção, sessão,
+    engajamento e satisfação
+    Retorna: converted_data com os campos calculados
+    """
+    # Suavizar dados vitais
+    heart_rate = data_smoother.smooth_heart_rate(converted_data.get('heart_rate'))
+    breath_rate = data_smoother.smooth_breath_rate(converted_data.get('breath_rate'))
+    
+    # Detectar anomalias
+    is_heart_anomaly, is_breath_anomaly = data_smoother.detect_anomalies(heart_rate, breath_rate)
+    
+    if is_heart_anomaly:
+        logger.warning(f"Anomalia detectada em heart_rate: {heart_rate}")
+        heart_rate = None
+    if is_breath_anomaly:
+        logger.warning(f"Anomalia detectada em breath_rate: {breath_rate}")
+        breath_rate = None
+    
+    # Atualizar dados convertidos com valores suavizados
+    converted_data['heart_rate'] = heart_rate
+    converted_data['breath_rate'] = breath_rate
+    
+    # Adicionar timestamp do frame
+    converted_data['timestamp'] = current_time.strftime('%Y-%m-%d %H:%M:%S')
+    
+    # Identificar seção e produto baseado na posição
+    section = shelf_manager.get_section_at_position(
+        converted_data['x_point'],
+        converted_data['y_point'],
+        db_manager
+    )
+    
+    if section:
+        converted_data['section_id'] = section['id']
+        converted_data['product_id'] = section['product_id']
+        logger.info(f"Pessoa detectada na seção: {section['section_name']} (Produto: {section['product_name']})")
+    else:
+        # Ponto está fora de qualquer seção, vamos ajustar para a seção mais próxima
+        logger.info(f"Ponto original ({converted_data['x_point']}, {converted_data['y_point']}) está fora de qualquer seção. Ajustando...")
+        
+        # Buscar todas as seções
+        all_sections = shelf_manager.get_all_sections(db_manager)
+        closest_section = None
+        min_distance = float('inf')
+        
+        # Encontrar a seção mais próxima
+        for section_item in all_sections:
+            # Calcular o centro da seção
+            section_center_x = (section_item['x_start'] + section_item['x_end']) / 2
+            section_center_y = (section_item['y_start'] + section_item['y_end']) / 2
+            
+            # Calcular distância do ponto ao centro da seção
+            distance = ((converted_data['x_point'] - section_center_x) ** 2 + 
+                       (converted_data['y_point'] - section_center_y) ** 2) ** 0.5
+            
+            # Verificar se é a seção mais próxima
+            if distance < min_distance:
+                min_distance = distance
+                closest_section = section_item
+        
+        if closest_section:
+            # Associar à seção mais próxima sem alterar coordenadas
+            logger.info(f"Associando à seção mais próxima: {closest_section['section_name']}")
+            
+            converted_data['section_id'] = closest_section['id']
+            converted_data['product_id'] = closest_section['product_id']
+            
+            logger.info(f"Pessoa associada à seção: {closest_section['section_name']} (Produto: {closest_section['product_name']})")
+        else:
+            logger.warning("Não foi possível encontrar uma seção próxima")
+            converted_data['section_id'] = None
+            converted_data['product_id'] = None
+    
+    # Calcular sessão e engajamento
+    session_id, event_type, session_data = user_session_manager.detect_session(converted_data)
+    converted_data['session_id'] = session_id
+    
+    # Salvar resumo da sessão se for final de sessão
+    if event_type == 'end' and session_data:
+        try:
+            db_manager.save_session_summary(session_data)
+        except Exception as e:
+            logger.error(f"Erro ao salvar resumo da sessão: {str(e)}")
+    
+    # Obter últimos 5 registros para calcular engajamento
+    last_records = db_manager.get_last_records(5)
+    
+    # Calcular engajamento baseado nos últimos registros
+    engagement_level, engagement_duration = analytics_manager.calculate_engagement(last_records)
+    converted_data['is_engaged'] = bool(engagement_level)  # 0=não, 1=inicial, 2=completo -> converte para boolean
+    converted_data['engagement_duration'] = int(engagement_duration)
+    
+    # Calcular satisfação
+    satisfaction_data = analytics_manager.calculate_satisfaction(
+        converted_data.get('heart_rate'), 
+        converted_data.get('breath_rate')
+    )
+    
+    converted_data['satisfaction_score'] = satisfaction_data['score']
+    converted_data['satisfaction_class'] = satisfaction_data['classification']
+    
+    # Log dos dados calculados
+    logger.info(f"Dados de engajamento: nível={engagement_level}, duração={engagement_duration}s")
+    logger.info(f"Dados de satisfação: score={satisfaction_data['score']}, class={satisfaction_data['classification']}")
+    
+    return converted_data
+
 @app.route('/radar/data', methods=['POST'])
 def receive_radar_data():
     """Endpoint para receber dados do radar"""
@@ -1417,24 +1546,6 @@ def receive_radar_data():
                 "message": error
             }), 400
             
-        # Suavizar dados vitais
-        heart_rate = data_smoother.smooth_heart_rate(converted_data.get('heart_rate'))
-        breath_rate = data_smoother.smooth_breath_rate(converted_data.get('breath_rate'))
-        
-        # Detectar anomalias
-        is_heart_anomaly, is_breath_anomaly = data_smoother.detect_anomalies(heart_rate, breath_rate)
-        
-        if is_heart_anomaly:
-            logger.warning(f"Anomalia detectada em heart_rate: {heart_rate}")
-            heart_rate = None
-        if is_breath_anomaly:
-            logger.warning(f"Anomalia detectada em breath_rate: {breath_rate}")
-            breath_rate = None
-        
-        # Atualizar dados convertidos com valores suavizados
-        converted_data['heart_rate'] = heart_rate
-        converted_data['breath_rate'] = breath_rate
-        
         # Verificar se o banco está disponível
         if not db_manager:
             logger.error("❌ Banco de dados não disponível")
@@ -1443,89 +1554,7 @@ def receive_radar_data():
                 "message": "Banco de dados não disponível"
             }), 500
         
-        # Adicionar timestamp atual
-        current_time = datetime.now()
-        converted_data['timestamp'] = current_time.strftime('%Y-%m-%d %H:%M:%S')
-        
-        # Identificar seção e produto baseado na posição
-        section = shelf_manager.get_section_at_position(
-            converted_data['x_point'],
-            converted_data['y_point'],
-            db_manager
-        )
-        
-        if section:
-            converted_data['section_id'] = section['id']
-            converted_data['product_id'] = section['product_id']
-            logger.info(f"Pessoa detectada na seção: {section['section_name']} (Produto: {section['product_name']})")
-        else:
-            # Ponto está fora de qualquer seção, vamos ajustar para a seção mais próxima
-            logger.info(f"Ponto original ({converted_data['x_point']}, {converted_data['y_point']}) está fora de qualquer seção. Ajustando...")
-            
-            # Buscar todas as seções
-            all_sections = shelf_manager.get_all_sections(db_manager)
-            closest_section = None
-            min_distance = float('inf')
-            
-            # Encontrar a seção mais próxima
-            for section_item in all_sections:
-                # Calcular o centro da seção
-                section_center_x = (section_item['x_start'] + section_item['x_end']) / 2
-                section_center_y = (section_item['y_start'] + section_item['y_end']) / 2
-                
-                # Calcular distância do ponto ao centro da seção
-                distance = ((converted_data['x_point'] - section_center_x) ** 2 + 
-                           (converted_data['y_point'] - section_center_y) ** 2) ** 0.5
-                
-                # Verificar se é a seção mais próxima
-                if distance < min_distance:
-                    min_distance = distance
-                    closest_section = section_item
-            
-            if closest_section:
-                # Associar à seção mais próxima sem alterar coordenadas
-                logger.info(f"Associando à seção mais próxima: {closest_section['section_name']}")
-                
-                converted_data['section_id'] = closest_section['id']
-                converted_data['product_id'] = closest_section['product_id']
-                
-                logger.info(f"Pessoa associada à seção: {closest_section['section_name']} (Produto: {closest_section['product_name']})")
-            else:
-                logger.warning("Não foi possível encontrar uma seção próxima")
-                converted_data['section_id'] = None
-                converted_data['product_id'] = None
-        
-        # Calcular sessão e engajamento
-        session_id, event_type, session_data = user_session_manager.detect_session(converted_data)
-        converted_data['session_id'] = session_id
-        
-        # Salvar resumo da sessão se for final de sessão
-        if event_type == 'end' and session_data:
-            try:
-                db_manager.save_session_summary(session_data)
-            except Exception as e:
-                logger.error(f"Erro ao salvar resumo da sessão: {str(e)}")
-        
-        # Obter últimos 5 registros para calcular engajamento
-        last_records = db_manager.get_last_records(5)
-        
-        # Calcular engajamento baseado nos últimos registros
-        engagement_level, engagement_duration = analytics_manager.calculate_engagement(last_records)
-        converted_data['is_engaged'] = bool(engagement_level)  # 0=não, 1=inicial, 2=completo -> converte para boolean
-        converted_data['engagement_duration'] = int(engagement_duration)
-        
-        # Calcular satisfação
-        satisfaction_data = analytics_manager.calculate_satisfaction(
-            converted_data.get('heart_rate'), 
-            converted_data.get('breath_rate')
-        )
-        
-        converted_data['satisfaction_score'] = satisfaction_data['score']
-        converted_data['satisfaction_class'] = satisfaction_data['classification']
-        
-        # Log dos dados calculados
-        logger.info(f"Dados de engajamento: nível={engagement_level}, duração={engagement_duration}s")
-        logger.info(f"Dados de satisfação: score={satisfaction_data['score']}, class={satisfaction_data['classification']}")
+        converted_data = process_radar_frame(converted_data, datetime.now())
         
         # Inserir dados no banco
         success = db_manager.insert_radar_data(converted_data)
@@ -1551,6 +1580,96 @@ def receive_radar_data():
             "message": f"Erro ao processar dados: {str(e)}"
         }), 500
 
+@app.route('/radar/data/batch', methods=['POST'])
+def receive_radar_data_batch():
+    """
+    Endpoint para receber vários frames em uma requisição
+    Corpo: array JSON de frames ou NDJSON (um frame por linha), opcionalmente com
+    Content-Encoding gzip ou deflate
+    O serial_number pode vir na query string, no header X-Serial-Number ou em cada frame
+    """
+    try:
+        current_time = datetime.now()
+        
+        logger.info("="*50)
+        logger.info("📡 Requisição POST recebida em /radar/data/batch")
+        
+        try:
+            body = read_request_body(request, **BODY_LIMITS)
+            frames = parse_batch_body(body.decode('utf-8', errors='replace'))
+        except RequestBodyError as e:
+            logger.error(f"❌ Corpo rejeitado: {str(e)}")
+            return jsonify({
+                "status": "error",
+                "message": str(e)
+            }), e.status_code
+        except ValueError as e:
+            logger.error(f"❌ Corpo do lote inválido: {str(e)}")
+            return jsonify({
+                "status": "error",
+                "message": f"Corpo do lote inválido: {str(e)}"
+            }), 400
+            
+        if not frames:
+            return jsonify({
+                "status": "error",
+                "message": "Nenhum frame recebido"
+            }), 400
+            
+        if len(frames) > MAX_BATCH_FRAMES:
+            return jsonify({
+                "status": "error",
+                "message": f"Lote excede o limite de {MAX_BATCH_FRAMES} frames"
+            }), 413
+        
+        if not db_manager:
+            logger.error("❌ Banco de dados não disponível")
+            return jsonify({
+                "status": "error",
+                "message": "Banco de dados não disponível"
+            }), 500
+            
+        serial_number = request.args.get('serial_number') or request.headers.get('X-Serial-Number')
+        logger.info(f"Lote com {len(frames)} frames (dispositivo: {serial_number})")
+        
+        # Frames sem timestamp são espaçados pelo intervalo de envio do dispositivo
+        frame_times = assign_batch_frame_times(frames, current_time, BATCH_FRAME_INTERVAL_MS)
+        
+        results = []
+        counts = {}
+        
+        # Frames processados e gravados em ordem: o engajamento lê os últimos registros do banco
+        for index, frame in enumerate(frames):
+            status = 'invalid'
+            if frame is not None:
+                if serial_number and not frame.get('serial_number'):
+                    frame['serial_number'] = serial_number
+                converted_data, error = convert_radar_data(frame)
+                if error:
+                    logger.warning(f"Frame inválido no lote: {error}")
+                else:
+                    converted_data = process_radar_frame(converted_data, frame_times[index])
+                    status = 'accepted' if db_manager.insert_radar_data(converted_data) else 'error'
+            results.append({"index": index, "status": status})
+            counts[status] = counts.get(status, 0) + 1
+        
+        logger.info(f"Lote processado: {counts}")
+        
+        return jsonify({
+            "status": "success" if not counts.get("error") else "partial",
+            "message": "Lote processado",
+            "counts": counts,
+            "results": results
+        }), 200 if not counts.get("error") else 207
+        
+    except Exception as e:
+        logger.error(f"❌ Erro ao processar lote: {str(e)}")
+        logger.error(traceback.format_exc())
+        return jsonify({
+            "status": "error",
+            "message": f"Erro ao processar lote: {str(e)}"
+        }), 500
+
 @app.route('/radar/status', methods=['GET'])
 def get_status():
     """Endpoint para verificar status"""
@@ -1564,29 +1683,25 @@ def get_status():
 
         try:
             # Verificar conexão
-            if db_manager and db_manager.conn:
-                is_connected = db_manager.conn.is_connected()
-                status["connection_info"]["is_connected"] = is_connected
+            if db_manager and db_manager.pool.ready:
+                status["connection_info"]["pool"] = db_manager.get_pool_stats()
                 
-                if is_connected:
+                # Obter informações do servidor
+                try:
+                    with db_manager.connection() as (conn, cursor):
+                        cursor.execute("SELECT VERSION() as version")
+                        version = cursor.fetchone()
+                    status["connection_info"]["is_connected"] = True
                     status["database"] = "online"
                     status["last_records"] = db_manager.get_last_records(5)
                     
-                    # Obter informações do servidor
-                    try:
-                        cursor = db_manager.conn.cursor(dictionary=True)
-                        cursor.execute("SELECT VERSION() as version")
-                        version = cursor.fetchone()
-                        cursor.close()
-                        
-                        if version:
-                            status["connection_info"]["version"] = version["version"]
-                    except Exception as e:
-                        status["connection_info"]["version_error"] = str(e)
-                else:
-                    status["connection_info"]["connection_error"] = "Connection object exists but is not connected"
+                    if version:
+                        status["connection_info"]["version"] = version["version"]
+                except Exception as e:
+                    status["connection_info"]["is_connected"] = False
+                    status["connection_info"]["connection_error"] = str(e)
             else:
-                status["connection_info"]["error"] = "Database manager or connection object is None"
+                status["connection_info"]["error"] = "Database manager or connection pool is None"
         except Exception as e:
             status["connection_info"]["exception"] = str(e)
 